@@ -0,0 +1,150 @@
+"""Bounded cache of /analyze results.
+
+같은 옷 사진이 재시도·수정·옷장 목록 재업로드로 반복해서 들어옵니다.
+두 단계로 찾습니다.
+
+1. 업로드 bytes의 SHA-256 — 완전히 같은 파일이면 디코딩/추론 없이 바로 반환
+2. dHash(9x8 흑백 축소 이미지의 가로 밝기 차이 64bit) — 재인코딩·리사이즈된
+   사본은 디코딩 후 해밍 거리 ``hamming_threshold`` 이하면 추론 없이 반환.
+   dHash는 흑백이라 같은 옷의 다른 색 사진도 거리 0이 되므로, 4x4 RGB 평균
+   (color signature)도 ``color_tolerance`` 안에서 같아야 hit로 인정합니다.
+   캐시는 프로세스 전역(사용자 간 공유)이라 기본값은 꺼짐(-1, SHA-256만).
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+DEFAULT_ANALYSIS_CACHE_ENTRIES = 2048
+DEFAULT_HAMMING_THRESHOLD = -1
+# color signature 칸별 채널 평균의 최대 허용 차이 (0-255)
+DEFAULT_COLOR_TOLERANCE = 16
+_COLOR_GRID = 4
+COLOR_SIGNATURE_SIZE = _COLOR_GRID * _COLOR_GRID * 3
+
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount64(x: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(x)
+    return _POPCOUNT8[x.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def dhash(image: Image.Image) -> int:
+    """64-bit difference hash of *image*."""
+    small = image.convert("L").resize((9, 8), Image.BILINEAR)
+    px = np.asarray(small, dtype=np.int16)
+    bits = (px[:, 1:] > px[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def color_signature(image: Image.Image) -> np.ndarray:
+    """4x4 grid of per-channel RGB means (uint8 ``[48]``)."""
+    small = image.convert("RGB").resize((_COLOR_GRID, _COLOR_GRID), Image.BOX)
+    return np.asarray(small, dtype=np.uint8).reshape(-1)
+
+
+class AnalysisCache:
+    """Thread-safe LRU of classify results keyed by SHA-256, searchable by dHash.
+
+    dHash 후보 검색은 고정 크기 uint64 배열에 XOR + popcount 한 번으로 하고,
+    color signature가 ``color_tolerance`` 밖인 항목은 후보에서 뺍니다.
+    반환된 결과는 캐시와 공유되므로 읽기 전용으로 다룰 것.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_ANALYSIS_CACHE_ENTRIES,
+        hamming_threshold: int = DEFAULT_HAMMING_THRESHOLD,
+        color_tolerance: int = DEFAULT_COLOR_TOLERANCE,
+    ) -> None:
+        self.max_entries = max(0, int(max_entries))
+        self.hamming_threshold = int(hamming_threshold)  # 음수 = dHash 경로 끔
+        self.color_tolerance = max(0, int(color_tolerance))
+        self._entries: "OrderedDict[bytes, int]" = OrderedDict()  # sha -> slot
+        self._results: list = [None] * self.max_entries
+        self._hashes = np.zeros(self.max_entries, dtype=np.uint64)
+        self._colors = np.zeros((self.max_entries, COLOR_SIGNATURE_SIZE), dtype=np.uint8)
+        self._valid = np.zeros(self.max_entries, dtype=bool)
+        self._free = list(range(self.max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.perceptual_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_exact(self, sha: bytes) -> Optional[Dict[str, Any]]:
+        """SHA-256 경로. 실패는 아직 miss로 세지 않음 (get_similar가 최종 판정)."""
+        with self._lock:
+            slot = self._entries.get(sha)
+            if slot is None:
+                return None
+            self._entries.move_to_end(sha)
+            self.exact_hits += 1
+            return self._results[slot]
+
+    def get_similar(self, phash: int, colors: np.ndarray) -> Optional[Dict[str, Any]]:
+        """dHash 경로: color signature가 맞는 항목 중 해밍 거리가 가장 가까운 것 (threshold 이하)."""
+        with self._lock:
+            if self.hamming_threshold >= 0 and self._entries:
+                dist = _popcount64(self._hashes ^ np.uint64(phash)).astype(np.int64)
+                color_diff = np.abs(self._colors.astype(np.int16) - colors.astype(np.int16)).max(axis=1)
+                dist[~self._valid | (color_diff > self.color_tolerance)] = 65
+                slot = int(np.argmin(dist))
+                if dist[slot] <= self.hamming_threshold:
+                    self.perceptual_hits += 1
+                    return self._results[slot]
+            self.misses += 1
+            return None
+
+    def put(self, sha: bytes, phash: int, colors: np.ndarray, result: Dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            slot = self._entries.pop(sha, None)
+            if slot is None:
+                if not self._free:
+                    _, old_slot = self._entries.popitem(last=False)
+                    self._valid[old_slot] = False
+                    self._results[old_slot] = None
+                    self._free.append(old_slot)
+                    self.evictions += 1
+                slot = self._free.pop()
+            self._entries[sha] = slot
+            self._results[slot] = result
+            self._hashes[slot] = np.uint64(phash)
+            self._colors[slot] = colors
+            self._valid[slot] = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._results = [None] * self.max_entries
+            self._valid[:] = False
+            self._free = list(range(self.max_entries - 1, -1, -1))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.exact_hits + self.perceptual_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hamming_threshold": self.hamming_threshold,
+                "color_tolerance": self.color_tolerance,
+                "exact_hits": self.exact_hits,
+                "perceptual_hits": self.perceptual_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "exact_hit_rate": round(self.exact_hits / total, 4) if total else 0.0,
+                "perceptual_hit_rate": round(self.perceptual_hits / total, 4) if total else 0.0,
+                "hit_rate": round((self.exact_hits + self.perceptual_hits) / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,361 @@
+"""Server-side closet store.
+
+사용자별 옷장을 서버 메모리에 보관해 /recommend 요청이 closet_id만 보내도
+되도록 합니다. 옷장마다 원본 payload, 날씨 라벨별 PreparedCloset과
+아이템 임베딩을 캐시하고, 전체 메모리 예산을 넘으면 가장 오래 쓰지 않은
+옷장부터 제거합니다.
+
+옷장마다 CompatibilityGraph(쌍별 색상 조화·라벨별 임베딩 유사도 블록)를 두고
+아이템이 바뀌면 바뀐 행만 다시 계산합니다. ``graph_dir``을 주면 그래프를
+``<graph_dir>/<closet id 해시>.npz``로 저장해 재기동 후 같은 옷장을 다시 올릴 때
+계산을 건너뜁니다. 저장은 요청 경로가 아니라 백그라운드 스레드(_GraphWriter)가
+하며, 같은 옷장의 연속된 저장 요청은 한 번으로 합쳐집니다.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .compat_graph import CompatibilityGraph
+from .model_loader import ArtifactsBundle
+from .predictor import (
+    TARGET_PARTS,
+    PreparedCloset,
+    _weather_label_from_temp,
+    closet_for_weather,
+    prepare_closet,
+)
+
+DEFAULT_CLOSET_STORE_BYTES = 256 * 1024 * 1024
+
+_EMPTY_VERSION = hashlib.sha256(b"").hexdigest()[:16]
+
+
+def _item_digest(item: Dict[str, Any]) -> Tuple[str, int]:
+    raw = json.dumps(item, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest(), len(raw)
+
+
+class ClosetVersionMismatch(ValueError):
+    """Stored closet's version (read under its lock) differs from the expected one."""
+
+    def __init__(self, version: str) -> None:
+        super().__init__(f"closet version mismatch: server has {version}")
+        self.version = version
+
+
+class StoredCloset:
+    """One closet: raw item payloads plus per-weather-label prepared state."""
+
+    def __init__(self, closet_id: str, graph_path: Optional[Path] = None) -> None:
+        self.closet_id = closet_id
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self._digests: Dict[str, Tuple[str, int]] = {}
+        self.version = _EMPTY_VERSION
+        self.lock = threading.Lock()
+        self._base: Optional[PreparedCloset] = None
+        self._by_label: Dict[str, Tuple[PreparedCloset, np.ndarray]] = {}
+        self.graph_path = graph_path
+        self.dropped = False
+        self._save_lock = threading.Lock()  # 그래프 파일 쓰기/삭제 직렬화 (closet lock과 별도)
+        self.graph = CompatibilityGraph()
+        if graph_path is not None and graph_path.exists():
+            try:
+                self.graph = CompatibilityGraph.load(graph_path)
+            except (OSError, ValueError, KeyError) as exc:
+                print(f"ignoring compatibility graph for {closet_id}: {exc}")
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _invalidate(self) -> None:
+        self._base = None
+        self._by_label.clear()
+        joined = "".join(sorted(d for d, _ in self._digests.values()))
+        self.version = hashlib.sha256(joined.encode("ascii")).hexdigest()[:16]
+
+    def upsert(self, items: Iterable[Dict[str, Any]]) -> bool:
+        """Insert or replace items by id; returns whether anything changed."""
+        changed = False
+        for item in items:
+            if item.get("id") is None:
+                continue
+            item_id = str(item["id"])
+            digest = _item_digest(item)
+            if self._digests.get(item_id, (None,))[0] == digest[0]:
+                continue
+            self.items[item_id] = item
+            self._digests[item_id] = digest
+            changed = True
+        if changed:
+            self._invalidate()
+        return changed
+
+    def delete(self, item_ids: Iterable[str]) -> int:
+        removed = 0
+        for item_id in item_ids:
+            if self.items.pop(str(item_id), None) is not None:
+                self._digests.pop(str(item_id), None)
+                removed += 1
+        if removed:
+            self._invalidate()
+        return removed
+
+    def prepared_for(
+        self, bundle: ArtifactsBundle, temperature: float
+    ) -> Tuple[PreparedCloset, np.ndarray]:
+        """Prepared closet and item embeddings for *temperature*'s weather label."""
+        label = _weather_label_from_temp(bundle.weather_label_to_temp_range, temperature)
+        cached = self._by_label.get(label)
+        if cached is not None:
+            return cached
+
+        if self._base is None:
+            closet = prepare_closet(bundle, list(self.items.values()), label)
+            self._base = closet
+        else:
+            closet = closet_for_weather(bundle, self._base, label)
+
+        if len(closet):
+            embs = bundle.encode_item_matrix(closet.features)
+            closet = self._with_graph(closet, label, embs)
+        else:
+            embs = np.zeros((0, int(bundle.cfg.get("embed_dim", 0))), dtype=np.float32)
+        self._by_label[label] = (closet, embs)
+        return closet, embs
+
+    def _with_graph(self, closet: PreparedCloset, label: str, embs: np.ndarray) -> PreparedCloset:
+        """Sync the compatibility graph with *closet* and attach its view for *label*."""
+        self.graph.sync_items(
+            closet.item_ids,
+            [TARGET_PARTS[c] for c in closet.part_codes],
+            closet.labs,
+            closet.palette_idx,
+            {iid: self._digests[iid][0] for iid in closet.item_ids},
+        )
+        view = self.graph.sync_label(label, closet.item_ids, embs)
+        return replace(closet, compat=view)
+
+    @property
+    def needs_save(self) -> bool:
+        return self.graph_path is not None and self.graph.dirty
+
+    def save_graph(self) -> None:
+        """Persist the graph if dirty: snapshot under ``lock``, write outside it."""
+        with self._save_lock:
+            with self.lock:
+                if self.dropped or not self.needs_save:
+                    return
+                arrays = self.graph.snapshot()
+            try:
+                CompatibilityGraph.write(self.graph_path, arrays)
+            except OSError as exc:
+                print(f"could not store compatibility graph for {self.closet_id}: {exc}")
+
+    def drop_graph(self) -> None:
+        """Stop saving and remove the stored graph file (waits for an in-flight write)."""
+        with self._save_lock:
+            self.dropped = True
+            if self.graph_path is not None:
+                self.graph_path.unlink(missing_ok=True)
+
+    @property
+    def nbytes(self) -> int:
+        total = sum(size for _, size in self._digests.values())
+        if self._base is not None:
+            total += self._base.nbytes
+        for closet, embs in self._by_label.values():
+            total += closet.features.nbytes + embs.nbytes
+        return total + self.graph.nbytes
+
+    def summary(self) -> Dict[str, Any]:
+        return {"closet_id": self.closet_id, "version": self.version, "item_count": len(self)}
+
+
+class _GraphWriter:
+    """Background thread that saves dirty closet graphs, merging repeated requests."""
+
+    def __init__(self) -> None:
+        self._pending: "OrderedDict[str, StoredCloset]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._busy = False
+        self._closed = False
+        self.writes = 0
+
+    def schedule(self, closet: StoredCloset) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._pending[closet.closet_id] = closet
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="closet-graph-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def discard(self, closet_id: str) -> None:
+        with self._cond:
+            self._pending.pop(closet_id, None)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                _, closet = self._pending.popitem(last=False)
+                self._busy = True
+            try:
+                closet.save_graph()
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self.writes += 1
+                    self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every scheduled save is written; ``False`` on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Write what is pending, then stop the thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending) + int(self._busy)
+
+
+class ClosetStore:
+    """Thread-safe LRU of :class:`StoredCloset` bounded by estimated bytes."""
+
+    def __init__(self, max_bytes: int = DEFAULT_CLOSET_STORE_BYTES, graph_dir: Optional[str] = None) -> None:
+        self.max_bytes = max(0, int(max_bytes))
+        self.graph_dir = Path(graph_dir) if graph_dir else None
+        self._closets: "OrderedDict[str, StoredCloset]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.graph_writer = _GraphWriter()
+
+    def get(self, closet_id: str) -> Optional[StoredCloset]:
+        with self._lock:
+            closet = self._closets.get(closet_id)
+            if closet is not None:
+                self._closets.move_to_end(closet_id)
+            return closet
+
+    def _graph_path(self, closet_id: str) -> Optional[Path]:
+        if self.graph_dir is None:
+            return None
+        return self.graph_dir / f"{hashlib.sha256(closet_id.encode('utf-8')).hexdigest()[:24]}.npz"
+
+    def _get_or_create(self, closet_id: str) -> StoredCloset:
+        with self._lock:
+            closet = self._closets.get(closet_id)
+            if closet is None:
+                closet = StoredCloset(closet_id, self._graph_path(closet_id))
+                self._closets[closet_id] = closet
+                self._sizes[closet_id] = 0
+            self._closets.move_to_end(closet_id)
+            return closet
+
+    def _account(self, closet: StoredCloset) -> None:
+        """Refresh *closet*'s size and evict LRU closets over budget."""
+        size = closet.nbytes
+        with self._lock:
+            if self._closets.get(closet.closet_id) is not closet:
+                return
+            self._bytes += size - self._sizes.get(closet.closet_id, 0)
+            self._sizes[closet.closet_id] = size
+            while self._bytes > self.max_bytes and len(self._closets) > 1:
+                victim_id = next(iter(self._closets))
+                if victim_id == closet.closet_id:
+                    break
+                self._closets.pop(victim_id)
+                self._bytes -= self._sizes.pop(victim_id, 0)
+                self.evictions += 1
+
+    def upsert_items(self, closet_id: str, items: List[Dict[str, Any]]) -> StoredCloset:
+        closet = self._get_or_create(closet_id)
+        with closet.lock:
+            closet.upsert(items)
+        self._account(closet)
+        return closet
+
+    def delete_items(self, closet_id: str, item_ids: List[str]) -> Optional[StoredCloset]:
+        closet = self.get(closet_id)
+        if closet is None:
+            return None
+        with closet.lock:
+            closet.delete(item_ids)
+        self._account(closet)
+        return closet
+
+    def drop(self, closet_id: str) -> bool:
+        with self._lock:
+            closet = self._closets.pop(closet_id, None)
+            if closet is None:
+                return False
+            self._bytes -= self._sizes.pop(closet_id, 0)
+        # 명시적 삭제만 저장된 그래프도 지움 (LRU 제거는 유지)
+        self.graph_writer.discard(closet_id)
+        closet.drop_graph()
+        return True
+
+    def prepared_for(
+        self,
+        closet: StoredCloset,
+        bundle: ArtifactsBundle,
+        temperature: float,
+        expected_version: Optional[str] = None,
+    ) -> Tuple[PreparedCloset, np.ndarray, str]:
+        """Prepared closet, item embeddings and the version they were built from.
+
+        version 확인과 스냅샷 읽기를 같은 lock 안에서 하므로 반환된 version이
+        곧 결과를 만든 옷장 상태입니다. *expected_version*과 다르면
+        :class:`ClosetVersionMismatch`.
+        """
+        with closet.lock:
+            version = closet.version
+            if expected_version and expected_version != version:
+                raise ClosetVersionMismatch(version)
+            prepared, embs = closet.prepared_for(bundle, temperature)
+            needs_save = closet.needs_save
+        if needs_save:
+            self.graph_writer.schedule(closet)
+        self._account(closet)
+        return prepared, embs, version
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "closets": len(self._closets),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "graph_dir": str(self.graph_dir) if self.graph_dir else None,
+                "graph_writes": self.graph_writer.writes,
+                "graph_writes_pending": self.graph_writer.pending,
+            }
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Flush pending graph saves and stop the writer thread."""
+        self.graph_writer.close(timeout)
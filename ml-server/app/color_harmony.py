@@ -146,7 +146,18 @@ def harmony_score_lab(
 
     Uses complementary / analogous / triadic harmony on the LCh hue wheel,
     plus lightness contrast and chroma boost.  Directly ported from notebook.
+
+    LABs produced by :func:`resolve_item_lab` are served from the precomputed
+    palette table; only free-form LAB values take the trig path below.
     """
+    params = (w_comp, w_anal, w_tria, sigma_comp, sigma_anal, sigma_tria,
+              w_light, sigma_light, w_chroma)
+    if params == _DEFAULT_HARMONY_PARAMS:
+        i = palette_index_of(lab1)
+        j = palette_index_of(lab2)
+        if i is not None and j is not None:
+            return float(_PALETTE_HARMONY[i, j])
+
     L1, C1, h1 = _lab_to_lch(lab1)
     L2, C2, h2 = _lab_to_lch(lab2)
 
@@ -169,8 +180,99 @@ def harmony_score_lab(
     return float(hue_harmony + w_light * light + w_chroma * chroma_boost)
 
 
+def _labs_to_lch(labs: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized :func:`_lab_to_lch` over an ``[N, 3]`` LAB array."""
+    arr = np.asarray(labs, dtype=np.float64).reshape(-1, 3)
+    L, a, b = arr[:, 0], arr[:, 1], arr[:, 2]
+    C = np.sqrt(a * a + b * b)
+    h = np.degrees(np.arctan2(b, a))
+    h = np.where(h < 0, h + 360.0, h)
+    return L, C, h
+
+
+def _gaussian_score_np(x: np.ndarray, mu: float, sigma: float) -> np.ndarray:
+    return np.exp(-0.5 * ((x - mu) / sigma) ** 2)
+
+
+def harmony_score_matrix(
+    labs_a: np.ndarray,
+    labs_b: np.ndarray,
+    w_comp: float = 0.50,
+    w_anal: float = 0.30,
+    w_tria: float = 0.20,
+    sigma_comp: float = 25.0,
+    sigma_anal: float = 18.0,
+    sigma_tria: float = 22.0,
+    w_light: float = 0.25,
+    sigma_light: float = 25.0,
+    w_chroma: float = 0.10,
+) -> np.ndarray:
+    """Pairwise :func:`harmony_score_lab` for ``[N, 3]`` x ``[M, 3]`` LAB arrays.
+
+    Each item is converted to LCh once and the ``[N, M]`` score matrix is
+    computed with broadcasting.  Entry ``[i, j]`` equals
+    ``harmony_score_lab(labs_a[i], labs_b[j])``.
+    """
+    L1, C1, h1 = _labs_to_lch(labs_a)
+    L2, C2, h2 = _labs_to_lch(labs_b)
+    if L1.size == 0 or L2.size == 0:
+        return np.zeros((L1.size, L2.size), dtype=np.float64)
+
+    d = np.abs(h1[:, None] - h2[None, :]) % 360.0
+    dh = np.minimum(d, 360.0 - d)
+
+    s_comp = _gaussian_score_np(dh, 180.0, sigma_comp)
+    s_anal = _gaussian_score_np(dh, 30.0, sigma_anal) + _gaussian_score_np(dh, 0.0, sigma_anal)
+    s_tria = _gaussian_score_np(dh, 120.0, sigma_tria)
+
+    hue_harmony = w_comp * s_comp + w_anal * s_anal + w_tria * s_tria
+
+    dL = np.abs(L1[:, None] - L2[None, :])
+    light = 1.0 - _gaussian_score_np(dL, 0.0, sigma_light)
+
+    Cmean = (C1[:, None] + C2[None, :]) / 2.0
+    chroma_boost = 1.0 - np.exp(-Cmean / 25.0)
+
+    return hue_harmony + w_light * light + w_chroma * chroma_boost
+
+
+def top_l_flat_indices(scores: np.ndarray, L: int) -> np.ndarray:
+    """Flat indices of the top-*L* entries of *scores*, best first.
+
+    Ties keep row-major order, matching a stable ``sort(reverse=True)`` over
+    the nested-loop combination list.
+    """
+    flat = np.asarray(scores).ravel()
+    n = min(max(int(L), 0), flat.size)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    if n < flat.size:
+        # argpartition for the cut, then keep every tie at the boundary so
+        # the stable sort below still picks the lowest indices.
+        kth = -np.partition(-flat, n - 1)[n - 1]
+        cand = np.flatnonzero(flat >= kth)
+    else:
+        cand = np.arange(flat.size)
+    return cand[np.argsort(-flat[cand], kind="stable")][:n]
+
+
+_HARMONY_DESCRIPTIONS: Tuple[str, ...] = (
+    "무채색 톤 매치",
+    "동일 색상 계열",
+    "유사색 조화",
+    "삼각 조화",
+    "보색 대비",
+    "색상 밸런스",
+)
+
+
 def describe_harmony(lab1: np.ndarray, lab2: np.ndarray) -> str:
     """Return a short Korean description of the dominant harmony type."""
+    i = palette_index_of(lab1)
+    j = palette_index_of(lab2)
+    if i is not None and j is not None:
+        return _HARMONY_DESCRIPTIONS[_PALETTE_DESCRIBE[i, j]]
+
     _, C1, h1 = _lab_to_lch(lab1)
     _, C2, h2 = _lab_to_lch(lab2)
     Cmean = (C1 + C2) / 2.0
@@ -192,6 +294,86 @@ def describe_harmony(lab1: np.ndarray, lab2: np.ndarray) -> str:
     return "색상 밸런스"
 
 
+def _describe_code_matrix(labs_a: np.ndarray, labs_b: np.ndarray) -> np.ndarray:
+    """Pairwise :func:`describe_harmony` as indices into ``_HARMONY_DESCRIPTIONS``."""
+    _, C1, h1 = _labs_to_lch(labs_a)
+    _, C2, h2 = _labs_to_lch(labs_b)
+    Cmean = (C1[:, None] + C2[None, :]) / 2.0
+    d = np.abs(h1[:, None] - h2[None, :]) % 360.0
+    dh = np.minimum(d, 360.0 - d)
+    codes = np.select(
+        [Cmean < 5.0, dh <= 20, dh <= 45, (dh >= 90) & (dh <= 150), dh >= 150],
+        [0, 1, 2, 3, 4],
+        default=5,
+    )
+    return codes.astype(np.int8)
+
+
+# ---------------------------------------------------------------------------
+# Named-color palette lookup tables
+# ---------------------------------------------------------------------------
+# resolve_item_lab only ever returns a named color, the fallback gray or a
+# fixed 70/30 blend of two of them, so every (color, sub_color) pair interns
+# into a small palette.  Harmony scores / descriptions over the palette are
+# precomputed once at import and served as array gathers.
+
+_DEFAULT_HARMONY_PARAMS = (0.50, 0.30, 0.20, 25.0, 18.0, 22.0, 0.25, 25.0, 0.10)
+
+
+def _build_palette() -> Tuple[np.ndarray, Dict[bytes, int]]:
+    names: List[Optional[str]] = [None] + list(COLOR_NAME_TO_LAB)
+    labs: List[np.ndarray] = []
+    index: Dict[bytes, int] = {}
+    for primary in names:
+        for secondary in names:
+            lab = resolve_item_lab(primary, secondary)
+            key = lab.tobytes()
+            if key not in index:
+                index[key] = len(labs)
+                labs.append(lab)
+    return np.stack(labs).astype(np.float32), index
+
+
+PALETTE_LABS, _PALETTE_INDEX = _build_palette()
+_PALETTE_HARMONY = harmony_score_matrix(PALETTE_LABS, PALETTE_LABS)
+_PALETTE_DESCRIBE = _describe_code_matrix(PALETTE_LABS, PALETTE_LABS)
+
+
+def palette_index_of(lab: Optional[np.ndarray]) -> Optional[int]:
+    """Palette index of a LAB from :func:`resolve_item_lab`, else ``None``."""
+    if not isinstance(lab, np.ndarray) or lab.dtype != np.float32 or lab.shape != (3,):
+        return None
+    return _PALETTE_INDEX.get(lab.tobytes())
+
+
+def harmony_block(
+    labs_a: np.ndarray,
+    palette_a: np.ndarray,
+    labs_b: np.ndarray,
+    palette_b: np.ndarray,
+) -> np.ndarray:
+    """:func:`harmony_matrix_for` on arrays; ``palette_*`` is ``-1`` for free-form LAB."""
+    if (palette_a >= 0).all() and (palette_b >= 0).all():
+        return _PALETTE_HARMONY[np.ix_(palette_a.astype(np.intp), palette_b.astype(np.intp))]
+    return harmony_score_matrix(labs_a, labs_b)
+
+
+def harmony_matrix_for(
+    infos_a: List["ItemColorInfo"],
+    infos_b: List["ItemColorInfo"],
+) -> np.ndarray:
+    """Pairwise harmony for two item lists.
+
+    Gathers from the palette table when every item carries a palette index
+    and falls back to :func:`harmony_score_matrix` otherwise.
+    """
+    ia = [c.palette_idx for c in infos_a]
+    ib = [c.palette_idx for c in infos_b]
+    if None not in ia and None not in ib:
+        return _PALETTE_HARMONY[np.ix_(np.asarray(ia, dtype=np.intp), np.asarray(ib, dtype=np.intp))]
+    return harmony_score_matrix([c.lab for c in infos_a], [c.lab for c in infos_b])
+
+
 # ---------------------------------------------------------------------------
 # Data classes
 # ---------------------------------------------------------------------------
@@ -202,6 +384,7 @@ class ItemColorInfo:
     part: str
     lab: np.ndarray
     similarity: float  # mood similarity from Step 1
+    palette_idx: Optional[int] = None  # index into PALETTE_LABS, None for free-form LAB
 
 
 @dataclass(frozen=True)
@@ -235,13 +418,19 @@ def build_top_bottom_sets(
     L: int = 15,
 ) -> List[TopBottomSet]:
     """Score all top x bottom pairs by color harmony, return top-L."""
-    combos: List[TopBottomSet] = []
-    for t in tops:
-        for b in bottoms:
-            s = harmony_score_lab(t.lab, b.lab)
-            combos.append(TopBottomSet(top_id=t.item_id, bottom_id=b.item_id, harmony=s))
-    combos.sort(key=lambda x: x.harmony, reverse=True)
-    return combos[: min(L, len(combos))]
+    if not tops or not bottoms:
+        return []
+    scores = harmony_matrix_for(tops, bottoms)
+    order = top_l_flat_indices(scores, L)
+    n_b = len(bottoms)
+    return [
+        TopBottomSet(
+            top_id=tops[k // n_b].item_id,
+            bottom_id=bottoms[k % n_b].item_id,
+            harmony=float(scores.flat[k]),
+        )
+        for k in order
+    ]
 
 
 # ---------------------------------------------------------------------------
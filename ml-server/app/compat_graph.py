@@ -0,0 +1,432 @@
+"""Per-closet pairwise compatibility graph.
+
+아이템 쌍의 색상 조화는 아이템이 바뀌지 않는 한 그대로이고, 임베딩 유사도는
+날씨 라벨(아이템 행의 ``날씨`` feature)에만 따라 달라집니다. 서버 저장 옷장마다
+이 값을 파트 블록 행렬(상의×하의, 아우터×상의, 아우터×하의, 아우터×원피스)로
+보관해 두고, 요청은 후보 아이템의 행/열만 잘라 읽습니다.
+
+- 추가: 새 아이템의 행/열만 계산 (O(N)), 배열은 용량을 두 배씩 늘림
+- 삭제: 행을 비활성으로 표시 (O(1)), 비활성 행이 살아 있는 행보다 많아지면
+  새 배열로 압축
+- 행 자리를 재사용하지 않고 기존 칸을 덮어쓰지 않으므로, 이미 내준
+  :class:`CompatibilityView`는 이후 갱신과 무관하게 그대로 읽을 수 있음
+- :meth:`CompatibilityGraph.save` / :meth:`CompatibilityGraph.load`로 npz 저장
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .color_harmony import harmony_block
+
+PARTS = ("상의", "하의", "아우터", "원피스")
+PAIRS: Tuple[Tuple[str, str], ...] = (
+    ("상의", "하의"),
+    ("아우터", "상의"),
+    ("아우터", "하의"),
+    ("아우터", "원피스"),
+)
+
+_FORMAT_VERSION = 1
+# 저장된 임베딩과 현재 임베딩이 이보다 다르면 (모델 교체 등) 라벨 블록을 새로 계산
+_EMB_TOL = 1e-6
+_MIN_CAPACITY = 8
+
+
+def _resized(arr: np.ndarray, shape: Tuple[int, ...]) -> np.ndarray:
+    out = np.zeros(shape, dtype=arr.dtype)
+    region = tuple(slice(0, min(a, b)) for a, b in zip(arr.shape, shape))
+    out[region] = arr[region]
+    return out
+
+
+def _normalize(embs: np.ndarray, eps: float = 1e-12) -> np.ndarray:
+    # match_harmony.build_emb_by_id와 같은 정규화
+    x = embs.astype(np.float32)
+    return x / (np.linalg.norm(x, axis=1, keepdims=True) + eps)
+
+
+def _emb_sim_01(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return 0.5 * ((a @ b.T).astype(np.float64) + 1.0)
+
+
+class _Part:
+    """Row bookkeeping for one part; rows are append-only, ``None`` id = removed."""
+
+    def __init__(self, capacity: int = _MIN_CAPACITY) -> None:
+        self.ids: List[Optional[str]] = []
+        self.digests: List[Optional[str]] = []
+        self.pos: Dict[str, int] = {}
+        self.labs = np.zeros((capacity, 3), dtype=np.float32)
+        self.palette = np.full(capacity, -1, dtype=np.int32)
+
+    @property
+    def n(self) -> int:
+        return len(self.ids)
+
+    @property
+    def capacity(self) -> int:
+        return int(self.labs.shape[0])
+
+    @property
+    def dead(self) -> int:
+        return self.n - len(self.pos)
+
+    def live_rows(self) -> np.ndarray:
+        return np.fromiter(self.pos.values(), dtype=np.intp, count=len(self.pos))
+
+
+@dataclass
+class _LabelState:
+    dim: int
+    emb: Dict[str, np.ndarray] = field(default_factory=dict)  # part -> float32 [cap, D]
+    known: Dict[str, np.ndarray] = field(default_factory=dict)  # part -> bool [cap]
+    blocks: Dict[Tuple[str, str], np.ndarray] = field(default_factory=dict)  # pair -> emb_sim_01
+
+    @classmethod
+    def empty(cls, dim: int, capacities: Mapping[str, int]) -> "_LabelState":
+        state = cls(dim)
+        for part in PARTS:
+            state.emb[part] = np.zeros((capacities[part], dim), dtype=np.float32)
+            state.known[part] = np.zeros(capacities[part], dtype=bool)
+        for a, b in PAIRS:
+            state.blocks[(a, b)] = np.zeros((capacities[a], capacities[b]), dtype=np.float64)
+        return state
+
+
+@dataclass(frozen=True)
+class CompatibilityView:
+    """Read-only snapshot of a graph for one weather label."""
+
+    label: str
+    rows: Dict[str, Tuple[str, int]]  # item_id -> (part, row)
+    harmony: Dict[Tuple[str, str], np.ndarray] = field(repr=False)
+    emb01: Dict[Tuple[str, str], np.ndarray] = field(repr=False)
+
+    def blocks(
+        self, ids_a: Sequence[str], ids_b: Sequence[str]
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """``(harmony, emb_sim_01)`` as ``[len(ids_a), len(ids_b)]`` matrices.
+
+        *ids_a* must all be one part; ``None`` if an id is unknown or a part
+        pair is not stored (호출자는 직접 계산으로 대체).
+        """
+        try:
+            located_a = [self.rows[str(i)] for i in ids_a]
+            located_b = [self.rows[str(i)] for i in ids_b]
+        except KeyError:
+            return None
+        shape = (len(located_a), len(located_b))
+        h = np.empty(shape, dtype=np.float64)
+        e = np.empty(shape, dtype=np.float64)
+        if not located_a or not located_b:
+            return h, e
+        parts_a = {p for p, _ in located_a}
+        if len(parts_a) != 1:
+            return None
+        part_a = parts_a.pop()
+        rows_a = np.array([r for _, r in located_a], dtype=np.intp)
+        parts_b = np.array([p for p, _ in located_b], dtype=object)
+        rows_b = np.array([r for _, r in located_b], dtype=np.intp)
+        for part_b in set(parts_b.tolist()):
+            key = (part_a, part_b)
+            if key not in self.harmony:
+                return None
+            cols = np.flatnonzero(parts_b == part_b)
+            idx = np.ix_(rows_a, rows_b[cols])
+            h[:, cols] = self.harmony[key][idx]
+            e[:, cols] = self.emb01[key][idx]
+        return h, e
+
+
+class CompatibilityGraph:
+    """Dense part-block harmony / embedding-similarity matrices for one closet."""
+
+    def __init__(self) -> None:
+        self._parts: Dict[str, _Part] = {part: _Part() for part in PARTS}
+        self._harmony: Dict[Tuple[str, str], np.ndarray] = {
+            (a, b): np.zeros((_MIN_CAPACITY, _MIN_CAPACITY), dtype=np.float64) for a, b in PAIRS
+        }
+        self._labels: Dict[str, _LabelState] = {}
+        self.dirty = False
+        self.rows_computed = 0  # 계산한 행/열 수 (stats)
+
+    def __len__(self) -> int:
+        return sum(len(p.pos) for p in self._parts.values())
+
+    @property
+    def nbytes(self) -> int:
+        total = sum(p.labs.nbytes + p.palette.nbytes for p in self._parts.values())
+        total += sum(h.nbytes for h in self._harmony.values())
+        for state in self._labels.values():
+            total += sum(e.nbytes for e in state.emb.values())
+            total += sum(b.nbytes for b in state.blocks.values())
+        return int(total)
+
+    # ------------------------------------------------------------------
+    # capacity / compaction
+    # ------------------------------------------------------------------
+
+    def _capacities(self) -> Dict[str, int]:
+        return {part: p.capacity for part, p in self._parts.items()}
+
+    def _ensure_capacity(self, part: str, needed: int) -> None:
+        p = self._parts[part]
+        if needed <= p.capacity:
+            return
+        cap = max(needed, 2 * p.capacity, _MIN_CAPACITY)
+        palette = np.full(cap, -1, dtype=np.int32)
+        palette[: p.capacity] = p.palette
+        p.palette = palette
+        p.labs = _resized(p.labs, (cap, 3))
+        caps = self._capacities()
+        for a, b in PAIRS:
+            if part in (a, b):
+                self._harmony[(a, b)] = _resized(self._harmony[(a, b)], (caps[a], caps[b]))
+        for state in self._labels.values():
+            state.emb[part] = _resized(state.emb[part], (cap, state.dim))
+            state.known[part] = _resized(state.known[part], (cap,))
+            for a, b in PAIRS:
+                if part in (a, b):
+                    state.blocks[(a, b)] = _resized(state.blocks[(a, b)], (caps[a], caps[b]))
+
+    def _compact(self) -> None:
+        """Rebuild every array with live rows only (new arrays; views stay valid)."""
+        live = {part: p.live_rows() for part, p in self._parts.items()}
+        for part, p in self._parts.items():
+            rows = live[part]
+            compact = _Part(max(rows.size, _MIN_CAPACITY))
+            compact.ids = [p.ids[r] for r in rows]
+            compact.digests = [p.digests[r] for r in rows]
+            compact.pos = {iid: i for i, iid in enumerate(compact.ids)}
+            compact.labs[: rows.size] = p.labs[rows]
+            compact.palette[: rows.size] = p.palette[rows]
+            self._parts[part] = compact
+        caps = self._capacities()
+        for a, b in PAIRS:
+            h = np.zeros((caps[a], caps[b]), dtype=np.float64)
+            h[: live[a].size, : live[b].size] = self._harmony[(a, b)][np.ix_(live[a], live[b])]
+            self._harmony[(a, b)] = h
+        for label, state in list(self._labels.items()):
+            fresh = _LabelState.empty(state.dim, caps)
+            for part in PARTS:
+                fresh.emb[part][: live[part].size] = state.emb[part][live[part]]
+                fresh.known[part][: live[part].size] = state.known[part][live[part]]
+            for a, b in PAIRS:
+                fresh.blocks[(a, b)][: live[a].size, : live[b].size] = state.blocks[(a, b)][
+                    np.ix_(live[a], live[b])
+                ]
+            self._labels[label] = fresh
+
+    # ------------------------------------------------------------------
+    # updates
+    # ------------------------------------------------------------------
+
+    def remove(self, item_id: str) -> bool:
+        for p in self._parts.values():
+            row = p.pos.pop(item_id, None)
+            if row is not None:
+                p.ids[row] = None
+                p.digests[row] = None
+                self.dirty = True
+                return True
+        return False
+
+    def sync_items(
+        self,
+        item_ids: Sequence[str],
+        parts: Sequence[str],
+        labs: np.ndarray,
+        palette_idx: np.ndarray,
+        digests: Mapping[str, str],
+    ) -> int:
+        """Make the graph hold exactly *item_ids*; returns the number of rows added/removed.
+
+        Items whose part or digest changed are removed and added again. New
+        rows get their harmony row/column against every item of the paired part.
+        """
+        current = {str(iid): i for i, iid in enumerate(item_ids)}
+        changes = 0
+        for part, p in self._parts.items():
+            for iid, row in list(p.pos.items()):
+                i = current.get(iid)
+                if i is None or parts[i] != part or p.digests[row] != digests.get(iid):
+                    self.remove(iid)
+                    changes += 1
+
+        added: Dict[str, List[int]] = {}
+        for iid, i in current.items():
+            part = parts[i]
+            if part in self._parts and iid not in self._parts[part].pos:
+                added.setdefault(part, []).append(i)
+
+        start: Dict[str, int] = {part: p.n for part, p in self._parts.items()}
+        for part, idx in added.items():
+            p = self._parts[part]
+            self._ensure_capacity(part, p.n + len(idx))
+            rows = slice(p.n, p.n + len(idx))
+            p.labs[rows] = labs[idx]
+            p.palette[rows] = palette_idx[idx]
+            for i in idx:
+                iid = str(item_ids[i])
+                p.pos[iid] = p.n
+                p.ids.append(iid)
+                p.digests.append(digests.get(iid))
+            changes += len(idx)
+
+        for a, b in PAIRS:
+            pa, pb = self._parts[a], self._parts[b]
+            h = self._harmony[(a, b)]
+            new_a, new_b = slice(start[a], pa.n), slice(start[b], pb.n)
+            if pa.n > start[a] and pb.n:
+                h[new_a, : pb.n] = harmony_block(pa.labs[new_a], pa.palette[new_a], pb.labs[: pb.n], pb.palette[: pb.n])
+                self.rows_computed += pa.n - start[a]
+            if pb.n > start[b] and start[a]:
+                old_a = slice(0, start[a])
+                h[old_a, new_b] = harmony_block(pa.labs[old_a], pa.palette[old_a], pb.labs[new_b], pb.palette[new_b])
+                self.rows_computed += pb.n - start[b]
+
+        if changes:
+            self.dirty = True
+        if any(p.dead > max(16, len(p.pos)) for p in self._parts.values()):
+            self._compact()
+        return changes
+
+    def sync_label(self, label: str, item_ids: Sequence[str], embs: np.ndarray) -> CompatibilityView:
+        """Fill embedding-similarity rows for *label* and return a view of the graph.
+
+        *embs* are the item embeddings (aligned with *item_ids*) for *label*;
+        every item already synced with :meth:`sync_items` must be present.
+        """
+        x = _normalize(np.asarray(embs))
+        index = {str(iid): i for i, iid in enumerate(item_ids)}
+        dim = int(x.shape[1]) if x.ndim == 2 else 0
+        state = self._labels.get(label)
+        if state is None or state.dim != dim:
+            state = _LabelState.empty(dim, self._capacities())
+
+        live = {part: p.live_rows() for part, p in self._parts.items()}
+        current: Dict[str, np.ndarray] = {}
+        rebuild = False
+        for part, p in self._parts.items():
+            try:
+                src = [index[iid] for iid in p.pos]
+            except KeyError as exc:
+                raise ValueError(f"item {exc.args[0]} is in the graph but has no embedding") from None
+            current[part] = x[src] if src else np.zeros((0, dim), dtype=np.float32)
+            known = state.known[part][live[part]]
+            if known.any():
+                drift = np.abs(state.emb[part][live[part][known]] - current[part][known]).max()
+                rebuild = rebuild or bool(drift > _EMB_TOL)
+        if rebuild:
+            # 모델이 바뀜: 기존 배열은 그대로 두고 (내준 view 보호) 새로 계산
+            state = _LabelState.empty(dim, self._capacities())
+
+        pending: Dict[str, np.ndarray] = {}
+        for part in PARTS:
+            todo = ~state.known[part][live[part]]
+            pending[part] = live[part][todo]
+            state.emb[part][pending[part]] = current[part][todo]
+
+        for a, b in PAIRS:
+            e = state.blocks[(a, b)]
+            ea, eb = state.emb[a], state.emb[b]
+            if pending[a].size and live[b].size:
+                e[np.ix_(pending[a], live[b])] = _emb_sim_01(ea[pending[a]], eb[live[b]])
+                self.rows_computed += pending[a].size
+            if pending[b].size and live[a].size:
+                e[np.ix_(live[a], pending[b])] = _emb_sim_01(ea[live[a]], eb[pending[b]])
+                self.rows_computed += pending[b].size
+        for part in PARTS:
+            if pending[part].size:
+                state.known[part][pending[part]] = True
+                self.dirty = True
+        self._labels[label] = state
+
+        rows = {iid: (part, row) for part, p in self._parts.items() for iid, row in p.pos.items()}
+        return CompatibilityView(label, rows, dict(self._harmony), dict(state.blocks))
+
+    # ------------------------------------------------------------------
+    # persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path: str | Path) -> None:
+        """Write live rows to *path* (npz) via a temp file + ``os.replace``."""
+        self.write(path, self.snapshot())
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """Copies of the live rows as npz arrays; clears ``dirty``.
+
+        복사만 하므로 호출자의 lock 안에서 짧게 끝나고, 파일 쓰기(:meth:`write`)는
+        lock 밖에서 할 수 있습니다.
+        """
+        live = {part: p.live_rows() for part, p in self._parts.items()}
+        arrays: Dict[str, np.ndarray] = {"format_version": np.array(_FORMAT_VERSION)}
+        for k, (part, p) in enumerate(self._parts.items()):
+            rows = live[part]
+            arrays[f"p{k}_ids"] = np.array([p.ids[r] for r in rows], dtype=str)
+            arrays[f"p{k}_digests"] = np.array([p.digests[r] or "" for r in rows], dtype=str)
+            arrays[f"p{k}_labs"] = p.labs[rows]
+            arrays[f"p{k}_palette"] = p.palette[rows]
+        pair_keys = {pair: f"{PARTS.index(pair[0])}{PARTS.index(pair[1])}" for pair in PAIRS}
+        for (a, b), key in pair_keys.items():
+            arrays[f"h{key}"] = self._harmony[(a, b)][np.ix_(live[a], live[b])]
+        arrays["labels"] = np.array(list(self._labels), dtype=str)
+        for i, state in enumerate(self._labels.values()):
+            arrays[f"l{i}_dim"] = np.array(state.dim)
+            for k, part in enumerate(PARTS):
+                arrays[f"l{i}_e{k}"] = state.emb[part][live[part]]
+                arrays[f"l{i}_k{k}"] = state.known[part][live[part]]
+            for (a, b), key in pair_keys.items():
+                arrays[f"l{i}_s{key}"] = state.blocks[(a, b)][np.ix_(live[a], live[b])]
+        self.dirty = False
+        return arrays
+
+    @staticmethod
+    def write(path: str | Path, arrays: Dict[str, np.ndarray]) -> None:
+        """Write a :meth:`snapshot` to *path* via a temp file + ``os.replace``."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "CompatibilityGraph":
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data["format_version"])
+            if version != _FORMAT_VERSION:
+                raise ValueError(f"unsupported compatibility graph format {version}")
+            graph = cls()
+            for k, part in enumerate(PARTS):
+                ids = [str(v) for v in data[f"p{k}_ids"]]
+                p = _Part(max(len(ids), _MIN_CAPACITY))
+                p.ids = ids
+                p.digests = [str(v) or None for v in data[f"p{k}_digests"]]
+                p.pos = {iid: i for i, iid in enumerate(ids)}
+                p.labs[: len(ids)] = data[f"p{k}_labs"]
+                p.palette[: len(ids)] = data[f"p{k}_palette"]
+                graph._parts[part] = p
+            caps = graph._capacities()
+            sizes = {part: p.n for part, p in graph._parts.items()}
+            for a, b in PAIRS:
+                key = f"{PARTS.index(a)}{PARTS.index(b)}"
+                h = np.zeros((caps[a], caps[b]), dtype=np.float64)
+                h[: sizes[a], : sizes[b]] = data[f"h{key}"]
+                graph._harmony[(a, b)] = h
+            for i, label in enumerate(str(v) for v in data["labels"]):
+                state = _LabelState.empty(int(data[f"l{i}_dim"]), caps)
+                for k, part in enumerate(PARTS):
+                    state.emb[part][: sizes[part]] = data[f"l{i}_e{k}"]
+                    state.known[part][: sizes[part]] = data[f"l{i}_k{k}"]
+                for a, b in PAIRS:
+                    key = f"{PARTS.index(a)}{PARTS.index(b)}"
+                    state.blocks[(a, b)][: sizes[a], : sizes[b]] = data[f"l{i}_s{key}"]
+                graph._labels[label] = state
+        return graph
@@ -10,14 +10,20 @@ EfficientNet 기반 의류 속성 분류기 (12개 속성) — ONNX Runtime 추
   자동추론: 날씨 (7단계, -20~40°C)
 """
 
+import io
 import json
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 import numpy as np
-import onnxruntime as ort
 from PIL import Image
 
+from .metrics import timed
+from .micro_batching import BatchingSession
+from .onnx_session import SessionConfig, create_session
+
 
 # ============================================================
 # 속성 정의 (기본값; effnet_labels.json에서 오버라이드 가능)
@@ -143,26 +149,90 @@ def assign_weather(category, sleeve_length, materials, length):
 # Numpy preprocessing (replaces torchvision.transforms)
 # ============================================================
 
+INPUT_SIZE = 224
+
 _MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
 _STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+# (x / 255 - mean) / std  ==  x * _SCALE + _OFFSET  (채널별, CHW 브로드캐스트 모양)
+_SCALE = (1.0 / (255.0 * _STD)).astype(np.float32)[:, None, None]
+_OFFSET = (-_MEAN / _STD).astype(np.float32)[:, None, None]
+
+_thread_buffers = threading.local()
+
+
+def decode_image(contents: bytes, size: int = INPUT_SIZE) -> Image.Image:
+    """bytes -> RGB PIL Image, decoded only as large as the model needs.
+
+    JPEG은 draft()로 DCT 단계에서 1/2, 1/4, 1/8 축소 디코딩(결과는 size 이상),
+    그 외 포맷은 size의 2배 이상을 남기는 정수 배율로 reduce() 합니다.
+    """
+    image = Image.open(io.BytesIO(contents))
+    if image.format == 'JPEG':
+        image.draft('RGB', (size, size))
+    image = image.convert('RGB')
+    factor = min(image.width, image.height) // (2 * size)
+    if factor >= 2:
+        image = image.reduce(factor)
+    return image
+
+
+def _preprocess_into(image: Image.Image, out: np.ndarray) -> np.ndarray:
+    """PIL Image -> ImageNet-normalized CHW, written into *out* ([3, H, W] float32)."""
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    img = image.resize((INPUT_SIZE, INPUT_SIZE), Image.BILINEAR)
+    hwc = np.asarray(img, dtype=np.uint8)
+    np.multiply(hwc.transpose(2, 0, 1), _SCALE, out=out)
+    out += _OFFSET
+    return out
 
 
 def _preprocess_image(image: Image.Image) -> np.ndarray:
-    """PIL Image -> NCHW float32 numpy array (ImageNet normalized)."""
-    img = image.resize((224, 224), Image.BILINEAR)
-    arr = np.array(img, dtype=np.float32) / 255.0       # HWC [0,1]
-    arr = (arr - _MEAN) / _STD                           # normalize
-    arr = arr.transpose(2, 0, 1)                         # HWC -> CHW
-    return np.expand_dims(arr, axis=0)                   # NCHW
+    """PIL Image -> NCHW float32 numpy array (ImageNet normalized, new array)."""
+    out = np.empty((1, 3, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+    _preprocess_into(image, out[0])
+    return out
+
 
+def _thread_input_buffer(n: int) -> np.ndarray:
+    """Per-thread reusable [n, 3, 224, 224] buffer (다음 호출에서 덮어씀)."""
+    buf = getattr(_thread_buffers, 'nchw', None)
+    if buf is None or buf.shape[0] < n:
+        buf = np.empty((n, 3, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+        _thread_buffers.nchw = buf
+    return buf[:n]
 
-def _softmax(x: np.ndarray) -> np.ndarray:
-    e = np.exp(x - np.max(x))
-    return e / e.sum()
 
+# ============================================================
+# 출력 head 버퍼 (IOBinding + 세그먼트 단위 후처리)
+# ============================================================
 
-def _sigmoid(x: np.ndarray) -> np.ndarray:
-    return 1.0 / (1.0 + np.exp(-x))
+@dataclass
+class _HeadBuffers:
+    """Per-thread, per-batch-size output buffers and segment index tables.
+
+    head별 logits를 head-major로 이어 붙인 1-D 배열 하나에 받습니다
+    (head h의 [n, C_h] 블록이 연속). 단일 라벨 영역의 세그먼트 하나 = (head, row).
+    """
+    single: np.ndarray             # 단일 라벨 logits (n * sum C)
+    multi: np.ndarray              # 다중 라벨 logits (n * sum C)
+    views: Dict[str, np.ndarray]   # head 이름 -> [n, C] view (IOBinding 출력 위치)
+    seg_starts: np.ndarray         # 세그먼트 시작 위치 (head-major, [H * n])
+    seg_width: np.ndarray          # 세그먼트 길이 (= C_h)
+    seg_of: np.ndarray             # 원소 -> 세그먼트 번호
+    scratch: np.ndarray
+    single_mask: np.ndarray
+    multi_mask: np.ndarray
+    multi_valid: np.ndarray        # 라벨 목록 범위 안의 열인지
+    multi_head: np.ndarray         # 원소 -> 다중 라벨 head 번호
+    multi_row: np.ndarray          # 원소 -> batch row
+    multi_label: np.ndarray        # 원소 -> _multi_labels 인덱스
+    binding: Any = None
+
+
+def _head_width(shape: Any, labels: List[str]) -> int:
+    dim = shape[-1] if shape else None
+    return dim if isinstance(dim, int) else len(labels)
 
 
 # ============================================================
@@ -170,11 +240,13 @@ def _sigmoid(x: np.ndarray) -> np.ndarray:
 # ============================================================
 
 class EfficientNetClassifier:
-    def __init__(self, model_path: str, labels_path: Optional[str] = None):
-        self.session = ort.InferenceSession(
-            model_path,
-            providers=["CPUExecutionProvider"],
-        )
+    def __init__(
+        self,
+        model_path: str,
+        labels_path: Optional[str] = None,
+        session_config: Optional[SessionConfig] = None,
+    ):
+        self.session = create_session(model_path, session_config, name="image")
         self.input_name = self.session.get_inputs()[0].name
         self.output_names = [o.name for o in self.session.get_outputs()]
 
@@ -191,57 +263,210 @@ class EfficientNetClassifier:
             self.single_attrs = SINGLE_LABEL_ATTRS
             self.multi_attrs = MULTI_LABEL_ATTRS
 
+        self._prepare_heads()
         print(f'EfficientNetClassifier loaded (ONNX Runtime)')
 
+    def preprocess(self, image: Image.Image) -> np.ndarray:
+        """PIL Image -> [1, 3, 224, 224] input tensor (새 배열; 다른 스레드로 넘겨도 안전)."""
+        return _preprocess_image(image)
+
+    @timed("effnet_preprocess")
+    def preprocess_batch(self, images: List[Image.Image]) -> np.ndarray:
+        """PIL Images -> [N, 3, 224, 224] in this thread's reusable buffer.
+
+        반환 배열은 같은 스레드의 다음 호출에서 덮어쓰므로 바로 classify_tensors에 넘길 것.
+        """
+        batch = _thread_input_buffer(len(images))
+        for i, image in enumerate(images):
+            _preprocess_into(image, batch[i])
+        return batch
+
     def classify(self, image: Image.Image, yolo_category: str = 'top') -> dict:
-        input_data = _preprocess_image(image)
-        raw_outputs = self.session.run(self.output_names, {self.input_name: input_data})
-        outputs = dict(zip(self.output_names, raw_outputs))
+        return self.classify_batch([image], yolo_category)[0]
+
+    def classify_batch(self, images: List[Image.Image], yolo_category: str = 'top') -> List[dict]:
+        if not images:
+            return []
+        return self.classify_tensors(self.preprocess_batch(images), yolo_category)
+
+    # ------------------------------------------------------------------
+    # 출력 head 준비 / 실행
+    # ------------------------------------------------------------------
+
+    def _prepare_heads(self) -> None:
+        outputs = {o.name: o for o in self.session.get_outputs()}
+        self._single_heads = [
+            (name, _head_width(outputs[name].shape, labels)) for name, labels in self.single_attrs.items()
+        ]
+        self._multi_heads = [
+            (name, _head_width(outputs[name].shape, labels)) for name, labels in self.multi_attrs.items()
+        ]
+        self._head_names = [name for name, _ in self._single_heads + self._multi_heads]
+
+        self._single_label_arrays = [np.array(labels, dtype=object) for labels in self.single_attrs.values()]
+        self._multi_labels = np.array(
+            [label for labels in self.multi_attrs.values() for label in labels], dtype=object
+        )
+        self._multi_label_offsets = np.cumsum([0] + [len(l) for l in self.multi_attrs.values()])[:-1]
 
-        result = {}
-        is_bottom = yolo_category in NO_SLEEVE_COLLAR_PARTS
+        # [batch, C] float 출력만 미리 잡아둔 버퍼에 IOBinding 가능
+        self._bindable = all(
+            len(outputs[name].shape) == 2 and outputs[name].type == 'tensor(float)'
+            for name in self._head_names
+        )
+        self._local = threading.local()
+
+    def _raw_session(self) -> Any:
+        session = self.session
+        return session.session if isinstance(session, BatchingSession) else session
+
+    def _head_buffers(self, n: int) -> _HeadBuffers:
+        cache: Optional[Dict[int, _HeadBuffers]] = getattr(self._local, 'buffers', None)
+        if cache is None or len(cache) > 8:
+            cache = self._local.buffers = {}
+        buf = cache.get(n)
+        if buf is None:
+            buf = cache[n] = self._build_head_buffers(n)
+        return buf
+
+    def _build_head_buffers(self, n: int) -> _HeadBuffers:
+        views: Dict[str, np.ndarray] = {}
+        rows = np.arange(n)
+
+        single = np.empty(n * sum(w for _, w in self._single_heads), dtype=np.float32)
+        starts, widths, off = [], [], 0
+        for name, w in self._single_heads:
+            views[name] = single[off : off + n * w].reshape(n, w)
+            starts.append(off + rows * w)
+            widths.append(np.full(n, w))
+            off += n * w
+        seg_starts = np.concatenate(starts)
+        seg_width = np.concatenate(widths)
+
+        multi = np.empty(n * sum(w for _, w in self._multi_heads), dtype=np.float32)
+        heads, row_of, valid, label_of, off = [], [], [], [], 0
+        for h, ((name, w), labels) in enumerate(zip(self._multi_heads, self.multi_attrs.values())):
+            views[name] = multi[off : off + n * w].reshape(n, w)
+            cols = np.tile(np.arange(w), n)
+            heads.append(np.full(n * w, h))
+            row_of.append(np.repeat(rows, w))
+            valid.append(cols < len(labels))
+            label_of.append(self._multi_label_offsets[h] + np.minimum(cols, max(len(labels) - 1, 0)))
+            off += n * w
+
+        binding = None
+        if self._bindable:
+            binding = self._raw_session().io_binding()
+            for name, view in views.items():
+                binding.bind_output(name, 'cpu', 0, np.float32, list(view.shape), view.ctypes.data)
+
+        return _HeadBuffers(
+            single=single,
+            multi=multi,
+            views=views,
+            seg_starts=seg_starts,
+            seg_width=seg_width,
+            seg_of=np.repeat(np.arange(len(seg_starts)), seg_width),
+            scratch=np.empty_like(single),
+            single_mask=np.empty(single.shape, dtype=bool),
+            multi_mask=np.empty(multi.shape, dtype=bool),
+            multi_valid=np.concatenate(valid) if valid else np.zeros(0, dtype=bool),
+            multi_head=np.concatenate(heads) if heads else np.zeros(0, dtype=np.int64),
+            multi_row=np.concatenate(row_of) if row_of else np.zeros(0, dtype=np.int64),
+            multi_label=np.concatenate(label_of) if label_of else np.zeros(0, dtype=np.int64),
+            binding=binding,
+        )
 
-        # --- 단일 라벨 속성 ---
-        for attr_name, labels in self.single_attrs.items():
-            logits = outputs[attr_name].squeeze()
-            probs = _softmax(logits)
-            idx = int(np.argmax(probs))
-            value = labels[idx]
-            conf = round(float(probs[idx]), 4)
+    @timed("effnet_inference")
+    def _run_heads(self, batch: np.ndarray, buf: _HeadBuffers) -> None:
+        """Run the model so every head's logits land in *buf* (IOBinding when possible)."""
+        n = int(batch.shape[0])
+        session = self.session
+        # 작은 요청은 마이크로 배칭 큐로 보내야 하므로 IOBinding 대신 run()
+        coalesce = isinstance(session, BatchingSession) and not session.runs_direct(n)
+        if buf.binding is not None and not coalesce:
+            buf.binding.bind_cpu_input(self.input_name, np.ascontiguousarray(batch, dtype=np.float32))
+            self._raw_session().run_with_iobinding(buf.binding)
+            return
+        raw_outputs = session.run(self._head_names, {self.input_name: batch})
+        for name, out in zip(self._head_names, raw_outputs):
+            buf.views[name][...] = out.reshape(n, -1)
+
+    def classify_tensors(self, batch: np.ndarray, yolo_category: str = 'top') -> List[dict]:
+        """Classify a preprocessed [N, 3, 224, 224] batch with one session run."""
+        n = int(batch.shape[0])
+        if n == 0:
+            return []
+        buf = self._head_buffers(n)
+        self._run_heads(batch, buf)
+        return self._postprocess(buf, n, yolo_category)
+
+    @timed("effnet_postprocess")
+    def _postprocess(self, buf: _HeadBuffers, n: int, yolo_category: str) -> List[dict]:
+        results: List[dict] = [{} for _ in range(n)]
+        is_bottom = yolo_category in NO_SLEEVE_COLLAR_PARTS
 
+        # --- 단일 라벨 속성: (head, row) 세그먼트별 softmax / argmax ---
+        logits = buf.single
+        seg_max = np.maximum.reduceat(logits, buf.seg_starts)
+        np.take(seg_max, buf.seg_of, out=buf.scratch)
+        np.equal(logits, buf.scratch, out=buf.single_mask)
+        np.subtract(logits, buf.scratch, out=buf.scratch)
+        np.exp(buf.scratch, out=buf.scratch)
+        # argmax 위치의 exp 값은 1 이므로 확률 = 1 / 세그먼트 합
+        confs = np.reciprocal(np.add.reduceat(buf.scratch, buf.seg_starts))
+
+        hits = np.flatnonzero(buf.single_mask)
+        first = hits[np.minimum(np.searchsorted(hits, buf.seg_starts), len(hits) - 1)]
+        idx = np.clip(first - buf.seg_starts, 0, buf.seg_width - 1)
+
+        idx = idx.reshape(len(self._single_heads), n)
+        confs = confs.reshape(len(self._single_heads), n)
+        for h, (attr_name, _) in enumerate(self._single_heads):
             if is_bottom and attr_name in ('소매기장', '옷깃'):
                 continue
 
             field, conf_field = self._field_name(attr_name)
-            result[field] = value
-            result[conf_field] = conf
-
-        # --- 다중 라벨 속성 ---
-        material_values = []
-        for attr_name, labels in self.multi_attrs.items():
-            logits = outputs[attr_name].squeeze()
-            probs = _sigmoid(logits)
-
-            positives = []
-            for label, prob in zip(labels, probs):
-                if float(prob) > 0.5:
-                    positives.append({'value': label, 'confidence': round(float(prob), 4)})
-            if not positives:
-                positives = [{'value': '없음', 'confidence': 0.0}]
-
+            values = self._single_label_arrays[h][idx[h]].tolist()
+            for result, value, conf in zip(results, values, confs[h].tolist()):
+                result[field] = value
+                result[conf_field] = round(conf, 4)
+
+        # --- 다중 라벨 속성: sigmoid > 0.5 를 한 번에 ---
+        probs = buf.multi
+        np.negative(probs, out=probs)
+        np.exp(probs, out=probs)
+        probs += 1.0
+        np.reciprocal(probs, out=probs)
+        np.greater(probs, 0.5, out=buf.multi_mask)
+        buf.multi_mask &= buf.multi_valid
+
+        hits = np.flatnonzero(buf.multi_mask)
+        positives: List[List[List[dict]]] = [[[] for _ in range(n)] for _ in self._multi_heads]
+        for h, r, value, prob in zip(
+            buf.multi_head[hits].tolist(),
+            buf.multi_row[hits].tolist(),
+            self._multi_labels[buf.multi_label[hits]].tolist(),
+            probs[hits].tolist(),
+        ):
+            positives[h][r].append({'value': value, 'confidence': round(prob, 4)})
+
+        material_values: List[List[str]] = [[] for _ in range(n)]
+        for h, (attr_name, _) in enumerate(self._multi_heads):
             field = self._multi_field_name(attr_name)
-            result[field] = positives
-
-            if attr_name == '소재':
-                material_values = [p['value'] for p in positives if p['value'] != '없음']
+            for r, result in enumerate(results):
+                result[field] = positives[h][r] or [{'value': '없음', 'confidence': 0.0}]
+                if attr_name == '소재':
+                    material_values[r] = [p['value'] for p in positives[h][r]]
 
         # --- 날씨 자동 추론 ---
-        sub_type = result.get('sub_type', '')
-        sleeve_length = result.get('sleeve_length', '없음')
-        length = result.get('length', '노멀')
-        result['weather'] = assign_weather(sub_type, sleeve_length, material_values, length)
+        for result, materials in zip(results, material_values):
+            sub_type = result.get('sub_type', '')
+            sleeve_length = result.get('sleeve_length', '없음')
+            length = result.get('length', '노멀')
+            result['weather'] = assign_weather(sub_type, sleeve_length, materials, length)
 
-        return result
+        return results
 
     def _field_name(self, attr_name):
         mapping = {
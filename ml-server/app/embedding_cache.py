@@ -0,0 +1,112 @@
+"""In-process LRU caches for encoder outputs.
+
+임베딩 벡터를 bytes 예산 안에서 LRU로 보관합니다. 키는 인코더 입력
+(피처 행 / 토큰 id 시퀀스)을 그대로 bytes로 만든 값이라 입력이 같으면
+항상 같은 벡터를 돌려줍니다.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class EmbeddingLRUCache:
+    """Thread-safe LRU cache of 1-D float vectors, bounded by total bytes.
+
+    With *ttl_seconds* set, entries older than the TTL count as misses and
+    are dropped on access.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: Optional[float] = None) -> None:
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        self._data: "OrderedDict[Hashable, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @staticmethod
+    def _entry_bytes(key: Hashable, value: np.ndarray) -> int:
+        key_bytes = len(key) if isinstance(key, (bytes, str)) else 64
+        return int(value.nbytes) + key_bytes
+
+    def get_many(self, keys: Sequence[Hashable]) -> List[Optional[np.ndarray]]:
+        """Look up *keys* in order; ``None`` marks a miss."""
+        out: List[Optional[np.ndarray]] = []
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is not None and self.ttl_seconds is not None:
+                    if now - entry[1] > self.ttl_seconds:
+                        del self._data[key]
+                        self._bytes -= self._entry_bytes(key, entry[0])
+                        self.expirations += 1
+                        entry = None
+                if entry is None:
+                    self.misses += 1
+                    out.append(None)
+                else:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    out.append(entry[0])
+        return out
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        return self.get_many([key])[0]
+
+    def put_many(self, keys: Sequence[Hashable], values: np.ndarray) -> None:
+        """Insert rows of *values* under *keys*, evicting LRU entries over budget."""
+        if self.max_bytes <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for key, value in zip(keys, values):
+                value = np.array(value, copy=True)
+                value.setflags(write=False)
+                size = self._entry_bytes(key, value)
+                if size > self.max_bytes:
+                    continue
+                prev = self._data.pop(key, None)
+                if prev is not None:
+                    self._bytes -= self._entry_bytes(key, prev[0])
+                self._data[key] = (value, now)
+                self._bytes += size
+            while self._bytes > self.max_bytes and self._data:
+                old_key, (old_value, _) = self._data.popitem(last=False)
+                self._bytes -= self._entry_bytes(old_key, old_value)
+                self.evictions += 1
+
+    def put(self, key: Hashable, value: np.ndarray) -> None:
+        self.put_many([key], np.asarray(value)[None, ...])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "ttl_seconds": self.ttl_seconds,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,126 @@
+"""Bounded thread executors for CPU-bound request work.
+
+async 핸들러에서 recommend_outfits / classifier.classify를 직접 호출하면
+이벤트 루프가 막혀 같은 워커의 다른 요청이 모두 대기합니다. 이 모듈은
+슬롯 수가 정해진 스레드 풀로 작업을 넘기고, 대기열 깊이와 대기/실행
+시간을 기록해 포화 여부를 볼 수 있게 합니다. (ONNX Runtime은 추론 중
+GIL을 해제하므로 스레드만으로도 병렬성이 생깁니다.)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when an executor's wait queue is full."""
+
+
+class LatencyWindow:
+    """Thread-safe rolling window of millisecond samples (avg / p95 / max)."""
+
+    def __init__(self, window: int = 1024) -> None:
+        self._values: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, ms: float) -> None:
+        with self._lock:
+            self._values.append(ms)
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            values = list(self._values)
+        if not values:
+            return {"avg": None, "p95": None, "max": None}
+        ordered = sorted(values)
+        p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+        return {
+            "avg": round(sum(ordered) / len(ordered), 3),
+            "p95": round(p95, 3),
+            "max": round(ordered[-1], 3),
+        }
+
+
+class BoundedExecutor:
+    """Thread pool with a fixed number of slots, a queue limit and metrics."""
+
+    def __init__(
+        self,
+        name: str,
+        slots: int,
+        max_queue: int = 0,
+        window: int = 1024,
+    ) -> None:
+        self.name = name
+        self.slots = max(1, int(slots))
+        self.max_queue = max(0, int(max_queue))  # 0 = unbounded
+        self._pool = ThreadPoolExecutor(max_workers=self.slots, thread_name_prefix=f"{name}-")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+        self._wait_ms = LatencyWindow(window)
+        self._run_ms = LatencyWindow(window)
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run ``fn(*args, **kwargs)`` on the pool and await its result."""
+        with self._lock:
+            if self.max_queue and self.queued >= self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturated(f"{self.name} executor queue is full ({self.queued})")
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queued)
+        submitted = time.perf_counter()
+
+        def _task() -> T:
+            started = time.perf_counter()
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+            self._wait_ms.add((started - submitted) * 1000.0)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+                self._run_ms.add((finished - started) * 1000.0)
+
+        # contextvars(요청별 metrics 등)를 워커 스레드로 전달
+        future = self._pool.submit(contextvars.copy_context().run, _task)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Client went away before a slot freed up: drop the queued task.
+            if future.cancel():
+                with self._lock:
+                    self.queued -= 1
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "max_queue_depth": self.max_queue_depth,
+                "wait_ms": self._wait_ms.summary(),
+                "run_ms": self._run_ms.summary(),
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,22 +1,105 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import io
+import json
 import os
-from typing import Any, Dict, List, Optional, Literal
+import time
+import zipfile
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Literal, Tuple
 
+import numpy as np
 from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from PIL import Image
 from pydantic import BaseModel, Field
 
-from .model_loader import ArtifactsBundle, load_artifacts
-from .predictor import recommend_outfits
-from .efficientnet_classifier import EfficientNetClassifier
+from .model_loader import (
+    DEFAULT_ITEM_CACHE_BYTES,
+    DEFAULT_TEXT_CACHE_BYTES,
+    DEFAULT_TEXT_CACHE_TTL,
+    ArtifactsBundle,
+    load_artifacts,
+)
+from .analysis_cache import (
+    DEFAULT_ANALYSIS_CACHE_ENTRIES,
+    DEFAULT_COLOR_TOLERANCE,
+    DEFAULT_HAMMING_THRESHOLD,
+    AnalysisCache,
+    color_signature,
+    dhash,
+)
+from .closet_store import DEFAULT_CLOSET_STORE_BYTES, ClosetStore, ClosetVersionMismatch, StoredCloset
+from .executors import BoundedExecutor, ExecutorSaturated, LatencyWindow
+from .metrics import ServerTimingMiddleware, registry as metrics_registry, stage
+from .micro_batching import BatchingSession, wrap_session
+from .onnx_session import SessionConfig, describe_sessions
+from .predictor import (
+    PreparedCloset,
+    RecommendContext,
+    get_feature_resolvers,
+    plan_for_closet,
+    plan_outfits,
+    recommend_for_closet,
+    recommend_multi_for_closet,
+    recommend_outfits,
+    recommend_outfits_multi,
+    rescore_for_closet,
+    rescore_outfits,
+)
+from .match_harmony import HP_NAMES
+from .efficientnet_classifier import EfficientNetClassifier, decode_image
 
 
 app = FastAPI(title="OOTD Recommendation API")
+# 단계별 지연 histogram + Server-Timing (METRICS_SAMPLE_RATE=0 이면 측정 안 함)
+metrics_registry.sample_rate = min(1.0, max(0.0, float(os.getenv("METRICS_SAMPLE_RATE", "1"))))
+app.add_middleware(ServerTimingMiddleware)
 
 artifacts: Optional[ArtifactsBundle] = None
 classifier: Optional[EfficientNetClassifier] = None
+closet_store = ClosetStore(
+    int(os.getenv("CLOSET_STORE_BYTES", str(DEFAULT_CLOSET_STORE_BYTES))),
+    graph_dir=os.getenv("CLOSET_GRAPH_DIR") or None,
+)
+# 같은/재인코딩된 이미지 재분석 방지 (SHA-256 → dHash 순으로 조회)
+analysis_cache = AnalysisCache(
+    max_entries=int(os.getenv("ANALYSIS_CACHE_ENTRIES", str(DEFAULT_ANALYSIS_CACHE_ENTRIES))),
+    hamming_threshold=int(os.getenv("ANALYSIS_CACHE_HAMMING", str(DEFAULT_HAMMING_THRESHOLD))),
+    color_tolerance=int(os.getenv("ANALYSIS_CACHE_COLOR_TOLERANCE", str(DEFAULT_COLOR_TOLERANCE))),
+)
+
+# CPU 작업은 이벤트 루프 밖 전용 스레드 풀에서 실행 (슬롯 수 / 대기열 상한 설정 가능)
+_EXECUTOR_MAX_QUEUE = int(os.getenv("EXECUTOR_MAX_QUEUE", "64"))
+recommend_executor = BoundedExecutor(
+    "recommend", int(os.getenv("RECOMMEND_EXECUTOR_SLOTS", "4")), max_queue=_EXECUTOR_MAX_QUEUE
+)
+analyze_executor = BoundedExecutor(
+    "analyze", int(os.getenv("ANALYZE_EXECUTOR_SLOTS", "2")), max_queue=_EXECUTOR_MAX_QUEUE
+)
+# /analyze/batch 이미지 디코딩/전처리 전용 (요청당 이미지 수가 상한이라 대기열 무제한)
+decode_executor = BoundedExecutor("decode", int(os.getenv("DECODE_EXECUTOR_SLOTS", "4")))
+
+# /analyze 단계별 지연 (디코딩 / 전처리 / 추론 분리)
+analyze_timings: Dict[str, LatencyWindow] = {
+    "decode_ms": LatencyWindow(),
+    "preprocess_ms": LatencyWindow(),
+    "inference_ms": LatencyWindow(),
+    "batch_inference_ms": LatencyWindow(),
+}
+
+RECOMMEND_MULTI_MAX_CONTEXTS = int(os.getenv("RECOMMEND_MULTI_MAX_CONTEXTS", "16"))
+RECOMMEND_PLAN_MAX_DAYS = int(os.getenv("RECOMMEND_PLAN_MAX_DAYS", "14"))
+RECOMMEND_EXPLORE_MAX_VECTORS = int(os.getenv("RECOMMEND_EXPLORE_MAX_VECTORS", "1024"))
+
+ANALYZE_BATCH_MAX_IMAGES = int(os.getenv("ANALYZE_BATCH_MAX_IMAGES", "256"))
+ANALYZE_BATCH_CHUNK = max(1, int(os.getenv("ANALYZE_BATCH_CHUNK", "16")))
+ANALYZE_BATCH_MAX_IMAGE_BYTES = int(os.getenv("ANALYZE_BATCH_MAX_IMAGE_BYTES", str(20 * 1024 * 1024)))
+# zip 전체 상한 (압축 해제 전에 중앙 디렉터리 값으로 검사)
+ANALYZE_BATCH_MAX_ARCHIVE_BYTES = int(os.getenv("ANALYZE_BATCH_MAX_ARCHIVE_BYTES", str(512 * 1024 * 1024)))
+ANALYZE_BATCH_MAX_ARCHIVE_MEMBERS = int(os.getenv("ANALYZE_BATCH_MAX_ARCHIVE_MEMBERS", "4096"))
 
 
 class WeatherPayload(BaseModel):
@@ -39,9 +122,11 @@ class ClosetItemPayload(BaseModel):
     dominant_color_lab: Optional[List[float]] = None  # Phase 2: pre-computed LAB
 
 
-class RecommendRequest(BaseModel):
-    user_context: UserContextPayload
-    closet_items: List[ClosetItemPayload]
+class RecommendOptions(BaseModel):
+    closet_items: List[ClosetItemPayload] = Field(default_factory=list)
+    # 서버 저장 옷장 사용 시 closet_items 대신 전달 (closet_version 불일치 시 409)
+    closet_id: Optional[str] = None
+    closet_version: Optional[str] = None
     top_k: int = 10
     # 하이퍼파라미터 (기본값 = match_harmony.py 모듈 상수)
     alpha_tb: float = 0.65
@@ -51,6 +136,45 @@ class RecommendRequest(BaseModel):
     lambda_tbset: float = 0.15
 
 
+class RecommendRequest(RecommendOptions):
+    user_context: UserContextPayload
+
+
+class MultiRecommendRequest(RecommendOptions):
+    # 같은 옷장에 대한 여러 무드/날씨 (예: 데일리/데이트/출근 칩)
+    contexts: List[UserContextPayload] = Field(min_length=1)
+
+
+class PlanDayPayload(BaseModel):
+    date: Optional[str] = None
+    weather: WeatherPayload
+    # 생략 시 요청의 text / comment 사용
+    text: Optional[str] = None
+    comment: Optional[str] = None
+
+
+class PlanRecommendRequest(RecommendOptions):
+    text: str
+    comment: str = ""
+    days: List[PlanDayPayload] = Field(min_length=1)
+    # 앞선 날의 1순위 코디와 겹치는 코디를 MMR로 밀어내고 같은 코디는 제외
+    no_repeat: bool = True
+
+
+class HyperparameterVector(BaseModel):
+    # 생략한 값은 요청의 하이퍼파라미터 사용
+    alpha_tb: Optional[float] = None
+    alpha_oi: Optional[float] = None
+    mmr_lambda: Optional[float] = None
+    beta_tb: Optional[float] = None
+    lambda_tbset: Optional[float] = None
+
+
+class ExploreRecommendRequest(RecommendRequest):
+    # 온라인 튜닝용: 하이퍼파라미터 벡터 S개를 같은 후보 집합으로 한 번에 채점
+    hyperparameters: List[HyperparameterVector] = Field(min_length=1)
+
+
 class RecommendationRow(BaseModel):
     outfit_type: Literal["two_piece", "dress"] = "two_piece"
     top_id: Optional[str] = None
@@ -64,6 +188,62 @@ class RecommendationRow(BaseModel):
 class RecommendResponse(BaseModel):
     selected_items: Dict[str, List[str]] = Field(default_factory=dict)
     recommendations: List[RecommendationRow]
+    closet_version: Optional[str] = None
+
+
+class MultiRecommendResult(BaseModel):
+    text: str
+    selected_items: Dict[str, List[str]] = Field(default_factory=dict)
+    recommendations: List[RecommendationRow]
+
+
+class MultiRecommendResponse(BaseModel):
+    results: List[MultiRecommendResult]
+    closet_version: Optional[str] = None
+
+
+class ExploreRow(BaseModel):
+    outfit_type: Literal["two_piece", "dress"] = "two_piece"
+    top_id: Optional[str] = None
+    bottom_id: Optional[str] = None
+    dress_id: Optional[str] = None
+    outer_id: Optional[str] = None
+    score: float
+
+
+class ExploreResult(BaseModel):
+    hyperparameters: Dict[str, float]
+    recommendations: List[ExploreRow]
+
+
+class ExploreRecommendResponse(BaseModel):
+    selected_items: Dict[str, List[str]] = Field(default_factory=dict)
+    results: List[ExploreResult]
+    closet_version: Optional[str] = None
+
+
+class PlanDayResult(BaseModel):
+    date: Optional[str] = None
+    text: str
+    temperature: float
+    weather_label: str
+    selected_items: Dict[str, List[str]] = Field(default_factory=dict)
+    recommendations: List[RecommendationRow]
+
+
+class PlanRecommendResponse(BaseModel):
+    days: List[PlanDayResult]
+    closet_version: Optional[str] = None
+
+
+class ClosetUpsertRequest(BaseModel):
+    items: List[ClosetItemPayload]
+
+
+class ClosetSummary(BaseModel):
+    closet_id: str
+    version: str
+    item_count: int
 
 
 @app.on_event("startup")
@@ -74,7 +254,29 @@ async def startup_event() -> None:
         or os.getenv("MODEL_ARTIFACTS_PATH")
         or None
     )
-    artifacts = load_artifacts(artifacts_path=artifacts_path)
+    item_cache_bytes = int(os.getenv("ITEM_EMB_CACHE_BYTES", str(DEFAULT_ITEM_CACHE_BYTES)))
+    artifacts = load_artifacts(
+        artifacts_path=artifacts_path,
+        item_cache_bytes=item_cache_bytes,
+        text_cache_bytes=int(os.getenv("TEXT_EMB_CACHE_BYTES", str(DEFAULT_TEXT_CACHE_BYTES))),
+        text_cache_ttl=float(os.getenv("TEXT_EMB_CACHE_TTL", str(DEFAULT_TEXT_CACHE_TTL))),
+        # ORT_<MODEL>_* → ORT_* 환경 변수 (스레드 수, 실행 모드, 그래프 최적화 캐시 등)
+        text_session_config=SessionConfig.from_env("TEXT"),
+        item_session_config=SessionConfig.from_env("ITEM"),
+        text_length_buckets=[
+            int(v) for v in os.getenv("TEXT_LENGTH_BUCKETS", "4,8,16").split(",") if v.strip()
+        ],
+    )
+    get_feature_resolvers(artifacts)
+
+    # 동시 요청을 모아 한 번에 run() (MICROBATCH_MAX_WAIT_MS=0 이면 끔)
+    batch_wait_ms = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))
+    artifacts.text_session = wrap_session(
+        artifacts.text_session, "text", int(os.getenv("TEXT_MICROBATCH_MAX", "64")), batch_wait_ms
+    )
+    artifacts.item_session = wrap_session(
+        artifacts.item_session, "item", int(os.getenv("ITEM_MICROBATCH_MAX", "2048")), batch_wait_ms
+    )
 
     # EfficientNet 이미지 분석 모델 로드 (ONNX)
     effnet_path = os.getenv("EFFNET_MODEL_PATH", "ml-server/app/efficientnet_kfashion.onnx")
@@ -82,13 +284,86 @@ async def startup_event() -> None:
         effnet_path = "/app/app/efficientnet_kfashion.onnx"
     if os.path.exists(effnet_path):
         try:
-            classifier = EfficientNetClassifier(effnet_path)
+            classifier = EfficientNetClassifier(
+                effnet_path, session_config=SessionConfig.from_env("IMAGE")
+            )
+            classifier.session = wrap_session(
+                classifier.session, "image", int(os.getenv("IMAGE_MICROBATCH_MAX", "16")), batch_wait_ms
+            )
         except Exception as exc:
             print(f"EfficientNet load failed: {exc}")
     else:
         print(f"EfficientNet model not found: {effnet_path}")
 
 
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    recommend_executor.shutdown()
+    analyze_executor.shutdown()
+    decode_executor.shutdown()
+    closet_store.close(timeout=10.0)  # 대기 중인 호환성 그래프 저장 마무리
+
+
+def recommend_options(request: RecommendOptions) -> Dict[str, Any]:
+    """top_k + 하이퍼파라미터 keyword args shared by /recommend and /recommend/multi."""
+    return dict(
+        top_k=int(request.top_k or 10),
+        alpha_tb=request.alpha_tb,
+        alpha_oi=request.alpha_oi,
+        mmr_lambda=request.mmr_lambda,
+        beta_tb=request.beta_tb,
+        lambda_tbset=request.lambda_tbset,
+    )
+
+
+def recommend_context(context: UserContextPayload) -> RecommendContext:
+    return RecommendContext(
+        mood=context.text.strip(),
+        comment=context.comment or "",
+        temperature=float(context.weather.temperature or 0.0),
+    )
+
+
+def recommend_params(request: RecommendRequest) -> Dict[str, Any]:
+    """recommend_outfits / recommend_for_closet keyword args for a /recommend body."""
+    ctx = recommend_context(request.user_context)
+    return dict(
+        mood=ctx.mood,
+        comment=ctx.comment,
+        temperature=ctx.temperature,
+        **recommend_options(request),
+    )
+
+
+class _PinnedCloset:
+    """요청 하나가 보는 서버 저장 옷장 (한 version으로 고정).
+
+    version 확인과 준비된 스냅샷 읽기는 closet_store.prepared_for 안에서 옷장
+    lock을 잡은 채 하고, 같은 요청의 이후 호출(multi/plan의 날씨 라벨별)도
+    처음 읽은 version과 같아야 합니다. 응답의 closet_version은 이 값입니다.
+    """
+
+    def __init__(self, stored: StoredCloset, expected_version: Optional[str]) -> None:
+        self.stored = stored
+        self.version = expected_version or None
+
+    def __call__(self, temperature: float) -> Tuple[PreparedCloset, np.ndarray]:
+        closet, item_embs, self.version = closet_store.prepared_for(
+            self.stored, artifacts, temperature, expected_version=self.version
+        )
+        return closet, item_embs
+
+
+def _stored_closet(request: RecommendOptions) -> Optional[_PinnedCloset]:
+    """closet_id로 지정된 서버 저장 옷장 (404 처리, version 불일치는 실행 중 409)."""
+    if not request.closet_id:
+        return None
+    stored = closet_store.get(request.closet_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail=f"closet not found: {request.closet_id}")
+    return _PinnedCloset(stored, request.closet_version)
+
+
 @app.post("/recommend", response_model=RecommendResponse)
 async def recommend(request: RecommendRequest) -> RecommendResponse:
     if artifacts is None:
@@ -98,28 +373,267 @@ async def recommend(request: RecommendRequest) -> RecommendResponse:
     if len(mood) < 2:
         raise HTTPException(status_code=400, detail="text must be at least 2 characters")
 
-    try:
-        result = recommend_outfits(
+    stored = _stored_closet(request)
+    params = recommend_params(request)
+    temperature = params["temperature"]
+
+    def _run() -> Dict[str, Any]:
+        if stored is not None:
+            closet, item_embs = stored(temperature)
+            return recommend_for_closet(artifacts, closet, item_embs=item_embs, **params)
+        return recommend_outfits(
             bundle=artifacts,
-            mood=mood,
-            comment=request.user_context.comment or "",
-            temperature=float(request.user_context.weather.temperature or 0.0),
             closet_items=[item.model_dump() for item in request.closet_items],
-            top_k=int(request.top_k or 10),
-            alpha_tb=request.alpha_tb,
-            alpha_oi=request.alpha_oi,
-            mmr_lambda=request.mmr_lambda,
-            beta_tb=request.beta_tb,
-            lambda_tbset=request.lambda_tbset,
+            **params,
         )
+
+    try:
+        result = await recommend_executor.run(_run)
         return RecommendResponse(
             selected_items=result.get("selected_items", {}),
             recommendations=result.get("recommendations", []),
+            closet_version=stored.version if stored is not None else None,
         )
+    except ExecutorSaturated as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    except ClosetVersionMismatch as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
+@app.post("/recommend/multi", response_model=MultiRecommendResponse)
+async def recommend_multi(request: MultiRecommendRequest) -> MultiRecommendResponse:
+    """한 옷장 × 여러 context: 옷장 준비/아이템 인코딩 1회, 쿼리 인코딩 1 batch."""
+    if artifacts is None:
+        raise HTTPException(status_code=500, detail="model artifacts not loaded")
+    if len(request.contexts) > RECOMMEND_MULTI_MAX_CONTEXTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"too many contexts: {len(request.contexts)} > {RECOMMEND_MULTI_MAX_CONTEXTS}",
+        )
+
+    contexts = [recommend_context(c) for c in request.contexts]
+    for i, ctx in enumerate(contexts):
+        if len(ctx.mood) < 2:
+            raise HTTPException(status_code=400, detail=f"contexts[{i}].text must be at least 2 characters")
+
+    stored = _stored_closet(request)
+    options = recommend_options(request)
+
+    def _run() -> List[Dict[str, Any]]:
+        if stored is not None:
+            return recommend_multi_for_closet(
+                artifacts,
+                contexts,
+                stored,
+                **options,
+            )
+        return recommend_outfits_multi(
+            artifacts,
+            contexts,
+            closet_items=[item.model_dump() for item in request.closet_items],
+            **options,
+        )
+
+    try:
+        results = await recommend_executor.run(_run)
+        return MultiRecommendResponse(
+            results=[
+                MultiRecommendResult(
+                    text=ctx.mood,
+                    selected_items=result.get("selected_items", {}),
+                    recommendations=result.get("recommendations", []),
+                )
+                for ctx, result in zip(contexts, results)
+            ],
+            closet_version=stored.version if stored is not None else None,
+        )
+    except ExecutorSaturated as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    except ClosetVersionMismatch as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+@app.post("/recommend/plan", response_model=PlanRecommendResponse)
+async def recommend_plan(request: PlanRecommendRequest) -> PlanRecommendResponse:
+    """며칠치 예보 → 날짜별 코디. 날씨 라벨이 같은 날은 옷장/임베딩/조합 점수 공유."""
+    if artifacts is None:
+        raise HTTPException(status_code=500, detail="model artifacts not loaded")
+    if len(request.days) > RECOMMEND_PLAN_MAX_DAYS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"too many days: {len(request.days)} > {RECOMMEND_PLAN_MAX_DAYS}",
+        )
+
+    days = [
+        RecommendContext(
+            mood=(day.text if day.text is not None else request.text).strip(),
+            comment=day.comment if day.comment is not None else request.comment,
+            temperature=float(day.weather.temperature or 0.0),
+        )
+        for day in request.days
+    ]
+    for i, day in enumerate(days):
+        if len(day.mood) < 2:
+            raise HTTPException(status_code=400, detail=f"days[{i}] text must be at least 2 characters")
+
+    stored = _stored_closet(request)
+    options = recommend_options(request)
+
+    def _run() -> List[Dict[str, Any]]:
+        if stored is not None:
+            return plan_for_closet(
+                artifacts,
+                days,
+                stored,
+                no_repeat=request.no_repeat,
+                **options,
+            )
+        return plan_outfits(
+            artifacts,
+            days,
+            closet_items=[item.model_dump() for item in request.closet_items],
+            no_repeat=request.no_repeat,
+            **options,
+        )
+
+    try:
+        results = await recommend_executor.run(_run)
+        return PlanRecommendResponse(
+            days=[
+                PlanDayResult(
+                    date=payload.date,
+                    text=day.mood,
+                    temperature=day.temperature,
+                    weather_label=result["weather_label"],
+                    selected_items=result.get("selected_items", {}),
+                    recommendations=result.get("recommendations", []),
+                )
+                for payload, day, result in zip(request.days, days, results)
+            ],
+            closet_version=stored.version if stored is not None else None,
+        )
+    except ExecutorSaturated as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    except ClosetVersionMismatch as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+@app.post("/recommend/explore", response_model=ExploreRecommendResponse)
+async def recommend_explore(request: ExploreRecommendRequest) -> ExploreRecommendResponse:
+    """한 쿼리 × 하이퍼파라미터 벡터 S개: 조합 feature 1회, 점수는 [S, 8] @ [8, C] 한 번."""
+    if artifacts is None:
+        raise HTTPException(status_code=500, detail="model artifacts not loaded")
+    if len(request.hyperparameters) > RECOMMEND_EXPLORE_MAX_VECTORS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"too many hyperparameter vectors: {len(request.hyperparameters)} > {RECOMMEND_EXPLORE_MAX_VECTORS}",
+        )
+
+    mood = request.user_context.text.strip()
+    if len(mood) < 2:
+        raise HTTPException(status_code=400, detail="text must be at least 2 characters")
+
+    stored = _stored_closet(request)
+    ctx = recommend_context(request.user_context)
+    top_k = int(request.top_k or 10)
+    hps = np.array(
+        [
+            [getattr(v, name) if getattr(v, name) is not None else getattr(request, name) for name in HP_NAMES]
+            for v in request.hyperparameters
+        ],
+        dtype=np.float64,
+    )
+
+    def _run() -> Dict[str, Any]:
+        if stored is not None:
+            closet, item_embs = stored(ctx.temperature)
+            return rescore_for_closet(
+                artifacts, closet, ctx.mood, ctx.comment, ctx.temperature, hps, top_k=top_k, item_embs=item_embs
+            )
+        return rescore_outfits(
+            artifacts,
+            ctx.mood,
+            ctx.comment,
+            ctx.temperature,
+            closet_items=[item.model_dump() for item in request.closet_items],
+            hyperparameters=hps,
+            top_k=top_k,
+        )
+
+    try:
+        result = await recommend_executor.run(_run)
+        return ExploreRecommendResponse(
+            selected_items=result.get("selected_items", {}),
+            results=[
+                ExploreResult(hyperparameters=dict(zip(HP_NAMES, map(float, row))), recommendations=recs)
+                for row, recs in zip(hps, result["results"])
+            ],
+            closet_version=stored.version if stored is not None else None,
+        )
+    except ExecutorSaturated as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    except ClosetVersionMismatch as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+@app.put("/closets/{closet_id}/items", response_model=ClosetSummary)
+async def upsert_closet_items(closet_id: str, request: ClosetUpsertRequest) -> ClosetSummary:
+    """옷장 아이템 추가/수정 (id 기준 upsert)"""
+    items = [item.model_dump() for item in request.items]
+
+    # 옷장 lock은 추천 준비(prepared_for) 동안 잡혀 있으므로 이벤트 루프 밖에서 대기
+    def _run() -> Dict[str, Any]:
+        return closet_store.upsert_items(closet_id, items).summary()
+
+    try:
+        return ClosetSummary(**await recommend_executor.run(_run))
+    except ExecutorSaturated as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+
+
+@app.delete("/closets/{closet_id}/items/{item_id}", response_model=ClosetSummary)
+async def delete_closet_item(closet_id: str, item_id: str) -> ClosetSummary:
+    def _run() -> Optional[Dict[str, Any]]:
+        closet = closet_store.delete_items(closet_id, [item_id])
+        return closet.summary() if closet is not None else None
+
+    try:
+        summary = await recommend_executor.run(_run)
+    except ExecutorSaturated as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"closet not found: {closet_id}")
+    return ClosetSummary(**summary)
+
+
+@app.get("/closets/{closet_id}", response_model=ClosetSummary)
+async def get_closet(closet_id: str) -> ClosetSummary:
+    closet = closet_store.get(closet_id)
+    if closet is None:
+        raise HTTPException(status_code=404, detail=f"closet not found: {closet_id}")
+    return ClosetSummary(**closet.summary())
+
+
+@app.delete("/closets/{closet_id}")
+async def delete_closet(closet_id: str) -> Dict[str, Any]:
+    # 진행 중인 그래프 파일 쓰기가 끝나야 파일을 지우므로 이벤트 루프 밖에서
+    try:
+        dropped = await recommend_executor.run(closet_store.drop, closet_id)
+    except ExecutorSaturated as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    if not dropped:
+        raise HTTPException(status_code=404, detail=f"closet not found: {closet_id}")
+    return {"closet_id": closet_id, "deleted": True}
+
+
 PART_TO_CATEGORY = {
     "top": "top",
     "bottom": "bottom",
@@ -136,45 +650,284 @@ async def analyze(image: UploadFile = File(...)) -> Dict[str, Any]:
 
     try:
         contents = await image.read()
-        pil_image = Image.open(io.BytesIO(contents)).convert("RGB")
     except Exception as exc:
         raise HTTPException(status_code=400, detail=f"이미지 읽기 실패: {exc}") from exc
 
     try:
-        # 기본 yolo_category = 'top' (YOLO 미사용 시)
-        result = classifier.classify(pil_image, yolo_category="top")
-
-        # sub_type에서 카테고리 역추론 (카테고리→part 매핑)
-        sub_type = result.get("sub_type", "")
-        from .efficientnet_classifier import YOLO_TO_KR
-        # sub_type 기반으로 part 추론
-        category = _infer_category_from_sub_type(sub_type)
-
-        return {
-            "category": category,
-            "detection_confidence": result.get("sub_type_confidence", 0.5),
-            "sub_type": sub_type,
-            "sub_type_confidence": result.get("sub_type_confidence"),
-            "color": result.get("color"),
-            "color_confidence": result.get("color_confidence"),
-            "sub_color": result.get("sub_color"),
-            "sub_color_confidence": result.get("sub_color_confidence"),
-            "sleeve_length": result.get("sleeve_length"),
-            "sleeve_length_confidence": result.get("sleeve_length_confidence"),
-            "length": result.get("length"),
-            "length_confidence": result.get("length_confidence"),
-            "fit": result.get("fit"),
-            "fit_confidence": result.get("fit_confidence"),
-            "collar": result.get("collar"),
-            "collar_confidence": result.get("collar_confidence"),
-            "material": result.get("material"),
-            "print": result.get("print"),
-            "detail": result.get("detail"),
-        }
+        return await analyze_executor.run(_analyze_contents, classifier, contents)
+    except ExecutorSaturated as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    except _ImageDecodeError as exc:
+        raise HTTPException(status_code=400, detail=f"이미지 읽기 실패: {exc}") from exc
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
+class _ImageDecodeError(ValueError):
+    pass
+
+
+def _decode_image(contents: bytes) -> Image.Image:
+    started = time.perf_counter()
+    try:
+        with stage("decode"):
+            image = decode_image(contents)
+    except Exception as exc:
+        raise _ImageDecodeError(str(exc)) from exc
+    analyze_timings["decode_ms"].add((time.perf_counter() - started) * 1000.0)
+    return image
+
+
+def _analyze_contents(clf: EfficientNetClassifier, contents: bytes) -> Dict[str, Any]:
+    """Decode + classify one upload (runs on analyze_executor)."""
+    sha = hashlib.sha256(contents).digest()
+    cached = analysis_cache.get_exact(sha)
+    if cached is not None:
+        return _analysis_response(cached)
+
+    pil_image = _decode_image(contents)
+    phash, colors = dhash(pil_image), color_signature(pil_image)
+    cached = analysis_cache.get_similar(phash, colors)
+    if cached is not None:
+        analysis_cache.put(sha, phash, colors, cached)
+        return _analysis_response(cached)
+
+    started = time.perf_counter()
+    batch = clf.preprocess_batch([pil_image])  # 스레드별 재사용 버퍼
+    preprocessed = time.perf_counter()
+    # 기본 yolo_category = 'top' (YOLO 미사용 시)
+    result = clf.classify_tensors(batch, yolo_category="top")[0]
+    finished = time.perf_counter()
+
+    analyze_timings["preprocess_ms"].add((preprocessed - started) * 1000.0)
+    analyze_timings["inference_ms"].add((finished - preprocessed) * 1000.0)
+    analysis_cache.put(sha, phash, colors, result)
+    return _analysis_response(result)
+
+
+# ----------------------------------------------------------------------------
+# /analyze/batch
+# ----------------------------------------------------------------------------
+
+class _BatchTooLarge(ValueError):
+    pass
+
+
+_ARCHIVE_IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif")
+
+
+def _extract_archive(
+    contents: bytes, max_images: int = ANALYZE_BATCH_MAX_IMAGES
+) -> List[Tuple[str, Optional[bytes]]]:
+    """zip 안의 이미지 파일을 (이름, bytes) 목록으로. 너무 큰 항목은 bytes=None.
+
+    *max_images*는 같은 요청의 multipart 이미지 수를 뺀 남은 한도입니다.
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(contents))
+    except zipfile.BadZipFile as exc:
+        raise _ImageDecodeError(f"zip 읽기 실패: {exc}") from exc
+
+    entries: List[Tuple[str, Optional[bytes]]] = []
+    with archive:
+        members = archive.infolist()
+        if len(members) > ANALYZE_BATCH_MAX_ARCHIVE_MEMBERS:
+            raise _BatchTooLarge(f"too many archive members (max {ANALYZE_BATCH_MAX_ARCHIVE_MEMBERS})")
+
+        # 읽기 전에 압축 해제 크기 합계 확인 (zip bomb 방지; 읽기는 file_size에서 멈춤)
+        images = [
+            info
+            for info in members
+            if not info.is_dir()
+            and not info.filename.startswith("__MACOSX/")
+            and info.filename.lower().endswith(_ARCHIVE_IMAGE_EXTS)
+        ]
+        if len(images) > max_images:
+            raise _BatchTooLarge(f"too many images (max {ANALYZE_BATCH_MAX_IMAGES})")
+        total = sum(info.file_size for info in images if info.file_size <= ANALYZE_BATCH_MAX_IMAGE_BYTES)
+        if total > ANALYZE_BATCH_MAX_ARCHIVE_BYTES:
+            raise _BatchTooLarge(f"archive too large when extracted (max {ANALYZE_BATCH_MAX_ARCHIVE_BYTES} bytes)")
+
+        for info in images:
+            if info.file_size > ANALYZE_BATCH_MAX_IMAGE_BYTES:
+                entries.append((info.filename, None))
+            else:
+                entries.append((info.filename, archive.read(info)))
+    return entries
+
+
+@dataclass
+class _DecodedUpload:
+    sha: bytes
+    phash: int = 0
+    colors: Optional[np.ndarray] = None           # color_signature (dHash hit 판정용)
+    tensor: Optional[np.ndarray] = None           # [1, 3, 224, 224], 캐시 miss일 때만
+    cached: Optional[Dict[str, Any]] = None       # 캐시 hit 결과 (classify 원본)
+
+
+def _decode_and_preprocess(clf: EfficientNetClassifier, contents: Optional[bytes]) -> _DecodedUpload:
+    """bytes -> cache hit 또는 [1, 3, 224, 224] (runs on decode_executor)."""
+    if contents is None:
+        raise _ImageDecodeError(f"image exceeds {ANALYZE_BATCH_MAX_IMAGE_BYTES} bytes")
+    sha = hashlib.sha256(contents).digest()
+    cached = analysis_cache.get_exact(sha)
+    if cached is not None:
+        return _DecodedUpload(sha, cached=cached)
+
+    image = _decode_image(contents)
+    phash, colors = dhash(image), color_signature(image)
+    cached = analysis_cache.get_similar(phash, colors)
+    if cached is not None:
+        analysis_cache.put(sha, phash, colors, cached)
+        return _DecodedUpload(sha, phash, colors, cached=cached)
+
+    started = time.perf_counter()
+    tensor = clf.preprocess(image)  # 다른 스레드로 넘어가므로 새 배열
+    analyze_timings["preprocess_ms"].add((time.perf_counter() - started) * 1000.0)
+    return _DecodedUpload(sha, phash, colors, tensor=tensor)
+
+
+def _classify_chunk(
+    clf: EfficientNetClassifier, batch: np.ndarray, decoded: List[_DecodedUpload]
+) -> List[Dict[str, Any]]:
+    """One session.run for a stacked chunk (runs on analyze_executor)."""
+    started = time.perf_counter()
+    results = clf.classify_tensors(batch, yolo_category="top")
+    analyze_timings["batch_inference_ms"].add((time.perf_counter() - started) * 1000.0)
+    for upload, result in zip(decoded, results):
+        analysis_cache.put(upload.sha, upload.phash, upload.colors, result)
+    return [_analysis_response(r) for r in results]
+
+
+def _ndjson(obj: Dict[str, Any]) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def _stream_batch_analysis(
+    clf: EfficientNetClassifier, uploads: List[Tuple[str, Optional[bytes]]]
+) -> AsyncIterator[bytes]:
+    """디코딩은 병렬로, 분류는 ANALYZE_BATCH_CHUNK 단위 배치로. 끝나는 순서대로 한 줄씩."""
+
+    async def _decode(index: int, name: str, contents: Optional[bytes]):
+        try:
+            return index, name, await decode_executor.run(_decode_and_preprocess, clf, contents), None
+        except Exception as exc:
+            return index, name, None, f"이미지 읽기 실패: {exc}"
+
+    tasks = [asyncio.ensure_future(_decode(i, name, data)) for i, (name, data) in enumerate(uploads)]
+    chunk: List[Tuple[int, str, _DecodedUpload]] = []
+    remaining = len(tasks)
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, name, decoded, error = await next_done
+            remaining -= 1
+            if error is not None:
+                yield _ndjson({"index": index, "filename": name, "status": "error", "detail": error})
+            elif decoded.cached is not None:
+                yield _ndjson(
+                    {"index": index, "filename": name, "status": "ok", "result": _analysis_response(decoded.cached)}
+                )
+            else:
+                chunk.append((index, name, decoded))
+
+            if chunk and (len(chunk) >= ANALYZE_BATCH_CHUNK or remaining == 0):
+                batch = np.concatenate([d.tensor for _, _, d in chunk], axis=0)
+                try:
+                    results = await analyze_executor.run(
+                        _classify_chunk, clf, batch, [d for _, _, d in chunk]
+                    )
+                    lines = [
+                        {"index": i, "filename": n, "status": "ok", "result": r}
+                        for (i, n, _), r in zip(chunk, results)
+                    ]
+                except Exception as exc:
+                    lines = [
+                        {"index": i, "filename": n, "status": "error", "detail": str(exc)}
+                        for i, n, _ in chunk
+                    ]
+                chunk = []
+                for line in lines:
+                    yield _ndjson(line)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@app.post("/analyze/batch")
+async def analyze_batch(
+    images: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None),
+) -> StreamingResponse:
+    """여러 이미지(multipart 다중 파일 또는 zip) 분석 → NDJSON 스트림.
+
+    각 줄: {"index", "filename", "status": "ok", "result": /analyze 응답}
+           또는 {"index", "filename", "status": "error", "detail"}
+    결과는 완료 순서대로 나오므로 index로 매칭합니다.
+    """
+    if classifier is None:
+        raise HTTPException(status_code=503, detail="EfficientNet model not loaded")
+
+    images = images or []
+    if len(images) > ANALYZE_BATCH_MAX_IMAGES:
+        raise HTTPException(
+            status_code=413, detail=f"too many images (max {ANALYZE_BATCH_MAX_IMAGES})"
+        )
+
+    uploads: List[Tuple[str, Optional[bytes]]] = []
+    try:
+        for upload in images:
+            # 상한 + 1 bytes까지만 읽음: 넘으면 zip 항목처럼 bytes=None (해당 줄만 에러)
+            data = await upload.read(ANALYZE_BATCH_MAX_IMAGE_BYTES + 1)
+            name = upload.filename or f"image_{len(uploads)}"
+            uploads.append((name, data if len(data) <= ANALYZE_BATCH_MAX_IMAGE_BYTES else None))
+        if archive is not None:
+            uploads.extend(
+                await decode_executor.run(
+                    _extract_archive, await archive.read(), ANALYZE_BATCH_MAX_IMAGES - len(images)
+                )
+            )
+    except _BatchTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"이미지 읽기 실패: {exc}") from exc
+
+    if not uploads:
+        raise HTTPException(status_code=400, detail="no images provided")
+
+    return StreamingResponse(
+        _stream_batch_analysis(classifier, uploads), media_type="application/x-ndjson"
+    )
+
+
+def _analysis_response(result: Dict[str, Any]) -> Dict[str, Any]:
+    # sub_type에서 카테고리 역추론 (카테고리→part 매핑)
+    sub_type = result.get("sub_type", "")
+    # sub_type 기반으로 part 추론
+    category = _infer_category_from_sub_type(sub_type)
+
+    return {
+        "category": category,
+        "detection_confidence": result.get("sub_type_confidence", 0.5),
+        "sub_type": sub_type,
+        "sub_type_confidence": result.get("sub_type_confidence"),
+        "color": result.get("color"),
+        "color_confidence": result.get("color_confidence"),
+        "sub_color": result.get("sub_color"),
+        "sub_color_confidence": result.get("sub_color_confidence"),
+        "sleeve_length": result.get("sleeve_length"),
+        "sleeve_length_confidence": result.get("sleeve_length_confidence"),
+        "length": result.get("length"),
+        "length_confidence": result.get("length_confidence"),
+        "fit": result.get("fit"),
+        "fit_confidence": result.get("fit_confidence"),
+        "collar": result.get("collar"),
+        "collar_confidence": result.get("collar_confidence"),
+        "material": result.get("material"),
+        "print": result.get("print"),
+        "detail": result.get("detail"),
+    }
+
+
 # sub_type(카테고리) → part(top/bottom/outer/dress) 매핑
 _SUB_TYPE_TO_PART = {
     "티셔츠": "top", "셔츠": "top", "블라우스": "top", "니트웨어": "top",
@@ -191,6 +944,14 @@ def _infer_category_from_sub_type(sub_type: str) -> str:
     return _SUB_TYPE_TO_PART.get(sub_type, "top")
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Prometheus text format (단계별 histogram, 옷장 크기/후보 수 gauge)"""
+    return PlainTextResponse(
+        metrics_registry.render_prometheus(), media_type="text/plain; version=0.0.4"
+    )
+
+
 @app.get("/health")
 async def health() -> Dict[str, Any]:
     return {
@@ -198,6 +959,30 @@ async def health() -> Dict[str, Any]:
         "model_loaded": artifacts is not None,
         "classifier_loaded": classifier is not None,
         "feature_cols": artifacts.feature_cols if artifacts else [],
+        "item_emb_cache": (
+            artifacts.item_cache.stats() if artifacts and artifacts.item_cache else None
+        ),
+        "text_emb_cache": (
+            artifacts.text_cache.stats() if artifacts and artifacts.text_cache else None
+        ),
+        "closet_store": closet_store.stats(),
+        "micro_batching": {
+            name: session.stats()
+            for name, session in (
+                ("text", artifacts.text_session if artifacts else None),
+                ("item", artifacts.item_session if artifacts else None),
+                ("image", classifier.session if classifier else None),
+            )
+            if isinstance(session, BatchingSession)
+        },
+        "onnx_sessions": describe_sessions(),
+        "analysis_cache": analysis_cache.stats(),
+        "analyze_timings": {name: window.summary() for name, window in analyze_timings.items()},
+        "executors": {
+            "recommend": recommend_executor.stats(),
+            "analyze": analyze_executor.stats(),
+            "decode": decode_executor.stats(),
+        },
     }
 
 
@@ -6,14 +6,19 @@ Match harmony scoring for outfit recommendation.
 """
 
 import numpy as np
-from typing import Dict, List, Optional, Set
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 
+from .metrics import timed
+from .compat_graph import CompatibilityView
 from .color_harmony import (
     ItemColorInfo,
     TopBottomSet,
     InnerCandidate,
     FinalOutfit,
     harmony_score_lab,
+    harmony_matrix_for,
+    top_l_flat_indices,
 )
 
 # ---------------------------------------------------------------------------
@@ -27,6 +32,9 @@ LAMBDA_TBSET = 0.15
 MMR_LAMBDA = 0.75
 MMR_MAX_CANDIDATES = 400
 
+# rescore_hyperparameters 입력 열 순서
+HP_NAMES = ("alpha_tb", "alpha_oi", "mmr_lambda", "beta_tb", "lambda_tbset")
+
 # ---------------------------------------------------------------------------
 # Embedding Utility Functions
 # ---------------------------------------------------------------------------
@@ -65,6 +73,34 @@ def emb_sim_01(iid1: str, iid2: str, emb_by_id: Dict[str, np.ndarray]) -> float:
     return 0.5 * (sim + 1.0)
 
 
+def emb_sim_matrix_01(
+    ids_a: List[str],
+    ids_b: List[str],
+    emb_by_id: Dict[str, np.ndarray],
+) -> np.ndarray:
+    """Pairwise :func:`emb_sim_01` as an ``[len(ids_a), len(ids_b)]`` matrix."""
+    out = np.full((len(ids_a), len(ids_b)), 0.5, dtype=np.float64)
+    if emb_by_id is None or out.size == 0:
+        return out
+
+    def _gather(ids: List[str]):
+        rows = [emb_by_id.get(str(i)) for i in ids]
+        mask = np.array([r is not None for r in rows], dtype=bool)
+        if not mask.any():
+            return None, mask
+        mat = np.stack([r for r in rows if r is not None])
+        return mat, mask
+
+    ea, mask_a = _gather(ids_a)
+    eb, mask_b = _gather(ids_b)
+    if ea is None or eb is None:
+        return out
+
+    sim = (ea @ eb.T).astype(np.float64)
+    out[np.ix_(mask_a, mask_b)] = 0.5 * (sim + 1.0)
+    return out
+
+
 def mix_score(color_s: float, emb_s01: float, alpha: float) -> float:
     return float(alpha * color_s + (1.0 - alpha) * emb_s01)
 
@@ -73,23 +109,38 @@ def mix_score(color_s: float, emb_s01: float, alpha: float) -> float:
 # Step 2: Top-Bottom set matching
 # ---------------------------------------------------------------------------
 
+@timed("build_top_bottom_sets_with_emb")
 def build_top_bottom_sets_with_emb(
     top_colors: List[ItemColorInfo],
     bottom_colors: List[ItemColorInfo],
     emb_by_id: Dict[str, np.ndarray],
     L: int = 7,
     alpha_tb: float = ALPHA_TB,
+    compat: Optional[CompatibilityView] = None,
 ) -> List[TopBottomSet]:
-    combos: List[TopBottomSet] = []
-    for t in top_colors:
-        for b in bottom_colors:
-            c = harmony_score_lab(t.lab, b.lab)
-            e = emb_sim_01(t.item_id, b.item_id, emb_by_id)
-            s = mix_score(c, e, alpha_tb)
-            combos.append(TopBottomSet(top_id=t.item_id, bottom_id=b.item_id, harmony=s))
+    """Top-*L* top x bottom pairs; *compat* serves the pair blocks from the closet graph."""
+    if not top_colors or not bottom_colors:
+        return []
 
-    combos.sort(key=lambda x: x.harmony, reverse=True)
-    return combos[:min(L, len(combos))]
+    top_ids = [t.item_id for t in top_colors]
+    bottom_ids = [b.item_id for b in bottom_colors]
+    blocks = compat.blocks(top_ids, bottom_ids) if compat is not None else None
+    if blocks is not None:
+        c, e = blocks
+    else:
+        c = harmony_matrix_for(top_colors, bottom_colors)
+        e = emb_sim_matrix_01(top_ids, bottom_ids, emb_by_id)
+    scores = alpha_tb * c + (1.0 - alpha_tb) * e
+
+    n_b = len(bottom_colors)
+    return [
+        TopBottomSet(
+            top_id=top_colors[k // n_b].item_id,
+            bottom_id=bottom_colors[k % n_b].item_id,
+            harmony=float(scores.flat[k]),
+        )
+        for k in top_l_flat_indices(scores, L)
+    ]
 
 
 # ---------------------------------------------------------------------------
@@ -133,6 +184,7 @@ def _outer_inner_score_with_emb(
         raise ValueError(f"Unknown inner kind: {inner.kind}")
 
 
+@timed("build_final_outfits_with_match")
 def build_final_outfits_with_match(
     outer_colors: List[ItemColorInfo],
     inner_candidates: List[InnerCandidate],
@@ -142,23 +194,69 @@ def build_final_outfits_with_match(
     alpha_oi: float = ALPHA_OI,
     beta_tb: float = BETA_TB,
     lambda_tbset: float = LAMBDA_TBSET,
+    compat: Optional[CompatibilityView] = None,
 ) -> List[FinalOutfit]:
-    all_combos: List[FinalOutfit] = []
-    for o in outer_colors:
-        for inner in inner_candidates:
-            s = _outer_inner_score_with_emb(
-                outer=o,
-                inner=inner,
-                color_index=color_index,
-                emb_by_id=emb_by_id,
-                alpha_oi=alpha_oi,
-                beta_tb=beta_tb,
-                lambda_tbset=lambda_tbset,
-            )
-            all_combos.append(FinalOutfit(outer_id=o.item_id, inner=inner, score=s))
-
-    all_combos.sort(key=lambda x: x.score, reverse=True)
-    return all_combos[: M * 2]
+    """Score every outer x inner pair as one matrix and keep the top ``2M``.
+
+    Matrix form of :func:`_outer_inner_score_with_emb`: harmony and embedding
+    similarity are gathered from one closet-level matrix each (or sliced from
+    *compat*, the closet's compatibility graph), mixed with ``alpha_oi``/
+    ``beta_tb``/``lambda_tbset`` as array ops, and only the surviving
+    combinations are materialized as :class:`FinalOutfit`.
+    """
+    if not outer_colors or not inner_candidates:
+        return []
+
+    for inner in inner_candidates:
+        if inner.kind not in ("dress", "two_piece"):
+            raise ValueError(f"Unknown inner kind: {inner.kind}")
+
+    # 요청 단위 closet 행렬: 등장하는 아이템마다 한 번씩만 계산
+    pos: Dict[str, int] = {}
+    infos: List[ItemColorInfo] = []
+
+    def _slot(item_id: str, info: Optional[ItemColorInfo] = None) -> int:
+        if item_id not in pos:
+            pos[item_id] = len(infos)
+            infos.append(info if info is not None else color_index[item_id])
+        return pos[item_id]
+
+    outer_rows = np.array([_slot(o.item_id, o) for o in outer_colors], dtype=np.intp)
+    first = np.array([_slot(inner.ids[0]) for inner in inner_candidates], dtype=np.intp)
+    second = np.array([_slot(inner.ids[-1]) for inner in inner_candidates], dtype=np.intp)
+    is_dress = np.array([inner.kind == "dress" for inner in inner_candidates], dtype=bool)
+    inner_h = np.array([inner.inner_harmony for inner in inner_candidates], dtype=np.float64)
+
+    ids = [ic.item_id for ic in infos]
+    inner_cols = np.unique(np.concatenate([first, second]))
+    blocks = (
+        compat.blocks([o.item_id for o in outer_colors], [ids[c] for c in inner_cols])
+        if compat is not None
+        else None
+    )
+    if blocks is not None:
+        # outer 행 x inner 아이템 열만 그래프에서 읽음
+        pair = np.zeros((len(outer_colors), len(infos)), dtype=np.float64)
+        pair[:, inner_cols] = alpha_oi * blocks[0] + (1.0 - alpha_oi) * blocks[1]
+    else:
+        harmony = harmony_matrix_for(infos, infos)
+        gram01 = emb_sim_matrix_01(ids, ids, emb_by_id)
+        pair = (alpha_oi * harmony + (1.0 - alpha_oi) * gram01)[outer_rows]
+
+    s_first = pair[:, first]
+    s_second = pair[:, second]
+    two_piece = beta_tb * s_first + (1.0 - beta_tb) * s_second + lambda_tbset * inner_h
+    scores = np.where(is_dress[None, :], s_first, two_piece)
+
+    n_inner = len(inner_candidates)
+    return [
+        FinalOutfit(
+            outer_id=outer_colors[k // n_inner].item_id,
+            inner=inner_candidates[k % n_inner],
+            score=float(scores.flat[k]),
+        )
+        for k in top_l_flat_indices(scores, M * 2)
+    ]
 
 
 # ---------------------------------------------------------------------------
@@ -174,11 +272,6 @@ def _outfit_item_set(outfit: FinalOutfit) -> Set[str]:
     return s
 
 
-def _jaccard(a: Set[str], b: Set[str]) -> float:
-    union = len(a | b)
-    return 0.0 if union == 0 else len(a & b) / union
-
-
 def _minmax_norm(xs: List[float], eps: float = 1e-12) -> List[float]:
     mn, mx = min(xs), max(xs)
     if mx - mn < eps:
@@ -186,44 +279,333 @@ def _minmax_norm(xs: List[float], eps: float = 1e-12) -> List[float]:
     return [(x - mn) / (mx - mn) for x in xs]
 
 
+def _outfit_index_matrix(
+    outfits: List[FinalOutfit], extra: Sequence[Set[str]] = ()
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Item sets as a ``[N, W]`` int index matrix (``-1`` padded) plus set sizes.
+
+    *extra* item sets are appended as rows after the outfits (same vocabulary).
+    """
+    vocab: Dict[str, int] = {}
+    rows = [
+        [vocab.setdefault(iid, len(vocab)) for iid in items]
+        for items in [_outfit_item_set(o) for o in outfits] + [set(map(str, e)) for e in extra]
+    ]
+    width = max((len(r) for r in rows), default=0) or 1
+    mat = np.full((len(rows), width), -1, dtype=np.int64)
+    for i, row in enumerate(rows):
+        mat[i, : len(row)] = row
+    sizes = np.array([len(r) for r in rows], dtype=np.int64)
+    return mat, sizes
+
+
+def _jaccard_to(item_idx: np.ndarray, sizes: np.ndarray, picked: np.ndarray) -> np.ndarray:
+    """Jaccard overlap of every row of *item_idx* with the item index set *picked*."""
+    inter = np.isin(item_idx, picked).sum(axis=1)
+    union = sizes + picked.size - inter
+    return np.divide(inter, union, out=np.zeros(len(sizes)), where=union > 0)
+
+
+@timed("apply_mmr_reranking")
 def apply_mmr_reranking(
     outfits: List[FinalOutfit],
     M: int,
     lamb: float = MMR_LAMBDA,
     max_candidates: int = MMR_MAX_CANDIDATES,
     minmax_normalize: bool = True,
+    history: Sequence[Set[str]] = (),
 ) -> List[FinalOutfit]:
+    """Greedy MMR selection with an incrementally maintained max-overlap vector.
+
+    Each step only computes Jaccard overlap against the outfit selected in the
+    previous step, so the cost is O(M * N) instead of O(M^2 * N) set ops.
+    Selections are identical to the pairwise formulation.
+
+    *history* holds item-id sets picked elsewhere (e.g. earlier days of a plan):
+    they seed the max-overlap vector as if already selected, and outfits whose
+    item set equals one of them are excluded.
+    """
     if not outfits:
         return []
 
     cand = outfits[: min(max_candidates, len(outfits))]
-    cand_sets = [_outfit_item_set(o) for o in cand]
+    all_idx, all_sizes = _outfit_index_matrix(cand, history)
+    item_idx, sizes = all_idx[: len(cand)], all_sizes[: len(cand)]
 
     raw_scores = [float(o.score) for o in cand]
-    q_scores = _minmax_norm(raw_scores) if minmax_normalize else raw_scores
+    q_scores = np.asarray(
+        _minmax_norm(raw_scores) if minmax_normalize else raw_scores, dtype=np.float64
+    )
 
     selected: List[FinalOutfit] = []
-    selected_sets: List[Set[str]] = []
-    used = [False] * len(cand)
-
-    while len(selected) < M:
-        best_val = -1e18
-        best_i = None
-
-        for i, (cs, qs) in enumerate(zip(cand_sets, q_scores)):
-            if used[i]:
-                continue
-            max_dup = max((_jaccard(cs, ss) for ss in selected_sets), default=0.0)
-            val = lamb * qs - (1.0 - lamb) * max_dup
-            if val > best_val:
-                best_val = val
-                best_i = i
-
-        if best_i is None:
+    used = np.zeros(len(cand), dtype=bool)
+    max_dup = np.zeros(len(cand), dtype=np.float64)
+
+    for row in all_idx[len(cand):]:
+        dup = _jaccard_to(item_idx, sizes, row[row >= 0])
+        used |= dup >= 1.0
+        np.maximum(max_dup, dup, out=max_dup)
+
+    while len(selected) < M and not used.all():
+        vals = lamb * q_scores - (1.0 - lamb) * max_dup
+        vals[used] = -np.inf
+        best_i = int(np.argmax(vals))
+        if not vals[best_i] > -1e18:
             break
 
         used[best_i] = True
         selected.append(cand[best_i])
-        selected_sets.append(cand_sets[best_i])
+
+        picked = item_idx[best_i][item_idx[best_i] >= 0]
+        np.maximum(max_dup, _jaccard_to(item_idx, sizes, picked), out=max_dup)
 
     return selected
+
+
+# ---------------------------------------------------------------------------
+# Hyperparameter-vectorized re-scoring
+# ---------------------------------------------------------------------------
+#
+# 조합 점수는 하이퍼파라미터에 대해 선형인 항들의 합입니다.
+#   two_piece: beta*(a_oi*c_ot + (1-a_oi)*e_ot) + (1-beta)*(a_oi*c_ob + (1-a_oi)*e_ob)
+#              + lambda_tbset*(a_tb*c_tb + (1-a_tb)*e_tb)
+#   dress:     a_oi*c_od + (1-a_oi)*e_od
+# (c = 색상 조화, e = 임베딩 유사도[0,1]) 따라서 조합마다 feature 8개
+# [c_ot, e_ot, c_ob, e_ob, c_tb, e_tb, c_od, e_od]를 한 번 구해 두면 S개의
+# 하이퍼파라미터 벡터 점수는 [S, 8] @ [8, C] 곱 하나입니다.
+
+@dataclass
+class ComboFeatures:
+    """Every outer x (dress | top x bottom) combination over fixed candidate lists.
+
+    Combination ``c`` is outer ``c // n_inner`` with inner ``c % n_inner``;
+    inners are the dresses first, then every top x bottom pair (row-major).
+    """
+
+    outer_ids: List[str]
+    top_ids: List[str]
+    bottom_ids: List[str]
+    dress_ids: List[str]
+    features: np.ndarray  # float64 [C, 8]
+    tb_features: np.ndarray  # float64 [P, 2], (c_tb, e_tb) per top x bottom pair
+    combo_tb: np.ndarray  # int64 [C], tb pair index or -1 for dresses
+    jaccard: np.ndarray  # float64 [C, C], item-set overlap between combinations
+
+    @property
+    def n_inner(self) -> int:
+        return len(self.dress_ids) + len(self.top_ids) * len(self.bottom_ids)
+
+    def __len__(self) -> int:
+        return int(self.features.shape[0])
+
+    def combo(self, c: int) -> Tuple[Optional[str], str, Tuple[str, ...]]:
+        """``(outer_id, kind, inner ids)`` of combination *c*."""
+        outer, inner = divmod(int(c), self.n_inner)
+        n_d = len(self.dress_ids)
+        if inner < n_d:
+            return self.outer_ids[outer], "dress", (self.dress_ids[inner],)
+        t, b = divmod(inner - n_d, len(self.bottom_ids))
+        return self.outer_ids[outer], "two_piece", (self.top_ids[t], self.bottom_ids[b])
+
+
+@timed("build_combo_features")
+def build_combo_features(
+    outer_colors: List[ItemColorInfo],
+    top_colors: List[ItemColorInfo],
+    bottom_colors: List[ItemColorInfo],
+    dress_colors: List[ItemColorInfo],
+    emb_by_id: Dict[str, np.ndarray],
+    compat: Optional[CompatibilityView] = None,
+) -> ComboFeatures:
+    """Hyperparameter-independent score terms for every combination.
+
+    *compat*가 있으면 필요한 블록(상의 x 하의, 아우터 x 안쪽)만 옷장 그래프에서 읽습니다.
+    """
+    infos = outer_colors + top_colors + bottom_colors + dress_colors
+    ids = [ic.item_id for ic in infos]
+
+    n_o, n_t, n_b, n_d = len(outer_colors), len(top_colors), len(bottom_colors), len(dress_colors)
+    o = np.arange(n_o)
+    t = n_o + np.arange(n_t)
+    b = n_o + n_t + np.arange(n_b)
+    d = n_o + n_t + n_b + np.arange(n_d)
+
+    tb_blocks = oi_blocks = None
+    if compat is not None:
+        tb_blocks = compat.blocks(ids[n_o : n_o + n_t], ids[n_o + n_t : n_o + n_t + n_b])
+        oi_blocks = compat.blocks(ids[:n_o], ids[n_o:])
+    if tb_blocks is not None and oi_blocks is not None:
+        harmony = np.zeros((len(ids), len(ids)), dtype=np.float64)
+        gram01 = np.zeros((len(ids), len(ids)), dtype=np.float64)
+        harmony[np.ix_(t, b)], gram01[np.ix_(t, b)] = tb_blocks
+        harmony[:n_o, n_o:], gram01[:n_o, n_o:] = oi_blocks
+    else:
+        harmony = harmony_matrix_for(infos, infos) if infos else np.zeros((0, 0))
+        gram01 = emb_sim_matrix_01(ids, ids, emb_by_id)
+
+    # top x bottom 쌍 (row-major)
+    tb_t = np.repeat(t, n_b)
+    tb_b = np.tile(b, n_t)
+    tb_features = np.stack([harmony[tb_t, tb_b], gram01[tb_t, tb_b]], axis=1) if tb_t.size else np.zeros((0, 2))
+
+    n_inner = n_d + tb_t.size
+    co = np.repeat(o, n_inner)
+    ci = np.tile(np.arange(n_inner), n_o)
+    is_dress = ci < n_d
+    tb_idx = np.where(is_dress, -1, ci - n_d)
+    first = np.where(is_dress, d[np.minimum(ci, n_d - 1)] if n_d else 0, tb_t[np.maximum(tb_idx, 0)] if tb_t.size else 0)
+    second = np.where(is_dress, first, tb_b[np.maximum(tb_idx, 0)] if tb_t.size else 0)
+
+    features = np.zeros((co.size, 8), dtype=np.float64)
+    if co.size:
+        tp = ~is_dress
+        features[tp, 0] = harmony[co[tp], first[tp]]
+        features[tp, 1] = gram01[co[tp], first[tp]]
+        features[tp, 2] = harmony[co[tp], second[tp]]
+        features[tp, 3] = gram01[co[tp], second[tp]]
+        features[tp, 4:6] = tb_features[tb_idx[tp]]
+        features[is_dress, 6] = harmony[co[is_dress], first[is_dress]]
+        features[is_dress, 7] = gram01[co[is_dress], first[is_dress]]
+
+    # 조합 간 Jaccard: 조합당 아이템 2~3개 멤버십 행렬로 한 번에
+    member = np.zeros((co.size, len(infos)), dtype=np.float64)
+    rows = np.arange(co.size)
+    member[rows, co] = 1.0
+    member[rows, first] = 1.0
+    member[rows, second] = 1.0
+    inter = member @ member.T
+    sizes = member.sum(axis=1)
+    union = sizes[:, None] + sizes[None, :] - inter
+    jaccard = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+    return ComboFeatures(
+        outer_ids=[ic.item_id for ic in outer_colors],
+        top_ids=[ic.item_id for ic in top_colors],
+        bottom_ids=[ic.item_id for ic in bottom_colors],
+        dress_ids=[ic.item_id for ic in dress_colors],
+        features=features,
+        tb_features=tb_features,
+        combo_tb=tb_idx.astype(np.int64),
+        jaccard=jaccard,
+    )
+
+
+def hyperparameter_weights(hps: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """``[S, 5]`` (HP_NAMES order) -> top/bottom weights ``[S, 2]`` and combo weights ``[S, 8]``."""
+    hps = np.atleast_2d(np.asarray(hps, dtype=np.float64))
+    a_tb, a_oi, _, beta, lset = (hps[:, i] for i in range(len(HP_NAMES)))
+    w_tb = np.stack([a_tb, 1.0 - a_tb], axis=1)
+    w = np.stack(
+        [
+            beta * a_oi,
+            beta * (1.0 - a_oi),
+            (1.0 - beta) * a_oi,
+            (1.0 - beta) * (1.0 - a_oi),
+            lset * a_tb,
+            lset * (1.0 - a_tb),
+            a_oi,
+            1.0 - a_oi,
+        ],
+        axis=1,
+    )
+    return w_tb, w
+
+
+def batched_top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Per-row :func:`top_l_flat_indices`: ``[S, k]`` column indices, ``-1`` where ``-inf``."""
+    k = min(max(int(k), 0), scores.shape[1])
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    picked = np.take_along_axis(scores, order, axis=1)
+    return np.where(np.isfinite(picked), order, -1)
+
+
+def batched_mmr(
+    cand: np.ndarray,
+    cand_scores: np.ndarray,
+    jaccard: np.ndarray,
+    M: int,
+    lamb: np.ndarray,
+    minmax_normalize: bool = True,
+    eps: float = 1e-12,
+) -> np.ndarray:
+    """:func:`apply_mmr_reranking` for S candidate lists at once.
+
+    *cand* ``[S, K]`` combination indices (``-1`` = empty slot), *cand_scores*
+    their scores, *jaccard* the ``[C, C]`` overlap matrix. Returns ``[S, M]``
+    positions into *cand* in selection order (``-1`` padded).
+    """
+    S, K = cand.shape
+    out = np.full((S, M), -1, dtype=np.int64)
+    if K == 0:
+        return out
+    valid = cand >= 0
+    q = np.where(valid, cand_scores, 0.0)
+    if minmax_normalize:
+        mn = np.where(valid, cand_scores, np.inf).min(axis=1, keepdims=True)
+        mx = np.where(valid, cand_scores, -np.inf).max(axis=1, keepdims=True)
+        span = mx - mn
+        flat = ~(span >= eps)
+        q = np.where(flat, 0.5, (q - mn) / np.where(flat, 1.0, span))
+
+    safe = np.where(valid, cand, 0)
+    jac = jaccard[safe[:, :, None], safe[:, None, :]]  # [S, K, K]
+    lamb = np.asarray(lamb, dtype=np.float64).reshape(-1, 1)
+    used = ~valid
+    max_dup = np.zeros((S, K), dtype=np.float64)
+    rows = np.arange(S)
+
+    for step in range(M):
+        vals = lamb * q - (1.0 - lamb) * max_dup
+        vals[used] = -np.inf
+        best = np.argmax(vals, axis=1)
+        ok = vals[rows, best] > -1e18
+        if not ok.any():
+            break
+        r, bi = rows[ok], best[ok]
+        out[r, step] = bi
+        used[r, bi] = True
+        max_dup[r] = np.maximum(max_dup[r], jac[r, bi])
+    return out
+
+
+@timed("rescore_hyperparameters")
+def rescore_hyperparameters(
+    combos: ComboFeatures,
+    hps: np.ndarray,
+    M: int,
+    L: int = 7,
+    minmax_normalize: bool = True,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Score, cut and MMR-rerank *combos* for every row of *hps* (``[S, 5]``).
+
+    Per row this reproduces build_top_bottom_sets_with_emb (top-*L* pairs) →
+    build_final_outfits_with_match (top ``2M``) → apply_mmr_reranking.
+    Returns combination indices ``[S, M]`` (``-1`` padded) and their scores.
+    """
+    hps = np.atleast_2d(np.asarray(hps, dtype=np.float64))
+    S = hps.shape[0]
+    empty = np.full((S, M), -1, dtype=np.int64), np.zeros((S, M), dtype=np.float64)
+    if len(combos) == 0:
+        return empty
+
+    w_tb, w = hyperparameter_weights(hps)
+    scores = w @ combos.features.T  # [S, C]
+
+    if combos.tb_features.shape[0]:
+        tb_scores = w_tb @ combos.tb_features.T  # [S, P]
+        keep = np.zeros(tb_scores.shape, dtype=bool)
+        top_tb = batched_top_k(tb_scores, L)
+        np.put_along_axis(keep, np.maximum(top_tb, 0), top_tb >= 0, axis=1)
+        tp = combos.combo_tb >= 0
+        allowed = np.ones(scores.shape, dtype=bool)
+        allowed[:, tp] = keep[:, combos.combo_tb[tp]]
+        scores = np.where(allowed, scores, -np.inf)
+
+    cand = batched_top_k(scores, M * 2)
+    cand_scores = np.take_along_axis(scores, np.maximum(cand, 0), axis=1)
+    pos = batched_mmr(cand, cand_scores, combos.jaccard, M, hps[:, HP_NAMES.index("mmr_lambda")], minmax_normalize)
+
+    safe = np.maximum(pos, 0)
+    selected = np.where(pos >= 0, np.take_along_axis(cand, safe, axis=1), -1)
+    selected_scores = np.where(pos >= 0, np.take_along_axis(cand_scores, safe, axis=1), 0.0)
+    return selected, selected_scores
@@ -0,0 +1,246 @@
+"""Per-stage latency histograms, gauges, Prometheus export and Server-Timing.
+
+추천/분석 파이프라인의 단계마다 ``with stage("encode_text"):`` 또는
+``@timed("apply_mmr_reranking")``로 시간을 잽니다. 측정은 샘플링된 요청
+안에서만 일어납니다: 요청 시작 시 ContextVar에 RequestTimings를 올려두고,
+샘플링되지 않은 요청(또는 요청 밖 호출)은 ContextVar 조회 한 번 후 공용
+no-op 컨텍스트를 돌려받습니다.
+
+- ``/metrics``: Prometheus text format (histogram + gauge)
+- 응답 헤더 ``Server-Timing``: 요청 하나의 단계별 합계 (ms)
+
+BoundedExecutor가 contextvars를 복사해 넘기므로 스레드 풀 안의 단계도 잡힙니다.
+"""
+
+from __future__ import annotations
+
+import bisect
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# seconds (Prometheus 관례)
+STAGE_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+_METRIC_PREFIX = "ootd"
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, n_buckets: int) -> None:
+        self.counts = [0] * (n_buckets + 1)  # 마지막 = +Inf
+        self.total = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """Stage histograms + last-value gauges, guarded by one lock."""
+
+    def __init__(self, sample_rate: float = 1.0, buckets: Tuple[float, ...] = STAGE_BUCKETS) -> None:
+        self.sample_rate = min(1.0, max(0.0, float(sample_rate)))
+        self.buckets = tuple(buckets)
+        self._stages: Dict[str, _Histogram] = {}
+        self._gauges: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._lock = threading.Lock()
+
+    def sampled(self) -> bool:
+        rate = self.sample_rate
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+    def observe_stage(self, name: str, seconds: float) -> None:
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            hist = self._stages.get(name)
+            if hist is None:
+                hist = self._stages[name] = _Histogram(len(self.buckets))
+            hist.counts[i] += 1
+            hist.total += seconds
+            hist.count += 1
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = float(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+            self._gauges.clear()
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            stages = {
+                name: (list(h.counts), h.total, h.count) for name, h in sorted(self._stages.items())
+            }
+            gauges = sorted(self._gauges.items())
+
+        lines: List[str] = []
+        metric = f"{_METRIC_PREFIX}_stage_duration_seconds"
+        lines.append(f"# HELP {metric} Time spent per pipeline stage.")
+        lines.append(f"# TYPE {metric} histogram")
+        for name, (counts, total, count) in stages.items():
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{stage="{name}",le="+Inf"}} {count}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {total:.9g}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {count}')
+
+        typed: set = set()
+        for (name, labels), value in gauges:
+            metric = f"{_METRIC_PREFIX}_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} gauge")
+                typed.add(metric)
+            label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{metric}{{{label_str}}} {value:g}" if label_str else f"{metric} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# ----------------------------------------------------------------------------
+# 요청 단위 수집
+# ----------------------------------------------------------------------------
+
+class RequestTimings:
+    """Stage totals (ms) for one sampled request, in first-seen order."""
+
+    __slots__ = ("stages", "_lock")
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, ms: float) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    def server_timing(self) -> str:
+        with self._lock:
+            return ", ".join(f"{name};dur={ms:.3f}" for name, ms in self.stages.items())
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("ootd_request_timings", default=None)
+
+
+class _Stage:
+    __slots__ = ("timings", "name", "started")
+
+    def __init__(self, timings: RequestTimings, name: str) -> None:
+        self.timings = timings
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self) -> "_Stage":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        elapsed = time.perf_counter() - self.started
+        self.timings.add(self.name, elapsed * 1000.0)
+        registry.observe_stage(self.name, elapsed)
+
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopStage":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NOOP = _NoopStage()
+
+
+def stage(name: str) -> Any:
+    """Context manager timing *name* inside a sampled request (no-op otherwise)."""
+    timings = _current.get()
+    if timings is None:
+        return _NOOP
+    return _Stage(timings, name)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorator form of :func:`stage`."""
+
+    def decorator(fn: F) -> F:
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            timings = _current.get()
+            if timings is None:
+                return fn(*args, **kwargs)
+            with _Stage(timings, name):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+@contextmanager
+def collect_stages() -> Iterator[RequestTimings]:
+    """Time the enclosed calls as one sampled request (벤치마크 / 오프라인 측정용)."""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def gauge(name: str, value: float, **labels: str) -> None:
+    """Set a gauge (closet size, candidate counts) from a sampled request."""
+    if _current.get() is not None:
+        registry.set_gauge(name, value, **labels)
+
+
+# ----------------------------------------------------------------------------
+# ASGI middleware: 샘플링 결정 + Server-Timing 헤더
+# ----------------------------------------------------------------------------
+
+class ServerTimingMiddleware:
+    """Pure ASGI middleware; adds ``Server-Timing`` to sampled HTTP responses.
+
+    헤더는 응답 시작 시점까지 기록된 단계만 담습니다 (스트리밍 응답은 일부).
+    """
+
+    def __init__(self, app: Any, skip_paths: Tuple[str, ...] = ("/metrics", "/health")) -> None:
+        self.app = app
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope.get("path") in self.skip_paths or not registry.sampled():
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+
+        async def _send(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                timings.add("total", (time.perf_counter() - started) * 1000.0)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _current.reset(token)
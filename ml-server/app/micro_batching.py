@@ -0,0 +1,165 @@
+"""Dynamic micro-batching in front of ONNX Runtime sessions.
+
+모든 ONNX 모델(text / item / EfficientNet)은 batch 축이 동적이지만 요청마다
+따로 run()을 호출합니다. BatchingSession은 InferenceSession.run과 같은
+인터페이스로 요청을 받아, max_wait_ms 동안 들어온 같은 모양의 요청들을
+batch 축으로 이어 붙여 한 번에 실행하고 결과를 잘라 돌려줍니다.
+
+호출자는 (executor 스레드에서) 결과가 나올 때까지 블록됩니다.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+
+@dataclass
+class _Pending:
+    key: Hashable
+    output_names: Optional[List[str]]
+    feeds: Dict[str, np.ndarray]
+    rows: int
+    future: "Future[List[np.ndarray]]"
+
+
+class BatchingSession:
+    """Drop-in wrapper for ``ort.InferenceSession`` that coalesces ``run()`` calls.
+
+    Requests whose feeds share dtype and non-batch shape (and ask for the same
+    outputs) are concatenated along axis 0 up to *max_batch* rows or until
+    *max_wait_ms* has passed since the first one arrived.  Requests with other
+    shapes arriving in the same window form their own batches.  Requests that are
+    already *max_batch* rows or larger run directly on the caller's thread.
+    """
+
+    def __init__(
+        self,
+        session: Any,
+        name: str,
+        max_batch: int = 32,
+        max_wait_ms: float = 2.0,
+    ) -> None:
+        self.session = session
+        self.name = name
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.batched_rows = 0
+        self.max_rows_seen = 0
+        self._thread = threading.Thread(target=self._dispatch_loop, name=f"batch-{name}", daemon=True)
+        self._thread.start()
+
+    # InferenceSession passthrough (get_inputs, get_outputs, ...)
+    def __getattr__(self, item: str) -> Any:
+        if item == "session":
+            raise AttributeError(item)
+        return getattr(self.session, item)
+
+    def runs_direct(self, rows: int) -> bool:
+        """True if a *rows*-row request would bypass the batching queue."""
+        return rows == 0 or rows >= self.max_batch or self.max_wait == 0.0
+
+    def run(
+        self,
+        output_names: Optional[Sequence[str]],
+        input_feed: Dict[str, np.ndarray],
+        run_options: Any = None,
+    ) -> List[np.ndarray]:
+        feeds = {k: np.asarray(v) for k, v in input_feed.items()}
+        rows = int(next(iter(feeds.values())).shape[0]) if feeds else 0
+        if run_options is not None or self.runs_direct(rows):
+            return self.session.run(output_names, feeds, run_options)
+
+        names = list(output_names) if output_names else None
+        key = (
+            tuple(names) if names else None,
+            tuple((k, v.dtype.str, v.shape[1:]) for k, v in sorted(feeds.items())),
+        )
+        future: "Future[List[np.ndarray]]" = Future()
+        self._queue.put(_Pending(key, names, feeds, rows, future))
+        return future.result()
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            # 모양(key)별로 따로 모음: 길이 bucket이 다른 텍스트 요청이 섞여 와도
+            # 서로의 배치를 끊지 않음
+            groups: Dict[Hashable, List[_Pending]] = {first.key: [first]}
+            rows: Dict[Hashable, int] = {first.key: first.rows}
+            deadline = time.perf_counter() + self.max_wait
+            while groups:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                key = nxt.key
+                if rows.get(key, 0) + nxt.rows > self.max_batch:
+                    self._execute(groups.pop(key), rows.pop(key))
+                groups.setdefault(key, []).append(nxt)
+                rows[key] = rows.get(key, 0) + nxt.rows
+                if rows[key] >= self.max_batch:
+                    self._execute(groups.pop(key), rows.pop(key))
+            for key, group in groups.items():
+                self._execute(group, rows[key])
+
+    def _execute(self, group: List[_Pending], rows: int) -> None:
+        head = group[0]
+        try:
+            if len(group) == 1:
+                feeds = head.feeds
+            else:
+                feeds = {
+                    name: np.concatenate([p.feeds[name] for p in group], axis=0)
+                    for name in head.feeds
+                }
+            outputs = self.session.run(head.output_names, feeds)
+        except Exception as exc:  # propagate to every waiter
+            for p in group:
+                p.future.set_exception(exc)
+            return
+
+        with self._lock:
+            self.requests += len(group)
+            self.batches += 1
+            self.batched_rows += rows
+            self.max_rows_seen = max(self.max_rows_seen, rows)
+
+        offset = 0
+        for p in group:
+            p.future.set_result([out[offset : offset + p.rows] for out in outputs])
+            offset += p.rows
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "requests": self.requests,
+                "batches": self.batches,
+                "avg_requests_per_batch": round(self.requests / self.batches, 3) if self.batches else 0.0,
+                "avg_rows_per_batch": round(self.batched_rows / self.batches, 3) if self.batches else 0.0,
+                "max_rows_seen": self.max_rows_seen,
+                "pending": self._queue.qsize(),
+            }
+
+
+def wrap_session(
+    session: Any, name: str, max_batch: int, max_wait_ms: float
+) -> Any:
+    """Wrap *session* in a :class:`BatchingSession` unless batching is disabled."""
+    if max_batch <= 1 or max_wait_ms <= 0 or isinstance(session, BatchingSession):
+        return session
+    return BatchingSession(session, name=name, max_batch=max_batch, max_wait_ms=max_wait_ms)
@@ -4,11 +4,25 @@ import json
 import re
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 import onnxruntime as ort
 
+from .embedding_cache import EmbeddingLRUCache
+from .metrics import timed
+from .onnx_session import SessionConfig, create_session
+
+# 아이템 임베딩 캐시 기본 예산 (256-d float32 기준 약 6만 행)
+DEFAULT_ITEM_CACHE_BYTES = 64 * 1024 * 1024
+# 미스 행의 날씨 variant 선인코딩은 이 비율 이하의 캐시 예산을 쓸 때만 (큰 옷장이 자기 행을 밀어내지 않도록)
+ITEM_CACHE_VARIANT_FRACTION = 0.25
+# 쿼리 임베딩 캐시 (무드 문자열은 반복이 심함)
+DEFAULT_TEXT_CACHE_BYTES = 8 * 1024 * 1024
+DEFAULT_TEXT_CACHE_TTL = 6 * 60 * 60.0
+# 텍스트 인코더 입력 길이 bucket (seq 축이 동적인 모델에서만 적용, max_len은 항상 포함)
+DEFAULT_TEXT_LENGTH_BUCKETS: Tuple[int, ...] = (4, 8, 16)
+
 
 def _default_config_dir() -> Path:
     return Path(__file__).resolve().parents[2] / "model"
@@ -32,6 +46,42 @@ def normalize_temp_range(
     return default
 
 
+def resolve_text_buckets(
+    session: Any,
+    max_len: int,
+    buckets: Sequence[int],
+    pad_idx: int = 0,
+    probe_idx: int = 1,
+    tol: float = 1e-4,
+) -> Tuple[int, ...]:
+    """Padding lengths usable with *session*.
+
+    convert_to_onnx.py가 seq 축을 동적으로 export한 모델이면 *buckets* (< max_len)
+    + max_len, 고정 길이 모델이면 (max_len,) 하나. 선언만 동적이고 내부 Reshape에
+    길이가 박혀 있는 모델도 있어, 각 bucket 길이로 한 번씩 돌려 max_len 결과와
+    같을 때만 씁니다.
+    """
+    seq_dim = session.get_inputs()[0].shape[1]
+    candidates = sorted({int(b) for b in buckets if 0 < int(b) < max_len})
+    if isinstance(seq_dim, int) or not candidates:
+        return (max_len,)
+
+    def _probe(length: int) -> np.ndarray:
+        ids = np.full((1, length), pad_idx, dtype=np.int64)
+        mask = np.zeros((1, length), dtype=np.int64)
+        ids[0, :2] = probe_idx
+        mask[0, :2] = 1
+        return session.run(None, {"input_ids": ids, "attention_mask": mask})[0]
+
+    try:
+        reference = _probe(max_len)
+        usable = [b for b in candidates if b >= 2 and np.abs(_probe(b) - reference).max() <= tol]
+    except Exception as exc:  # noqa: BLE001 - 고정 길이로 동작
+        print(f"text encoder rejected a shorter sequence, padding to max_len: {exc}")
+        return (max_len,)
+    return tuple(usable) + (max_len,)
+
+
 def _l2_normalize(x: np.ndarray, axis: int = -1, eps: float = 1e-12) -> np.ndarray:
     norm = np.linalg.norm(x, axis=axis, keepdims=True)
     return x / (norm + eps)
@@ -51,27 +101,75 @@ class ArtifactsBundle:
     item_metas: List[Dict[str, Any]]
     item_table_min: Dict[str, Dict[str, Any]]
     weather_label_to_temp_range: Dict[str, Tuple[int, int]]
+    item_cache: Optional[EmbeddingLRUCache] = None
+    text_cache: Optional[EmbeddingLRUCache] = None
+    # predictor.FeatureResolvers, compiled by predictor.get_feature_resolvers
+    feature_resolvers: Optional[Any] = None
+    # resolve_text_buckets() 결과; 비어 있으면 max_len 고정
+    text_buckets: Tuple[int, ...] = ()
 
     @property
     def max_len(self) -> int:
         return int(self.cfg["max_len"])
 
-    def encode_text(self, text: str) -> np.ndarray:
+    def text_token_ids(self, text: str) -> List[int]:
+        """Token ids fed to the text encoder, before padding.
+
+        Queries with the same ids (e.g. OOV words collapsing to ``<unk>``)
+        produce the same embedding, so this is also the text-cache key.
+        """
         tokens = basic_tokenize(text)
         ids = [
             self.text_stoi.get(token, self.text_unk_idx) for token in tokens
         ][: self.max_len]
-        attn = [1] * len(ids)
-        if not ids:
-            ids = [self.text_unk_idx]
-            attn = [1]
-        if len(ids) < self.max_len:
-            pad_len = self.max_len - len(ids)
-            ids.extend([self.text_pad_idx] * pad_len)
-            attn.extend([0] * pad_len)
-
-        input_ids = np.array(ids, dtype=np.int64).reshape(1, -1)
-        attention_mask = np.array(attn, dtype=np.int64).reshape(1, -1)
+        return ids or [self.text_unk_idx]
+
+    def text_pad_length(self, num_tokens: int) -> int:
+        """Smallest length bucket that fits *num_tokens*."""
+        for length in self.text_buckets:
+            if num_tokens <= length:
+                return length
+        return self.max_len
+
+    def encode_text(self, text: str) -> np.ndarray:
+        return self.encode_texts([text])
+
+    @timed("encode_text")
+    def encode_texts(self, texts: Sequence[str]) -> np.ndarray:
+        """Encode *texts* -> ``[len(texts), dim]``.
+
+        캐시에 없는 쿼리는 길이 bucket별로 묶어 bucket당 run() 한 번.
+        """
+        id_lists = [self.text_token_ids(text) for text in texts]
+        keys = [np.asarray(ids, dtype=np.int64).tobytes() for ids in id_lists]
+        if self.text_cache is not None:
+            rows: List[Optional[np.ndarray]] = self.text_cache.get_many(keys)
+        else:
+            rows = [None] * len(keys)
+
+        # pad length -> {cache key: token ids} (같은 쿼리는 한 번만)
+        by_length: Dict[int, Dict[bytes, List[int]]] = {}
+        for key, ids, row in zip(keys, id_lists, rows):
+            if row is None:
+                by_length.setdefault(self.text_pad_length(len(ids)), {})[key] = ids
+
+        if by_length:
+            fresh: Dict[bytes, np.ndarray] = {}
+            for length, pending in by_length.items():
+                embs = self._run_text_encoder(list(pending.values()), length)
+                fresh.update(zip(pending.keys(), embs))
+                if self.text_cache is not None:
+                    self.text_cache.put_many(list(pending.keys()), embs)
+            rows = [row if row is not None else fresh[key] for key, row in zip(keys, rows)]
+
+        return np.stack(rows).astype(np.float32, copy=False)
+
+    def _run_text_encoder(self, id_lists: Sequence[List[int]], length: int) -> np.ndarray:
+        input_ids = np.full((len(id_lists), length), self.text_pad_idx, dtype=np.int64)
+        attention_mask = np.zeros((len(id_lists), length), dtype=np.int64)
+        for i, ids in enumerate(id_lists):
+            input_ids[i, : len(ids)] = ids
+            attention_mask[i, : len(ids)] = 1
         outputs = self.text_session.run(
             None,
             {"input_ids": input_ids, "attention_mask": attention_mask},
@@ -84,12 +182,75 @@ class ArtifactsBundle:
         features = np.zeros((num_items, num_cols), dtype=np.int64)
         for i, col in enumerate(self.feature_cols):
             features[:, i] = item_features[col]
+        return self.encode_item_matrix(features)
+
+    @timed("encode_items")
+    def encode_item_matrix(self, features: np.ndarray) -> np.ndarray:
+        """Encode an int64 ``[N, len(feature_cols)]`` feature matrix."""
+        features = np.ascontiguousarray(features, dtype=np.int64)
+        if self.item_cache is not None:
+            return self._encode_items_cached(features)
         outputs = self.item_session.run(None, {"features": features})
         return outputs[0]  # already L2-normalized by the model
 
+    def _weather_variant_indices(self) -> List[int]:
+        weather_map = self.maps.get("날씨", {})
+        return sorted(
+            {int(weather_map[label]) for label in self.weather_label_to_temp_range if label in weather_map}
+        )
+
+    def _encode_items_cached(self, features: np.ndarray) -> np.ndarray:
+        """Serve rows from ``item_cache``; encode misses in one batched run.
+
+        Each missing row is encoded together with all of its 날씨 variants so
+        that a later request at a different temperature is also a hit, unless
+        the variants would take more than ``ITEM_CACHE_VARIANT_FRACTION`` of
+        the cache budget; then only the requested rows are encoded and cached.
+        """
+        keys = [row.tobytes() for row in features]
+        cached = self.item_cache.get_many(keys)
+        missing = [i for i, value in enumerate(cached) if value is None]
+
+        if missing:
+            requested = np.unique(features[missing], axis=0)
+            rows = requested
+            variants = self._weather_variant_indices()
+            if "날씨" in self.feature_cols and variants:
+                w = self.feature_cols.index("날씨")
+                expanded = np.repeat(requested, len(variants), axis=0)
+                expanded[:, w] = np.tile(variants, len(requested))
+                expanded = np.unique(np.concatenate([requested, expanded]), axis=0)
+                row_bytes = int(self.cfg.get("embed_dim", 0)) * 4 + expanded.shape[1] * expanded.itemsize
+                if len(expanded) * row_bytes <= self.item_cache.max_bytes * ITEM_CACHE_VARIANT_FRACTION:
+                    rows = expanded
+
+            embs = self.item_session.run(None, {"features": rows})[0]
+            row_keys = [row.tobytes() for row in rows]
+            fresh = dict(zip(row_keys, embs))
+
+            # variant 먼저, 요청된 행은 마지막에 넣어 LRU상 가장 최근으로
+            requested_keys = [row.tobytes() for row in requested]
+            if len(rows) > len(requested):
+                wanted = set(requested_keys)
+                extra = [k for k in row_keys if k not in wanted]
+                self.item_cache.put_many(extra, np.stack([fresh[k] for k in extra]))
+            self.item_cache.put_many(requested_keys, np.stack([fresh[k] for k in requested_keys]))
+
+            for i in missing:
+                cached[i] = fresh[keys[i]]
+
+        return np.stack(cached).astype(np.float32, copy=False)
+
 
 def load_artifacts(
-    artifacts_path: str | None = None, device: str | None = None
+    artifacts_path: str | None = None,
+    device: str | None = None,
+    item_cache_bytes: int = DEFAULT_ITEM_CACHE_BYTES,
+    text_cache_bytes: int = DEFAULT_TEXT_CACHE_BYTES,
+    text_cache_ttl: float = DEFAULT_TEXT_CACHE_TTL,
+    text_session_config: Optional[SessionConfig] = None,
+    item_session_config: Optional[SessionConfig] = None,
+    text_length_buckets: Sequence[int] = DEFAULT_TEXT_LENGTH_BUCKETS,
 ) -> ArtifactsBundle:
     if artifacts_path:
         config_dir = Path(artifacts_path).parent
@@ -113,12 +274,7 @@ def load_artifacts(
     text_pad_idx = int(tv["pad_idx"])
     text_unk_idx = int(tv["unk_idx"])
 
-    # Load ONNX sessions
-    opts = ort.SessionOptions()
-    opts.inter_op_num_threads = 1
-    opts.intra_op_num_threads = 2
-    providers = ["CPUExecutionProvider"]
-
+    # Load ONNX sessions (기본 inter 1 / intra 2 스레드, onnx_session.SessionConfig)
     te_path = config_dir / "text_encoder.onnx"
     ie_path = config_dir / "item_encoder.onnx"
 
@@ -127,8 +283,8 @@ def load_artifacts(
     if not ie_path.exists():
         raise FileNotFoundError(f"item_encoder.onnx not found: {ie_path}")
 
-    text_session = ort.InferenceSession(str(te_path), opts, providers=providers)
-    item_session = ort.InferenceSession(str(ie_path), opts, providers=providers)
+    text_session = create_session(te_path, text_session_config, name="text")
+    item_session = create_session(ie_path, item_session_config, name="item")
 
     # Load precomputed item embeddings
     embs_path = config_dir / "item_embs.npy"
@@ -160,4 +316,13 @@ def load_artifacts(
         item_metas=item_metas,
         item_table_min=item_table_min,
         weather_label_to_temp_range=weather_ranges,
+        item_cache=EmbeddingLRUCache(item_cache_bytes) if item_cache_bytes > 0 else None,
+        text_cache=(
+            EmbeddingLRUCache(text_cache_bytes, ttl_seconds=text_cache_ttl)
+            if text_cache_bytes > 0
+            else None
+        ),
+        text_buckets=resolve_text_buckets(
+            text_session, int(cfg["max_len"]), text_length_buckets, text_pad_idx, text_unk_idx
+        ),
     )
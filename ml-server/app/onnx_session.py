@@ -0,0 +1,232 @@
+"""Shared ONNX Runtime session factory.
+
+텍스트/아이템 인코더와 EfficientNet이 모두 이 팩토리로 세션을 만듭니다.
+모델마다 스레드 수를 정해 두지 않으면 EfficientNet이 ORT 기본값(모든 코어)을
+쓰면서 인코더와 CPU를 다투므로, 설정은 ``ORT_<MODEL>_<KEY>`` → ``ORT_<KEY>``
+→ 기본값 순서로 읽습니다 (MODEL = TEXT / ITEM / IMAGE).
+
+``optimized_model_dir``을 주면 그래프 최적화 결과를 저장해 두고, 다음 기동부터는
+저장된 그래프를 최적화 없이 바로 로드합니다. 캐시 키에 원본 파일 크기·mtime,
+ORT 버전, 최적화 수준이 들어가므로 모델이나 ORT가 바뀌면 다시 만듭니다.
+``all`` 수준 결과물은 CPU 종류에 맞춘 커널(NCHWc)을 담을 수 있으므로 캐시
+디렉터리는 호스트(컨테이너)마다 따로 둡니다.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import platform
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import onnxruntime as ort
+
+_EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+_GRAPH_OPT_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+_TRUE = {"1", "true", "yes", "on"}
+_FALSE = {"0", "false", "no", "off"}
+
+
+def _parse_bool(name: str, value: str) -> bool:
+    lowered = value.strip().lower()
+    if lowered in _TRUE:
+        return True
+    if lowered in _FALSE:
+        return False
+    raise ValueError(f"{name} must be a boolean (1/0, true/false), got {value!r}")
+
+
+def _parse_int(name: str, value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}") from None
+
+
+def _parse_choice(name: str, value: str, choices: Dict[str, Any]) -> str:
+    lowered = value.strip().lower()
+    if lowered not in choices:
+        raise ValueError(f"{name} must be one of {sorted(choices)}, got {value!r}")
+    return lowered
+
+
+@dataclass(frozen=True)
+class SessionConfig:
+    intra_op_threads: int = 2
+    inter_op_threads: int = 1
+    execution_mode: str = "sequential"
+    graph_optimization: str = "all"
+    enable_cpu_mem_arena: bool = True
+    enable_mem_pattern: bool = True
+    # False면 작업이 없을 때 스레드가 busy-wait 하지 않음 (공유 CPU에서 유리)
+    allow_spinning: bool = True
+    optimized_model_dir: Optional[str] = None
+    # "fp32" = 원본, 그 외(예: "int8")는 같은 폴더의 <stem>.<variant>.onnx (scripts/quantize_onnx.py)
+    model_variant: str = "fp32"
+    providers: Tuple[str, ...] = field(default=("CPUExecutionProvider",))
+
+    @classmethod
+    def from_env(
+        cls, model: str, getenv: Callable[[str], Optional[str]] = os.getenv
+    ) -> "SessionConfig":
+        """Read ``ORT_<MODEL>_<KEY>`` / ``ORT_<KEY>`` overrides on top of the defaults."""
+        model = model.upper()
+
+        def _get(key: str) -> Tuple[str, Optional[str]]:
+            specific = f"ORT_{model}_{key}"
+            value = getenv(specific)
+            if value is not None and value.strip() != "":
+                return specific, value
+            general = f"ORT_{key}"
+            value = getenv(general)
+            return general, value if value is not None and value.strip() != "" else None
+
+        values: Dict[str, Any] = {}
+        for key, attr in (("INTRA_OP_THREADS", "intra_op_threads"), ("INTER_OP_THREADS", "inter_op_threads")):
+            name, raw = _get(key)
+            if raw is not None:
+                values[attr] = max(0, _parse_int(name, raw))  # 0 = ORT 기본값 (코어 수)
+        name, raw = _get("EXECUTION_MODE")
+        if raw is not None:
+            values["execution_mode"] = _parse_choice(name, raw, _EXECUTION_MODES)
+        name, raw = _get("GRAPH_OPTIMIZATION")
+        if raw is not None:
+            values["graph_optimization"] = _parse_choice(name, raw, _GRAPH_OPT_LEVELS)
+        for key, attr in (
+            ("CPU_MEM_ARENA", "enable_cpu_mem_arena"),
+            ("MEM_PATTERN", "enable_mem_pattern"),
+            ("ALLOW_SPINNING", "allow_spinning"),
+        ):
+            name, raw = _get(key)
+            if raw is not None:
+                values[attr] = _parse_bool(name, raw)
+        _, raw = _get("OPTIMIZED_MODEL_DIR")
+        if raw is not None:
+            values["optimized_model_dir"] = raw
+        _, raw = _get("MODEL_VARIANT")
+        if raw is not None:
+            values["model_variant"] = raw.strip().lower()
+        return cls(**values)
+
+    def session_options(self) -> ort.SessionOptions:
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = self.intra_op_threads
+        opts.inter_op_num_threads = self.inter_op_threads
+        opts.execution_mode = _EXECUTION_MODES[self.execution_mode]
+        opts.graph_optimization_level = _GRAPH_OPT_LEVELS[self.graph_optimization]
+        opts.enable_cpu_mem_arena = self.enable_cpu_mem_arena
+        opts.enable_mem_pattern = self.enable_mem_pattern
+        spin = "1" if self.allow_spinning else "0"
+        opts.add_session_config_entry("session.intra_op.allow_spinning", spin)
+        opts.add_session_config_entry("session.inter_op.allow_spinning", spin)
+        return opts
+
+
+# name -> 생성 정보 (/health 노출용)
+_sessions: Dict[str, Dict[str, Any]] = {}
+_sessions_lock = threading.Lock()
+
+
+def _optimized_path(model_path: Path, config: SessionConfig) -> Path:
+    st = model_path.stat()
+    key_src = "|".join(
+        [
+            str(model_path.resolve()),
+            str(st.st_size),
+            str(st.st_mtime_ns),
+            ort.__version__,
+            platform.machine(),
+            config.graph_optimization,
+            ",".join(config.providers),
+        ]
+    )
+    key = hashlib.sha1(key_src.encode("utf-8")).hexdigest()[:12]
+    return Path(config.optimized_model_dir) / f"{model_path.stem}.{config.graph_optimization}.{key}.onnx"
+
+
+def variant_path(model_path: str | Path, variant: str) -> Path:
+    """``model/text_encoder.onnx`` + ``int8`` -> ``model/text_encoder.int8.onnx``."""
+    model_path = Path(model_path)
+    if variant == "fp32":
+        return model_path
+    return model_path.with_name(f"{model_path.stem}.{variant}{model_path.suffix}")
+
+
+def create_session(
+    model_path: str | Path, config: Optional[SessionConfig] = None, name: Optional[str] = None
+) -> ort.InferenceSession:
+    """Build an ``InferenceSession`` for *model_path* with *config* (기본값 = SessionConfig()).
+
+    ``config.model_variant`` 파일이 없으면 경고 후 원본(FP32)을 씁니다.
+    """
+    config = config or SessionConfig()
+    model_path = Path(model_path)
+    name = name or model_path.stem
+    variant = config.model_variant
+    if variant != "fp32":
+        candidate = variant_path(model_path, variant)
+        if candidate.exists():
+            model_path = candidate
+        else:
+            print(f"{name}: {candidate.name} not found, using {model_path.name}")
+            variant = "fp32"
+    opts = config.session_options()
+    load_path = model_path
+    cache_state: Optional[str] = None
+    cache_path: Optional[Path] = None
+
+    if config.optimized_model_dir and config.graph_optimization != "disable":
+        try:
+            cache_path = _optimized_path(model_path, config)
+            if cache_path.exists():
+                # 이미 최적화된 그래프: 다시 최적화하지 않음
+                load_path = cache_path
+                opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+                cache_state = "hit"
+            else:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                opts.optimized_model_filepath = str(cache_path.with_suffix(f".{os.getpid()}.tmp"))
+                cache_state = "written"
+        except OSError as exc:
+            print(f"optimized model cache unavailable for {name}: {exc}")
+            cache_path, cache_state = None, None
+
+    started = time.perf_counter()
+    session = ort.InferenceSession(str(load_path), opts, providers=list(config.providers))
+    load_ms = (time.perf_counter() - started) * 1000.0
+
+    if cache_state == "written" and cache_path is not None:
+        tmp_path = Path(opts.optimized_model_filepath)
+        try:
+            os.replace(tmp_path, cache_path)  # 여러 워커가 동시에 기동해도 반쯤 쓴 파일을 읽지 않도록
+        except OSError as exc:
+            print(f"could not store optimized model for {name}: {exc}")
+            cache_state = None
+
+    with _sessions_lock:
+        _sessions[name] = {
+            "model_path": str(model_path),
+            "loaded_from": str(load_path),
+            "variant": variant,
+            "optimized_cache": cache_state,
+            "load_ms": round(load_ms, 2),
+            "config": asdict(config),
+        }
+    return session
+
+
+def describe_sessions() -> Dict[str, Dict[str, Any]]:
+    with _sessions_lock:
+        return {name: dict(info) for name, info in _sessions.items()}
@@ -1,29 +1,39 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
 
 import numpy as np
 
 from .color_harmony import (
+    FinalOutfit,
     ItemColorInfo,
     build_inner_candidates,
     describe_harmony,
     harmony_score_lab,
+    palette_index_of,
     resolve_item_lab,
+    top_l_flat_indices,
 )
 from .match_harmony import (
+    build_combo_features,
     build_emb_by_id,
     build_top_bottom_sets_with_emb,
     build_final_outfits_with_match,
     apply_mmr_reranking,
+    rescore_hyperparameters,
 )
+from .compat_graph import CompatibilityView
+from .metrics import gauge, stage, timed
 from .model_loader import ArtifactsBundle, normalize_temp_range
 
 
 TARGET_PARTS = ("상의", "하의", "아우터", "원피스")
 TEMP_MARGIN = 2.0
 
+# metrics 라벨용 (Prometheus 라벨 값은 ASCII로)
+_PART_METRIC_LABELS = {"상의": "top", "하의": "bottom", "아우터": "outer", "원피스": "dress"}
+
 PART_ALIASES = {
     "top": "상의",
     "upper": "상의",
@@ -177,14 +187,45 @@ SEASON_TEMP_RANGE = {
 }
 
 
+PART_CODES = {part: code for code, part in enumerate(TARGET_PARTS)}
+
+
 @dataclass
-class PreparedItem:
-    item_id: str
-    part: str
-    temp_range: Tuple[int, int]
-    similarity: float = 0.0
-    lab: Optional[np.ndarray] = field(default=None, repr=False)
-    color_name: Optional[str] = None
+class PreparedCloset:
+    """Struct-of-arrays view of a closet, one row per usable item."""
+
+    item_ids: np.ndarray  # object [N]
+    part_codes: np.ndarray  # int8 [N], index into TARGET_PARTS
+    features: np.ndarray  # int64 [N, F], bundle.feature_cols order
+    temp_low: np.ndarray  # int16 [N]
+    temp_high: np.ndarray  # int16 [N]
+    labs: np.ndarray = field(repr=False)  # float32 [N, 3]
+    palette_idx: np.ndarray = field(repr=False)  # int32 [N], -1 for free-form LAB
+    color_names: List[Optional[str]] = field(repr=False)
+    # 서버 저장 옷장: 이 closet의 날씨 라벨에 맞춘 쌍별 조화/유사도 블록
+    compat: Optional[CompatibilityView] = field(default=None, repr=False)
+
+    def __len__(self) -> int:
+        return int(self.item_ids.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.part_codes, self.features, self.temp_low, self.temp_high, self.labs, self.palette_idx)
+        ids = sum(len(i) for i in self.item_ids) + 8 * len(self.item_ids)
+        return int(sum(a.nbytes for a in arrays)) + ids
+
+    def temp_mask(self, temperature: float, margin: float = TEMP_MARGIN) -> np.ndarray:
+        return ((self.temp_low - margin) <= temperature) & (temperature <= (self.temp_high + margin))
+
+    def color_info(self, idx: int, similarity: float) -> ItemColorInfo:
+        pal = int(self.palette_idx[idx])
+        return ItemColorInfo(
+            item_id=self.item_ids[idx],
+            part=TARGET_PARTS[self.part_codes[idx]],
+            lab=self.labs[idx],
+            similarity=similarity,
+            palette_idx=pal if pal >= 0 else None,
+        )
 
 
 def _normalize_text(value: Any) -> Optional[str]:
@@ -366,82 +407,159 @@ def _add_scored_combo(
         combos[key] = (score, is_dress)
 
 
+# ---------------------------------------------------------------------------
+# Compiled attribute -> index resolvers
+# ---------------------------------------------------------------------------
+# feature column -> (payload keys tried in order, alias table)
+_FEATURE_SOURCES: Dict[str, Tuple[Tuple[str, ...], Optional[Dict[str, str]]]] = {
+    "카테고리": (("sub_type", "category", "카테고리"), CATEGORY_ALIASES),
+    "색상": (("color", "색상"), COLOR_ALIASES),
+    "서브색상": (("sub_color", "서브색상"), COLOR_ALIASES),
+    "소매기장": (("sleeve_length", "소매기장"), SLEEVE_ALIASES),
+    "기장": (("length", "기장"), LENGTH_ALIASES),
+    "핏": (("fit", "핏"), FIT_ALIASES),
+    "옷깃": (("collar", "옷깃"), COLLAR_ALIASES),
+    "서브스타일": (("스타일", "style", "서브스타일", "sub_style"), STYLE_ALIASES),
+}
+_PART_KEYS = ("part", "category", "카테고리")
+_COLOR_KEYS = _FEATURE_SOURCES["색상"][0]
+_SUB_COLOR_KEYS = _FEATURE_SOURCES["서브색상"][0]
+
+# Unseen raw values are memoized up to this many entries per column.
+RESOLVER_MEMO_LIMIT = 4096
+
+
+def _pick(attrs: Dict[str, Any], item: Dict[str, Any], keys: Tuple[str, ...]) -> Any:
+    for key in keys:
+        value = attrs.get(key)
+        if value is not None:
+            return value
+        value = item.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+class _ColumnResolver:
+    """``raw value -> index`` for one feature column.
+
+    The table is seeded with every vocabulary entry and alias (folded through
+    :func:`_pick_map_index`) and memoizes values not seen before, so lookups
+    are a single dict get with the same result as :func:`_pick_map_index`.
+    """
+
+    __slots__ = ("mapping", "aliases", "none_idx", "table")
+
+    def __init__(self, mapping: Dict[str, int], aliases: Optional[Dict[str, str]] = None) -> None:
+        self.mapping = mapping
+        self.aliases = aliases
+        self.none_idx = _pick_map_index(None, mapping, aliases)
+        seeds = set(mapping) | set(aliases or ()) | {"", "none", "null", "nan"}
+        self.table: Dict[str, int] = {
+            seed: _pick_map_index(seed, mapping, aliases) for seed in seeds
+        }
+
+    def __call__(self, value: Any) -> int:
+        if value is None:
+            return self.none_idx
+        key = value if isinstance(value, str) else str(value)
+        idx = self.table.get(key)
+        if idx is None:
+            idx = _pick_map_index(key, self.mapping, self.aliases)
+            if len(self.table) < len(self.mapping) + RESOLVER_MEMO_LIMIT:
+                self.table[key] = idx
+        return idx
+
+
+@dataclass
+class FeatureResolvers:
+    """Per-bundle compiled resolvers used by :func:`_prepare_item_features`."""
+
+    num_cols: int
+    part_pos: Optional[int]
+    part_index: Dict[str, int]
+    weather_pos: Optional[int]
+    weather: _ColumnResolver
+    columns: List[Tuple[int, Tuple[str, ...], _ColumnResolver]]
+    part_memo: Dict[str, Optional[str]] = field(default_factory=dict)
+
+    def part(self, value: Any) -> Optional[str]:
+        if value is None:
+            return None
+        key = value if isinstance(value, str) else str(value)
+        if key in self.part_memo:
+            return self.part_memo[key]
+        part = _normalize_part(key)
+        if len(self.part_memo) < RESOLVER_MEMO_LIMIT:
+            self.part_memo[key] = part
+        return part
+
+
+def compile_feature_resolvers(bundle: ArtifactsBundle) -> FeatureResolvers:
+    """Fold bundle.maps and the alias tables into direct lookup tables."""
+    columns: List[Tuple[int, Tuple[str, ...], _ColumnResolver]] = []
+    part_pos: Optional[int] = None
+    weather_pos: Optional[int] = None
+    for pos, col in enumerate(bundle.feature_cols):
+        if col == "part":
+            part_pos = pos
+        elif col == "날씨":
+            weather_pos = pos
+        elif col in _FEATURE_SOURCES:
+            keys, aliases = _FEATURE_SOURCES[col]
+            columns.append((pos, keys, _ColumnResolver(bundle.maps.get(col, {}), aliases)))
+        else:
+            raise KeyError(col)
+
+    map_part = bundle.maps.get("part", {})
+    return FeatureResolvers(
+        num_cols=len(bundle.feature_cols),
+        part_pos=part_pos,
+        part_index={part: _pick_map_index(part, map_part) for part in TARGET_PARTS},
+        weather_pos=weather_pos,
+        weather=_ColumnResolver(bundle.maps.get("날씨", {})),
+        columns=columns,
+    )
+
+
+def get_feature_resolvers(bundle: ArtifactsBundle) -> FeatureResolvers:
+    """Return the bundle's compiled resolvers, compiling them on first use."""
+    if bundle.feature_resolvers is None:
+        bundle.feature_resolvers = compile_feature_resolvers(bundle)
+    return bundle.feature_resolvers
+
+
 def _prepare_item_features(
     bundle: ArtifactsBundle,
     item: Dict[str, Any],
     weather_label: str,
-) -> Tuple[Optional[PreparedItem], Optional[Dict[str, int]]]:
+) -> Optional[Tuple[str, str, List[int], Tuple[int, int], Optional[str], Optional[str]]]:
+    """Resolve one closet item to ``(id, part, feature_row, temp_range, color, sub_color)``.
+
+    ``feature_row`` follows ``bundle.feature_cols``.  Returns ``None`` for items
+    without an id or outside TARGET_PARTS.
+    """
     item_id_raw = item.get("id")
     if item_id_raw is None:
-        return None, None
+        return None
 
     item_id = str(item_id_raw)
     attrs = item.get("attributes") or {}
     if not isinstance(attrs, dict):
         attrs = {}
 
-    def pick(*keys: str) -> Any:
-        for key in keys:
-            if key in attrs and attrs.get(key) is not None:
-                return attrs.get(key)
-            if key in item and item.get(key) is not None:
-                return item.get(key)
-        return None
-
-    part = _normalize_part(pick("part", "category", "카테고리"))
+    resolvers = get_feature_resolvers(bundle)
+    part = resolvers.part(_pick(attrs, item, _PART_KEYS))
     if part not in TARGET_PARTS:
-        return None, None
-
-    map_part = bundle.maps.get("part", {})
-    feature_row = {
-        "part": _pick_map_index(part, map_part),
-        "카테고리": _pick_map_index(
-            pick("sub_type", "category", "카테고리"),
-            bundle.maps.get("카테고리", {}),
-            CATEGORY_ALIASES,
-        ),
-        "색상": _pick_map_index(
-            pick("color", "색상"),
-            bundle.maps.get("색상", {}),
-            COLOR_ALIASES,
-        ),
-        "서브색상": _pick_map_index(
-            pick("sub_color", "서브색상"),
-            bundle.maps.get("서브색상", {}),
-            COLOR_ALIASES,
-        ),
-        "소매기장": _pick_map_index(
-            pick("sleeve_length", "소매기장"),
-            bundle.maps.get("소매기장", {}),
-            SLEEVE_ALIASES,
-        ),
-        "기장": _pick_map_index(
-            pick("length", "기장"),
-            bundle.maps.get("기장", {}),
-            LENGTH_ALIASES,
-        ),
-        "핏": _pick_map_index(
-            pick("fit", "핏"),
-            bundle.maps.get("핏", {}),
-            FIT_ALIASES,
-        ),
-        "옷깃": _pick_map_index(
-            pick("collar", "옷깃"),
-            bundle.maps.get("옷깃", {}),
-            COLLAR_ALIASES,
-        ),
-        "서브스타일": _pick_map_index(
-            pick("스타일", "style", "서브스타일", "sub_style"),
-            bundle.maps.get("서브스타일", {}),
-            STYLE_ALIASES,
-        ),
-        "날씨": _pick_map_index(
-            weather_label,
-            bundle.maps.get("날씨", {}),
-        ),
-    }
+        return None
 
-    feature_row = {k: feature_row[k] for k in bundle.feature_cols}
+    feature_values = [0] * resolvers.num_cols
+    if resolvers.part_pos is not None:
+        feature_values[resolvers.part_pos] = resolvers.part_index[part]
+    if resolvers.weather_pos is not None:
+        feature_values[resolvers.weather_pos] = resolvers.weather(weather_label)
+    for pos, keys, resolve in resolvers.columns:
+        feature_values[pos] = resolve(_pick(attrs, item, keys))
 
     temp_range = None
     item_table_entry = bundle.item_table_min.get(item_id)
@@ -451,17 +569,74 @@ def _prepare_item_features(
     if temp_range is None:
         temp_range = _temp_range_from_seasons(item.get("season"))
 
-    color_raw = _normalize_text(pick("color", "색상"))
-    sub_color_raw = _normalize_text(pick("sub_color", "서브색상"))
+    color_raw = _normalize_text(_pick(attrs, item, _COLOR_KEYS))
+    sub_color_raw = _normalize_text(_pick(attrs, item, _SUB_COLOR_KEYS))
 
-    prepared = PreparedItem(
-        item_id=item_id,
-        part=part,
-        temp_range=temp_range,
-        lab=resolve_item_lab(color_raw, sub_color_raw),
-        color_name=color_raw,
+    return item_id, part, feature_values, temp_range, color_raw, sub_color_raw
+
+
+def closet_for_weather(
+    bundle: ArtifactsBundle,
+    closet: PreparedCloset,
+    weather_label: str,
+) -> PreparedCloset:
+    """Copy of *closet* whose 날씨 feature column is set to *weather_label*."""
+    resolvers = get_feature_resolvers(bundle)
+    if resolvers.weather_pos is None:
+        return closet
+    features = closet.features.copy()
+    features[:, resolvers.weather_pos] = resolvers.weather(weather_label)
+    return replace(closet, features=features, compat=None)
+
+
+@timed("prepare_closet")
+def prepare_closet(
+    bundle: ArtifactsBundle,
+    closet_items: List[Dict[str, Any]],
+    weather_label: str,
+) -> PreparedCloset:
+    """Build a :class:`PreparedCloset` from raw closet payloads in one pass."""
+    n_max = len(closet_items)
+    features = np.zeros((n_max, len(bundle.feature_cols)), dtype=np.int64)
+    temp_low = np.zeros(n_max, dtype=np.int16)
+    temp_high = np.zeros(n_max, dtype=np.int16)
+    part_codes = np.zeros(n_max, dtype=np.int8)
+    labs = np.zeros((n_max, 3), dtype=np.float32)
+    palette_idx = np.full(n_max, -1, dtype=np.int32)
+    item_ids: List[str] = []
+    color_names: List[Optional[str]] = []
+
+    n = 0
+    for item in closet_items:
+        row = _prepare_item_features(bundle, item, weather_label)
+        if row is None:
+            continue
+        item_id, part, feature_values, (low, high), color_raw, sub_color_raw = row
+        features[n] = feature_values
+        temp_low[n] = low
+        temp_high[n] = high
+        part_codes[n] = PART_CODES[part]
+        lab = resolve_item_lab(color_raw, sub_color_raw)
+        labs[n] = lab
+        pal = palette_index_of(lab)
+        if pal is not None:
+            palette_idx[n] = pal
+        item_ids.append(item_id)
+        color_names.append(color_raw)
+        n += 1
+
+    ids = np.empty(n, dtype=object)
+    ids[:] = item_ids
+    return PreparedCloset(
+        item_ids=ids,
+        part_codes=part_codes[:n],
+        features=features[:n],
+        temp_low=temp_low[:n],
+        temp_high=temp_high[:n],
+        labs=labs[:n],
+        palette_idx=palette_idx[:n],
+        color_names=color_names,
     )
-    return prepared, feature_row
 
 
 def recommend_outfits(
@@ -477,109 +652,475 @@ def recommend_outfits(
     beta_tb: float = 0.50,
     lambda_tbset: float = 0.15,
 ) -> Dict[str, Any]:
-    _empty = {"selected_items": {}, "recommendations": []}
-
     if not closet_items:
-        return _empty
-
-    query = f"{mood} {comment}".strip()
-    if not query:
-        query = mood.strip() or "데일리 코디"
+        return {"selected_items": {}, "recommendations": []}
 
     weather_label = _weather_label_from_temp(
         bundle.weather_label_to_temp_range, temperature
     )
+    closet = prepare_closet(bundle, closet_items, weather_label)
+    return recommend_for_closet(
+        bundle,
+        closet,
+        mood=mood,
+        comment=comment,
+        temperature=temperature,
+        top_k=top_k,
+        alpha_tb=alpha_tb,
+        alpha_oi=alpha_oi,
+        mmr_lambda=mmr_lambda,
+        beta_tb=beta_tb,
+        lambda_tbset=lambda_tbset,
+    )
 
-    feature_bucket: Dict[str, List[int]] = {col: [] for col in bundle.feature_cols}
-    prepared_items: List[PreparedItem] = []
 
-    for item in closet_items:
-        prepared, feature_row = _prepare_item_features(bundle, item, weather_label)
-        if prepared is None or feature_row is None:
-            continue
-        for col in bundle.feature_cols:
-            feature_bucket[col].append(feature_row[col])
-        prepared_items.append(prepared)
+def recommend_for_closet(
+    bundle: ArtifactsBundle,
+    closet: PreparedCloset,
+    mood: str,
+    comment: str,
+    temperature: float,
+    top_k: int = 10,
+    alpha_tb: float = 0.65,
+    alpha_oi: float = 0.70,
+    mmr_lambda: float = 0.75,
+    beta_tb: float = 0.50,
+    lambda_tbset: float = 0.15,
+    item_embs: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    """:func:`recommend_outfits` on an already prepared closet.
 
-    if not prepared_items:
+    *closet* must have been prepared for *temperature*'s weather label.
+    *item_embs* (``[N, D]``, aligned with *closet*) skips ``encode_items``.
+    """
+    _empty = {"selected_items": {}, "recommendations": []}
+
+    gauge("closet_size", len(closet))
+    if len(closet) == 0:
         return _empty
 
-    item_embs = bundle.encode_items(feature_bucket)
-    text_emb = bundle.encode_text(query)
-    emb_by_id = build_emb_by_id(item_embs, item_ids=[p.item_id for p in prepared_items])
+    if item_embs is None:
+        item_embs = bundle.encode_item_matrix(closet.features)
+    text_emb = bundle.encode_text(_query_text(mood, comment))
+    emb_by_id = build_emb_by_id(item_embs, item_ids=list(closet.item_ids))
 
     # text_emb: [1, D], item_embs: [N, D] → similarities: [N]
     similarities = (text_emb @ item_embs.T).squeeze(0)
-    for idx, prepared in enumerate(prepared_items):
-        prepared.similarity = float(similarities[idx])
 
-    temp_mask = []
-    for prepared in prepared_items:
-        low, high = prepared.temp_range
-        is_ok = (low - TEMP_MARGIN) <= temperature <= (high + TEMP_MARGIN)
-        temp_mask.append(is_ok)
+    return _rank_outfits(
+        closet,
+        emb_by_id,
+        similarities,
+        mood=mood,
+        temperature=temperature,
+        top_k=top_k,
+        alpha_tb=alpha_tb,
+        alpha_oi=alpha_oi,
+        mmr_lambda=mmr_lambda,
+        beta_tb=beta_tb,
+        lambda_tbset=lambda_tbset,
+    )
 
-    if not any(temp_mask):
-        temp_mask = [True] * len(prepared_items)
 
-    part_ranked: Dict[str, List[PreparedItem]] = {part: [] for part in TARGET_PARTS}
-    for keep, prepared in zip(temp_mask, prepared_items):
-        if not keep:
-            continue
-        part_ranked[prepared.part].append(prepared)
+@dataclass(frozen=True)
+class RecommendContext:
+    """One (mood, comment, temperature) query for :func:`recommend_multi_for_closet`."""
 
-    for part in TARGET_PARTS:
-        part_ranked[part].sort(key=lambda x: x.similarity, reverse=True)
+    mood: str
+    comment: str = ""
+    temperature: float = 0.0
 
-    K = 7
-    tops = part_ranked["상의"][:K]
-    bottoms = part_ranked["하의"][:K]
-    outers = part_ranked["아우터"][:K]
-    dresses = part_ranked["원피스"][:K]
 
-    if not tops and not bottoms and not dresses:
-        return {"selected_items": {}, "recommendations": []}
+def recommend_outfits_multi(
+    bundle: ArtifactsBundle,
+    contexts: Sequence[RecommendContext],
+    closet_items: List[Dict[str, Any]],
+    top_k: int = 10,
+    alpha_tb: float = 0.65,
+    alpha_oi: float = 0.70,
+    mmr_lambda: float = 0.75,
+    beta_tb: float = 0.50,
+    lambda_tbset: float = 0.15,
+) -> List[Dict[str, Any]]:
+    """:func:`recommend_outfits` for several contexts over one closet.
 
-    _default_lab = np.array([53.6, 0.0, 0.0], dtype=np.float32)
+    옷장은 한 번만 준비하고, 날씨 라벨이 다른 context는 ``날씨`` 열만 바꾼
+    사본(:func:`closet_for_weather`)을 씁니다.
+    """
+    if not closet_items:
+        return [{"selected_items": {}, "recommendations": []} for _ in contexts]
+
+    return recommend_multi_for_closet(
+        bundle,
+        contexts,
+        _closet_preparer(bundle, closet_items),
+        top_k=top_k,
+        alpha_tb=alpha_tb,
+        alpha_oi=alpha_oi,
+        mmr_lambda=mmr_lambda,
+        beta_tb=beta_tb,
+        lambda_tbset=lambda_tbset,
+    )
 
-    def _to_color_info(items: List[PreparedItem]) -> List[ItemColorInfo]:
-        return [
-            ItemColorInfo(
-                item_id=p.item_id,
-                part=p.part,
-                lab=p.lab if p.lab is not None else _default_lab,
-                similarity=p.similarity,
+
+def _closet_preparer(
+    bundle: ArtifactsBundle, closet_items: List[Dict[str, Any]]
+) -> Callable[[float], Tuple[PreparedCloset, np.ndarray]]:
+    """``prepared_for(temperature)`` over raw closet payloads, memoized per weather label."""
+    prepared: Dict[str, Tuple[PreparedCloset, np.ndarray]] = {}
+    base: List[PreparedCloset] = []
+
+    def _prepared_for(temperature: float) -> Tuple[PreparedCloset, np.ndarray]:
+        label = _weather_label_from_temp(bundle.weather_label_to_temp_range, temperature)
+        if label not in prepared:
+            if not base:
+                base.append(prepare_closet(bundle, closet_items, label))
+                closet = base[0]
+            else:
+                closet = closet_for_weather(bundle, base[0], label)
+            prepared[label] = (closet, bundle.encode_item_matrix(closet.features))
+        return prepared[label]
+
+    return _prepared_for
+
+
+def recommend_multi_for_closet(
+    bundle: ArtifactsBundle,
+    contexts: Sequence[RecommendContext],
+    prepared_for: Callable[[float], Tuple[PreparedCloset, np.ndarray]],
+    top_k: int = 10,
+    alpha_tb: float = 0.65,
+    alpha_oi: float = 0.70,
+    mmr_lambda: float = 0.75,
+    beta_tb: float = 0.50,
+    lambda_tbset: float = 0.15,
+) -> List[Dict[str, Any]]:
+    """Rank outfits for every context; one result dict per context, in order.
+
+    *prepared_for(temperature)* returns the prepared closet and item embeddings
+    for that temperature's weather label (ClosetStore / recommend_outfits_multi).
+    쿼리 N개는 text encoder 한 번(encode_texts)으로, 유사도는 날씨 라벨마다
+    ``[n, D] @ [D, N_items]`` 한 번으로 구하고 조합/MMR 단계만 context별로 돕니다.
+    """
+    results: List[Dict[str, Any]] = [{"selected_items": {}, "recommendations": []} for _ in contexts]
+    if not contexts:
+        return results
+
+    text_embs = bundle.encode_texts([_query_text(c.mood, c.comment) for c in contexts])
+
+    by_label: Dict[str, List[int]] = {}
+    for i, ctx in enumerate(contexts):
+        label = _weather_label_from_temp(bundle.weather_label_to_temp_range, ctx.temperature)
+        by_label.setdefault(label, []).append(i)
+
+    for rows in by_label.values():
+        closet, item_embs = prepared_for(contexts[rows[0]].temperature)
+        gauge("closet_size", len(closet))
+        if len(closet) == 0:
+            continue
+        emb_by_id = build_emb_by_id(item_embs, item_ids=list(closet.item_ids))
+        similarities = text_embs[rows] @ item_embs.T  # [n, N]
+        for row, sims in zip(rows, similarities):
+            ctx = contexts[row]
+            results[row] = _rank_outfits(
+                closet,
+                emb_by_id,
+                sims,
+                mood=ctx.mood,
+                temperature=ctx.temperature,
+                top_k=top_k,
+                alpha_tb=alpha_tb,
+                alpha_oi=alpha_oi,
+                mmr_lambda=mmr_lambda,
+                beta_tb=beta_tb,
+                lambda_tbset=lambda_tbset,
             )
-            for p in items
+    return results
+
+
+def plan_outfits(
+    bundle: ArtifactsBundle,
+    days: Sequence[RecommendContext],
+    closet_items: List[Dict[str, Any]],
+    top_k: int = 10,
+    no_repeat: bool = True,
+    alpha_tb: float = 0.65,
+    alpha_oi: float = 0.70,
+    mmr_lambda: float = 0.75,
+    beta_tb: float = 0.50,
+    lambda_tbset: float = 0.15,
+) -> List[Dict[str, Any]]:
+    """:func:`plan_for_closet` over raw closet payloads."""
+    if not closet_items:
+        return [
+            {
+                "selected_items": {},
+                "recommendations": [],
+                "weather_label": _weather_label_from_temp(bundle.weather_label_to_temp_range, d.temperature),
+            }
+            for d in days
         ]
 
-    top_colors = _to_color_info(tops)
-    bottom_colors = _to_color_info(bottoms)
-    dress_colors = _to_color_info(dresses)
-    outer_colors = _to_color_info(outers)
+    return plan_for_closet(
+        bundle,
+        days,
+        _closet_preparer(bundle, closet_items),
+        top_k=top_k,
+        no_repeat=no_repeat,
+        alpha_tb=alpha_tb,
+        alpha_oi=alpha_oi,
+        mmr_lambda=mmr_lambda,
+        beta_tb=beta_tb,
+        lambda_tbset=lambda_tbset,
+    )
+
+
+def plan_for_closet(
+    bundle: ArtifactsBundle,
+    days: Sequence[RecommendContext],
+    prepared_for: Callable[[float], Tuple[PreparedCloset, np.ndarray]],
+    top_k: int = 10,
+    no_repeat: bool = True,
+    alpha_tb: float = 0.65,
+    alpha_oi: float = 0.70,
+    mmr_lambda: float = 0.75,
+    beta_tb: float = 0.50,
+    lambda_tbset: float = 0.15,
+) -> List[Dict[str, Any]]:
+    """Outfit plan for consecutive forecast *days*; one result dict per day, in order.
+
+    날씨 라벨이 같은 날들은 준비된 옷장·아이템 임베딩·유사도 행렬을 공유하고,
+    (라벨, 쿼리, 기온 필터)가 같은 날은 조합 점수까지 재사용해 MMR/reason만
+    다시 돕니다. *no_repeat*이면 앞선 날들의 1순위 코디를 MMR 중복 벡터에
+    미리 넣어 겹치는 코디를 밀어내고, 완전히 같은 코디는 제외합니다.
+    """
+    results: List[Dict[str, Any]] = [{"selected_items": {}, "recommendations": []} for _ in days]
+    if not days:
+        return results
+
+    queries: Dict[str, int] = {}
+    day_query = [queries.setdefault(_query_text(d.mood, d.comment), len(queries)) for d in days]
+    text_embs = bundle.encode_texts(list(queries))
+    labels = [_weather_label_from_temp(bundle.weather_label_to_temp_range, d.temperature) for d in days]
+
+    # 라벨별: (옷장, emb_by_id, 쿼리별 유사도 [Q, N])
+    per_label: Dict[str, Tuple[PreparedCloset, Dict[str, np.ndarray], np.ndarray]] = {}
+    memo: Dict[Tuple[str, int, bytes], _OutfitCandidates] = {}
+    history: List[Set[str]] = []
+
+    for i, (day, label, q) in enumerate(zip(days, labels, day_query)):
+        if label not in per_label:
+            closet, item_embs = prepared_for(day.temperature)
+            gauge("closet_size", len(closet))
+            emb_by_id = build_emb_by_id(item_embs, item_ids=list(closet.item_ids)) if len(closet) else {}
+            per_label[label] = (closet, emb_by_id, text_embs @ item_embs.T)
+        closet, emb_by_id, similarities = per_label[label]
+        if len(closet) == 0:
+            continue
+
+        key = (label, q, closet.temp_mask(day.temperature).tobytes())
+        if key not in memo:
+            memo[key] = _outfit_candidates(
+                closet,
+                emb_by_id,
+                similarities[q],
+                temperature=day.temperature,
+                top_k=top_k,
+                alpha_tb=alpha_tb,
+                alpha_oi=alpha_oi,
+                beta_tb=beta_tb,
+                lambda_tbset=lambda_tbset,
+            )
+        results[i] = _finish_outfits(
+            closet,
+            memo[key],
+            mood=day.mood,
+            temperature=day.temperature,
+            top_k=top_k,
+            mmr_lambda=mmr_lambda,
+            history=history if no_repeat else (),
+        )
+        recs = results[i]["recommendations"]
+        if no_repeat and recs:
+            history.append(
+                {recs[0][k] for k in ("top_id", "bottom_id", "dress_id", "outer_id") if recs[0].get(k)}
+            )
+
+    for result, label in zip(results, labels):
+        result["weather_label"] = label
+    return results
 
-    mood_scores: Dict[str, float] = {}
-    for p in tops + bottoms + outers + dresses:
-        mood_scores[p.item_id] = p.similarity
+
+def rescore_outfits(
+    bundle: ArtifactsBundle,
+    mood: str,
+    comment: str,
+    temperature: float,
+    closet_items: List[Dict[str, Any]],
+    hyperparameters: np.ndarray,
+    top_k: int = 10,
+) -> Dict[str, Any]:
+    """:func:`rescore_for_closet` over raw closet payloads."""
+    if not closet_items:
+        return {"selected_items": {}, "results": [[] for _ in np.atleast_2d(hyperparameters)]}
+
+    weather_label = _weather_label_from_temp(bundle.weather_label_to_temp_range, temperature)
+    closet = prepare_closet(bundle, closet_items, weather_label)
+    return rescore_for_closet(
+        bundle, closet, mood, comment, temperature, hyperparameters, top_k=top_k
+    )
+
+
+def rescore_for_closet(
+    bundle: ArtifactsBundle,
+    closet: PreparedCloset,
+    mood: str,
+    comment: str,
+    temperature: float,
+    hyperparameters: np.ndarray,
+    top_k: int = 10,
+    item_embs: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    """Recommendations for many hyperparameter vectors over one query.
+
+    *hyperparameters* is ``[S, 5]`` in ``match_harmony.HP_NAMES`` order. 후보 선택과
+    인코딩은 한 번, 조합 feature도 한 번 구하고 벡터별 점수·top-k·MMR은
+    :func:`rescore_hyperparameters`가 한꺼번에 계산합니다. 결과 ``results[s]``는
+    같은 벡터로 :func:`recommend_for_closet`을 부른 recommendations에서
+    ``reason``만 뺀 것과 같습니다 (점수가 정확히 같은 조합의 순서는 다를 수 있음).
+    """
+    hps = np.atleast_2d(np.asarray(hyperparameters, dtype=np.float64))
+    empty = {"selected_items": {}, "results": [[] for _ in range(hps.shape[0])]}
+
+    gauge("closet_size", len(closet))
+    if len(closet) == 0:
+        return empty
+
+    if item_embs is None:
+        item_embs = bundle.encode_item_matrix(closet.features)
+    text_emb = bundle.encode_text(_query_text(mood, comment))
+    emb_by_id = build_emb_by_id(item_embs, item_ids=list(closet.item_ids))
+    similarities = (text_emb @ item_embs.T).squeeze(0)
+
+    _, colors = _candidate_colors(closet, similarities, temperature)
+    if not colors:
+        return empty
+
+    combos = build_combo_features(
+        colors["아우터"], colors["상의"], colors["하의"], colors["원피스"], emb_by_id, compat=closet.compat
+    )
+    M = max(1, min(int(top_k), 30))
+    selected, scores = rescore_hyperparameters(combos, hps, M=M)
+
+    results: List[List[Dict[str, Any]]] = []
+    for sel_row, score_row in zip(selected, scores):
+        rows: List[Dict[str, Any]] = []
+        for c, score in zip(sel_row, score_row):
+            if c < 0:
+                break
+            outer_id, kind, ids = combos.combo(int(c))
+            row: Dict[str, Any] = {"outfit_type": kind}
+            if kind == "dress":
+                row["dress_id"] = ids[0]
+            else:
+                row["top_id"], row["bottom_id"] = ids
+            row["outer_id"] = outer_id
+            row["score"] = round(_similarity_to_score(float(score)), 4)
+            rows.append(row)
+        results.append(rows)
+    return {"selected_items": _selected_item_ids(colors), "results": results}
+
+
+def _query_text(mood: str, comment: str) -> str:
+    query = f"{mood} {comment}".strip()
+    if not query:
+        query = mood.strip() or "데일리 코디"
+    return query
+
+
+def _select_candidates(
+    closet: PreparedCloset, similarities: np.ndarray, temperature: float, K: int = 7
+) -> Dict[str, np.ndarray]:
+    """Top-*K* closet rows per part by query similarity, within the temperature filter."""
+    with stage("select_candidates"):
+        temp_mask = closet.temp_mask(temperature)
+        if not temp_mask.any():
+            temp_mask[:] = True
+
+        part_ranked: Dict[str, np.ndarray] = {}
+        for part in TARGET_PARTS:
+            cand = np.flatnonzero(temp_mask & (closet.part_codes == PART_CODES[part]))
+            part_ranked[part] = cand[top_l_flat_indices(similarities[cand], K)]
+            gauge("candidates", cand.size, kind=_PART_METRIC_LABELS[part])
+    return part_ranked
+
+
+def _candidate_colors(
+    closet: PreparedCloset, similarities: np.ndarray, temperature: float
+) -> Tuple[Dict[str, np.ndarray], Dict[str, List[ItemColorInfo]]]:
+    """:func:`_select_candidates` rows and their color infos per part (``{}`` if no inner candidate)."""
+    part_ranked = _select_candidates(closet, similarities, temperature)
+    if not (part_ranked["상의"].size or part_ranked["하의"].size or part_ranked["원피스"].size):
+        return part_ranked, {}
+    colors = {
+        part: [closet.color_info(int(i), float(similarities[i])) for i in part_ranked[part]]
+        for part in ("상의", "하의", "원피스", "아우터")
+    }
+    return part_ranked, colors
+
+
+def _selected_item_ids(colors: Dict[str, List[ItemColorInfo]]) -> Dict[str, List[str]]:
+    return {part: [ic.item_id for ic in infos] for part, infos in colors.items()}
+
+
+@dataclass
+class _OutfitCandidates:
+    """Query-dependent part of :func:`_rank_outfits`, before MMR and reasons."""
+
+    part_ranked: Dict[str, np.ndarray]
+    color_index: Dict[str, ItemColorInfo]
+    selected_items: Dict[str, List[str]]
+    outfits: List[FinalOutfit]
+
+
+def _outfit_candidates(
+    closet: PreparedCloset,
+    emb_by_id: Dict[str, np.ndarray],
+    similarities: np.ndarray,
+    temperature: float,
+    top_k: int,
+    alpha_tb: float,
+    alpha_oi: float,
+    beta_tb: float,
+    lambda_tbset: float,
+) -> _OutfitCandidates:
+    """Candidate selection → top/bottom sets → scored outer×inner combinations."""
+    part_ranked, colors = _candidate_colors(closet, similarities, temperature)
+    if not colors:
+        return _OutfitCandidates(part_ranked, {}, {}, [])
+
+    top_colors = colors["상의"]
+    bottom_colors = colors["하의"]
+    dress_colors = colors["원피스"]
+    outer_colors = colors["아우터"]
 
     color_index: Dict[str, ItemColorInfo] = {}
     for ic in top_colors + bottom_colors + dress_colors + outer_colors:
         color_index[ic.item_id] = ic
 
     L = 7
-    tb_sets = build_top_bottom_sets_with_emb(top_colors, bottom_colors, emb_by_id=emb_by_id, L=L, alpha_tb=alpha_tb)
+    tb_sets = build_top_bottom_sets_with_emb(
+        top_colors, bottom_colors, emb_by_id=emb_by_id, L=L, alpha_tb=alpha_tb, compat=closet.compat
+    )
 
     inner_candidates = build_inner_candidates(dress_colors, tb_sets)
+    gauge("candidates", len(tb_sets), kind="top_bottom_sets")
+    gauge("candidates", len(inner_candidates), kind="inner")
 
-    selected_items: Dict[str, List[str]] = {
-        "상의": [p.item_id for p in tops],
-        "하의": [p.item_id for p in bottoms],
-        "원피스": [p.item_id for p in dresses],
-        "아우터": [p.item_id for p in outers],
-    }
+    selected_items = _selected_item_ids(colors)
 
     if not inner_candidates:
-        return {"selected_items": selected_items, "recommendations": []}
+        return _OutfitCandidates(part_ranked, color_index, selected_items, [])
 
     M = max(1, min(int(top_k), 30))
     final_outfits = build_final_outfits_with_match(
@@ -591,78 +1132,133 @@ def recommend_outfits(
         alpha_oi=alpha_oi,
         beta_tb=beta_tb,
         lambda_tbset=lambda_tbset,
+        compat=closet.compat,
+    )
+    gauge("candidates", len(final_outfits), kind="outfits")
+    return _OutfitCandidates(part_ranked, color_index, selected_items, final_outfits)
+
+
+def _rank_outfits(
+    closet: PreparedCloset,
+    emb_by_id: Dict[str, np.ndarray],
+    similarities: np.ndarray,
+    mood: str,
+    temperature: float,
+    top_k: int,
+    alpha_tb: float,
+    alpha_oi: float,
+    mmr_lambda: float,
+    beta_tb: float,
+    lambda_tbset: float,
+) -> Dict[str, Any]:
+    """Candidate selection → combinations → MMR → reasons for one query.
+
+    *similarities* is the query's ``[N]`` cosine similarity to the closet items.
+    """
+    candidates = _outfit_candidates(
+        closet,
+        emb_by_id,
+        similarities,
+        temperature=temperature,
+        top_k=top_k,
+        alpha_tb=alpha_tb,
+        alpha_oi=alpha_oi,
+        beta_tb=beta_tb,
+        lambda_tbset=lambda_tbset,
     )
-    final_outfits = apply_mmr_reranking(final_outfits, M=M, lamb=mmr_lambda)
+    return _finish_outfits(closet, candidates, mood=mood, temperature=temperature, top_k=top_k, mmr_lambda=mmr_lambda)
+
+
+def _finish_outfits(
+    closet: PreparedCloset,
+    candidates: _OutfitCandidates,
+    mood: str,
+    temperature: float,
+    top_k: int,
+    mmr_lambda: float,
+    history: Sequence[Set[str]] = (),
+) -> Dict[str, Any]:
+    """MMR → reasons. *history* is passed to :func:`apply_mmr_reranking`."""
+    part_ranked = candidates.part_ranked
+    color_index = candidates.color_index
+    selected_items = candidates.selected_items
+    if not candidates.outfits:
+        return {"selected_items": selected_items, "recommendations": []}
+
+    M = max(1, min(int(top_k), 30))
+    final_outfits = apply_mmr_reranking(candidates.outfits, M=M, lamb=mmr_lambda, history=history)
 
     mood_label = mood.strip() or "입력한"
 
     color_name_map: Dict[str, Optional[str]] = {}
-    for p in tops + bottoms + outers + dresses:
-        color_name_map[p.item_id] = p.color_name
+    for part in ("상의", "하의", "아우터", "원피스"):
+        for i in part_ranked[part]:
+            color_name_map[closet.item_ids[i]] = closet.color_names[i]
 
     results: List[Dict[str, Any]] = []
 
-    for fo in final_outfits:
-        raw_score = _similarity_to_score(fo.score)
-
-        cn: Dict[str, Optional[str]] = {}
-        if fo.outer_id:
-            cn["outer"] = color_name_map.get(fo.outer_id)
-
-        harmony_desc: Optional[str] = None
-        color_score = 0.0
-
-        if fo.inner.kind == "dress":
-            cn["dress"] = color_name_map.get(fo.inner.ids[0])
-            dress_ci = color_index.get(fo.inner.ids[0])
-            outer_ci = color_index.get(fo.outer_id) if fo.outer_id else None
-            if dress_ci and outer_ci:
-                harmony_desc = describe_harmony(dress_ci.lab, outer_ci.lab)
-                color_score = harmony_score_lab(dress_ci.lab, outer_ci.lab)
-
-            results.append(
-                {
-                    "outfit_type": "dress",
-                    "dress_id": fo.inner.ids[0],
-                    "outer_id": fo.outer_id,
-                    "score": round(raw_score, 4),
-                    "reason": _build_reason(
-                        mood=mood_label,
-                        temperature=temperature,
-                        has_outer=fo.outer_id is not None,
-                        is_dress=True,
-                        color_names=cn,
-                        harmony_desc=harmony_desc,
-                        color_score=color_score,
-                    ),
-                }
-            )
-        else:
-            cn["top"] = color_name_map.get(fo.inner.ids[0])
-            cn["bottom"] = color_name_map.get(fo.inner.ids[1])
-            top_ci = color_index.get(fo.inner.ids[0])
-            bot_ci = color_index.get(fo.inner.ids[1])
-            if top_ci and bot_ci:
-                harmony_desc = describe_harmony(top_ci.lab, bot_ci.lab)
-                color_score = harmony_score_lab(top_ci.lab, bot_ci.lab)
-
-            results.append(
-                {
-                    "outfit_type": "two_piece",
-                    "top_id": fo.inner.ids[0],
-                    "bottom_id": fo.inner.ids[1],
-                    "outer_id": fo.outer_id,
-                    "score": round(raw_score, 4),
-                    "reason": _build_reason(
-                        mood=mood_label,
-                        temperature=temperature,
-                        has_outer=fo.outer_id is not None,
-                        is_dress=False,
-                        color_names=cn,
-                        harmony_desc=harmony_desc,
-                        color_score=color_score,
-                    ),
-                }
-            )
+    with stage("build_reasons"):
+        for fo in final_outfits:
+            raw_score = _similarity_to_score(fo.score)
+
+            cn: Dict[str, Optional[str]] = {}
+            if fo.outer_id:
+                cn["outer"] = color_name_map.get(fo.outer_id)
+
+            harmony_desc: Optional[str] = None
+            color_score = 0.0
+
+            if fo.inner.kind == "dress":
+                cn["dress"] = color_name_map.get(fo.inner.ids[0])
+                dress_ci = color_index.get(fo.inner.ids[0])
+                outer_ci = color_index.get(fo.outer_id) if fo.outer_id else None
+                if dress_ci and outer_ci:
+                    harmony_desc = describe_harmony(dress_ci.lab, outer_ci.lab)
+                    color_score = harmony_score_lab(dress_ci.lab, outer_ci.lab)
+
+                results.append(
+                    {
+                        "outfit_type": "dress",
+                        "dress_id": fo.inner.ids[0],
+                        "outer_id": fo.outer_id,
+                        "score": round(raw_score, 4),
+                        "reason": _build_reason(
+                            mood=mood_label,
+                            temperature=temperature,
+                            has_outer=fo.outer_id is not None,
+                            is_dress=True,
+                            color_names=cn,
+                            harmony_desc=harmony_desc,
+                            color_score=color_score,
+                        ),
+                    }
+                )
+            else:
+                cn["top"] = color_name_map.get(fo.inner.ids[0])
+                cn["bottom"] = color_name_map.get(fo.inner.ids[1])
+                top_ci = color_index.get(fo.inner.ids[0])
+                bot_ci = color_index.get(fo.inner.ids[1])
+                if top_ci and bot_ci:
+                    harmony_desc = describe_harmony(top_ci.lab, bot_ci.lab)
+                    color_score = harmony_score_lab(top_ci.lab, bot_ci.lab)
+
+                results.append(
+                    {
+                        "outfit_type": "two_piece",
+                        "top_id": fo.inner.ids[0],
+                        "bottom_id": fo.inner.ids[1],
+                        "outer_id": fo.outer_id,
+                        "score": round(raw_score, 4),
+                        "reason": _build_reason(
+                            mood=mood_label,
+                            temperature=temperature,
+                            has_outer=fo.outer_id is not None,
+                            is_dress=False,
+                            color_names=cn,
+                            harmony_desc=harmony_desc,
+                            color_score=color_score,
+                        ),
+                    }
+                )
 
     return {"selected_items": selected_items, "recommendations": results}
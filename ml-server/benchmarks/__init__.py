@@ -0,0 +1 @@
+# Benchmarks for the ML server (run from ml-server/: python -m benchmarks.<name>).
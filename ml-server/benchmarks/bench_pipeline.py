@@ -0,0 +1,235 @@
+"""End-to-end and per-stage benchmark of /recommend and /analyze.
+
+    cd ml-server && python -m benchmarks.bench_pipeline --output bench.json
+    cd ml-server && python -m benchmarks.bench_pipeline --quick --output bench.json
+
+recommend_outfits: 옷장 크기 × part 구성 × top_k 마다 cold(임베딩 캐시 비움) /
+warm(캐시 적중) 두 경우를 측정하고, app.metrics 단계 타이머로 단계별 시간을 함께 기록.
+/analyze: 생성한 JPEG/PNG 이미지로 요청 처리 함수(디코딩 → 전처리 → 추론 → 응답 변환)를 측정.
+
+실제 모델이 없으면 benchmarks.stand_ins의 작은 랜덤 가중치 모델을 씁니다
+(결과 JSON의 meta.models에 기록). 결과 비교는 ``python -m benchmarks.compare``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import onnxruntime as ort
+from PIL import Image, ImageFilter
+
+from app.metrics import collect_stages
+from app.model_loader import ArtifactsBundle, load_artifacts
+from app.predictor import get_feature_resolvers, recommend_outfits
+
+from .stand_ins import MOOD_WORDS, resolve_models
+from .synthetic import PART_MIXES, make_closet
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+DEFAULT_TOP_KS = (5, 10, 30)
+DEFAULT_IMAGES = ("jpeg:640x480", "jpeg:1280x960", "jpeg:4032x3024", "png:1280x960")
+
+
+def _percentile(ordered: Sequence[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(samples_ms: Sequence[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    return {
+        "n": len(ordered),
+        "p50_ms": round(statistics.median(ordered), 4),
+        "p95_ms": round(_percentile(ordered, 0.95), 4),
+        "p99_ms": round(_percentile(ordered, 0.99), 4),
+        "min_ms": round(ordered[0], 4),
+        "mean_ms": round(statistics.fmean(ordered), 4),
+    }
+
+
+def _measure(
+    fn: Callable[[], Any], repeat: int, before: Optional[Callable[[], None]] = None
+) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """Run *fn* *repeat* times; returns (total summary, per-stage p50 ms)."""
+    totals: List[float] = []
+    stages: Dict[str, List[float]] = defaultdict(list)
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        with collect_stages() as timings:
+            started = time.perf_counter()
+            fn()
+            totals.append((time.perf_counter() - started) * 1000.0)
+        for name, ms in timings.stages.items():
+            stages[name].append(ms)
+    stage_p50 = {name: round(statistics.median(v), 4) for name, v in stages.items()}
+    return summarize(totals), stage_p50
+
+
+# ----------------------------------------------------------------------------
+# /recommend
+# ----------------------------------------------------------------------------
+
+def _clear_embedding_caches(bundle: ArtifactsBundle) -> None:
+    if bundle.item_cache is not None:
+        bundle.item_cache.clear()
+    if bundle.text_cache is not None:
+        bundle.text_cache.clear()
+
+
+def bench_recommend(
+    bundle: ArtifactsBundle,
+    sizes: Sequence[int],
+    mixes: Sequence[str],
+    top_ks: Sequence[int],
+    repeat: int,
+    seed: int,
+    temperature: float = 10.0,
+) -> Dict[str, Dict[str, Any]]:
+    cases: Dict[str, Dict[str, Any]] = {}
+    mood = " ".join(MOOD_WORDS[:2])
+    for size in sizes:
+        # 큰 옷장은 반복 수를 줄여 전체 실행 시간을 맞춤
+        n_repeat = max(3, min(repeat, int(repeat * 1000 / max(size, 1000))))
+        for mix in mixes:
+            closet = make_closet(size, seed=seed, part_mix=mix)
+            for top_k in top_ks:
+                run = lambda: recommend_outfits(  # noqa: E731
+                    bundle, mood=mood, comment="", temperature=temperature,
+                    closet_items=closet, top_k=top_k,
+                )
+                for mode in ("cold", "warm"):
+                    before = (lambda: _clear_embedding_caches(bundle)) if mode == "cold" else None
+                    if mode == "warm":
+                        run()
+                    total, stages = _measure(run, n_repeat, before)
+                    key = f"recommend/{size}/{mix}/top{top_k}/{mode}"
+                    cases[key] = {
+                        "kind": "recommend",
+                        "closet_size": size,
+                        "part_mix": mix,
+                        "top_k": top_k,
+                        "cache": mode,
+                        **total,
+                        "stages": stages,
+                    }
+                    print(f"{key:<40} p50 {total['p50_ms']:9.3f} ms  p95 {total['p95_ms']:9.3f} ms")
+    return cases
+
+
+# ----------------------------------------------------------------------------
+# /analyze
+# ----------------------------------------------------------------------------
+
+def make_image_bytes(fmt: str, width: int, height: int, seed: int = 0) -> bytes:
+    """Smooth random 'photo' (블러 처리한 저해상도 노이즈 업샘플) encoded as *fmt*."""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 255, (max(2, height // 64), max(2, width // 64), 3), dtype=np.uint8)
+    image = Image.fromarray(base).resize((width, height), Image.BICUBIC).filter(ImageFilter.GaussianBlur(2))
+    buf = io.BytesIO()
+    if fmt == "jpeg":
+        image.save(buf, "JPEG", quality=90)
+    else:
+        image.save(buf, fmt.upper())
+    return buf.getvalue()
+
+
+def bench_analyze(effnet_path: Path, images: Sequence[str], repeat: int, seed: int) -> Dict[str, Dict[str, Any]]:
+    from app import main as server  # /analyze 핸들러 본문 (_analyze_contents)
+    from app.efficientnet_classifier import EfficientNetClassifier
+
+    classifier = EfficientNetClassifier(str(effnet_path))
+    cases: Dict[str, Dict[str, Any]] = {}
+    for spec in images:
+        fmt, size = spec.split(":")
+        width, height = (int(v) for v in size.lower().split("x"))
+        data = make_image_bytes(fmt, width, height, seed)
+        run = lambda: server._analyze_contents(classifier, data)  # noqa: E731
+        run()
+        # 결과 캐시를 매번 비워 디코딩·추론 경로를 측정
+        total, stages = _measure(run, repeat, before=server.analysis_cache.clear)
+        key = f"analyze/{fmt}_{width}x{height}"
+        cases[key] = {
+            "kind": "analyze",
+            "format": fmt,
+            "width": width,
+            "height": height,
+            "bytes": len(data),
+            **total,
+            "stages": stages,
+        }
+        print(f"{key:<40} p50 {total['p50_ms']:9.3f} ms  p95 {total['p95_ms']:9.3f} ms")
+    return cases
+
+
+# ----------------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------------
+
+def _csv(value: str, cast: Callable[[str], Any] = str) -> List[Any]:
+    return [cast(v.strip()) for v in value.split(",") if v.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda v: _csv(v, int), default=list(DEFAULT_SIZES))
+    parser.add_argument("--mixes", type=_csv, default=list(PART_MIXES))
+    parser.add_argument("--top-k", type=lambda v: _csv(v, int), default=list(DEFAULT_TOP_KS))
+    parser.add_argument("--images", type=_csv, default=list(DEFAULT_IMAGES), help="fmt:WxH,...")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="sizes 10,100,1000 / top_k 10 / repeat 5")
+    parser.add_argument("--skip-recommend", action="store_true")
+    parser.add_argument("--skip-analyze", action="store_true")
+    parser.add_argument("--artifacts", type=Path, default=None, help="artifacts_config.json path")
+    parser.add_argument("--effnet", type=Path, default=None, help="efficientnet onnx path")
+    parser.add_argument("--stand-ins", action="store_true", help="always use random-weight stand-ins")
+    parser.add_argument("--output", type=Path, default=None, help="write results JSON here")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.sizes, args.top_k, args.repeat = [10, 100, 1000], [10], min(args.repeat, 5)
+
+    with tempfile.TemporaryDirectory(prefix="ootd-bench-") as work_dir:
+        artifacts_config, effnet_path, sources = resolve_models(
+            Path(work_dir), args.artifacts, args.effnet, force_stand_ins=args.stand_ins
+        )
+        cases: Dict[str, Dict[str, Any]] = {}
+        if not args.skip_recommend:
+            bundle = load_artifacts(str(artifacts_config))
+            get_feature_resolvers(bundle)
+            cases.update(bench_recommend(bundle, args.sizes, args.mixes, args.top_k, args.repeat, args.seed))
+        if not args.skip_analyze:
+            cases.update(bench_analyze(effnet_path, args.images, args.repeat, args.seed))
+
+    result = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "onnxruntime": ort.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "models": sources,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "cases": cases,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"wrote {args.output} ({len(cases)} cases)")
+
+
+if __name__ == "__main__":
+    main()
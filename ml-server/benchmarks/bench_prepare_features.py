@@ -0,0 +1,71 @@
+"""Microbenchmark: per-item feature preparation, legacy resolution vs compiled resolvers.
+
+    cd ml-server && python -m benchmarks.bench_prepare_features
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+from typing import Any, Dict, Optional, Tuple
+
+from app import predictor as P
+
+from .synthetic import make_closet, synthetic_bundle_fields
+
+
+def _legacy_prepare(bundle: Any, item: Dict[str, Any], weather_label: str) -> Optional[Tuple]:
+    """_prepare_item_features as it was before compiled resolvers (per-item closure)."""
+    attrs = item.get("attributes") or {}
+
+    def pick(*keys: str) -> Any:
+        for key in keys:
+            if key in attrs and attrs.get(key) is not None:
+                return attrs.get(key)
+            if key in item and item.get(key) is not None:
+                return item.get(key)
+        return None
+
+    part = P._normalize_part(pick(*P._PART_KEYS))
+    if part not in P.TARGET_PARTS:
+        return None
+    row = {"part": P._pick_map_index(part, bundle.maps.get("part", {}))}
+    for col, (keys, aliases) in P._FEATURE_SOURCES.items():
+        row[col] = P._pick_map_index(pick(*keys), bundle.maps.get(col, {}), aliases)
+    row["날씨"] = P._pick_map_index(weather_label, bundle.maps.get("날씨", {}))
+    return (
+        str(item["id"]),
+        part,
+        [row[k] for k in bundle.feature_cols],
+        P._temp_range_from_seasons(item.get("season")),
+        P._normalize_text(pick("color", "색상")),
+        P._normalize_text(pick("sub_color", "서브색상")),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bundle = synthetic_bundle_fields()
+    P.get_feature_resolvers(bundle)
+    closet = make_closet(args.items, seed=0)
+
+    legacy_rows = [_legacy_prepare(bundle, it, "선선") for it in closet]
+    compiled_rows = [P._prepare_item_features(bundle, it, "선선") for it in closet]
+    assert legacy_rows == compiled_rows, "compiled resolvers disagree with legacy resolution"
+
+    results = {}
+    for name, fn in (("legacy", _legacy_prepare), ("compiled", P._prepare_item_features)):
+        best = min(
+            timeit.repeat(lambda: [fn(bundle, it, "선선") for it in closet], number=1, repeat=args.repeat)
+        )
+        results[name] = best
+        print(f"{name:>9}: {best * 1e3:8.2f} ms / {args.items} items  ({best / args.items * 1e6:.2f} us/item)")
+    print(f"  speedup: {results['legacy'] / results['compiled']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
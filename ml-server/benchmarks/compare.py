@@ -0,0 +1,90 @@
+"""Compare two bench_pipeline JSON results and flag regressions.
+
+    cd ml-server && python -m benchmarks.compare baseline.json current.json --threshold 0.15
+
+같은 case 키끼리 지표(기본 p50_ms)를 비교해 ``current > baseline * (1 + threshold)``
+이고 차이가 ``--min-delta-ms`` 이상이면 회귀로 보고 종료 코드 1을 돌려줍니다.
+``--stages``를 주면 단계별 p50도 같은 기준으로 검사합니다.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+
+def _load(path: Path) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def find_regressions(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    metric: str = "p50_ms",
+    threshold: float = 0.15,
+    min_delta_ms: float = 0.5,
+    stages: bool = False,
+) -> Tuple[List[Tuple[str, float, float, float, bool]], List[str]]:
+    """Returns ([(name, base, cur, ratio, regressed)], keys missing from *current*)."""
+    rows: List[Tuple[str, float, float, float, bool]] = []
+    base_cases = baseline.get("cases", {})
+    cur_cases = current.get("cases", {})
+
+    def _check(name: str, base: float, cur: float) -> None:
+        ratio = cur / base if base > 0 else float("inf")
+        regressed = cur > base * (1.0 + threshold) and (cur - base) >= min_delta_ms
+        rows.append((name, base, cur, ratio, regressed))
+
+    for key in sorted(base_cases):
+        if key not in cur_cases:
+            continue
+        base_case, cur_case = base_cases[key], cur_cases[key]
+        if metric in base_case and metric in cur_case:
+            _check(key, float(base_case[metric]), float(cur_case[metric]))
+        if stages:
+            for stage_name, base_ms in sorted(base_case.get("stages", {}).items()):
+                cur_ms = cur_case.get("stages", {}).get(stage_name)
+                if cur_ms is not None:
+                    _check(f"{key} :: {stage_name}", float(base_ms), float(cur_ms))
+
+    missing = sorted(set(base_cases) - set(cur_cases))
+    return rows, missing
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("current", type=Path)
+    parser.add_argument("--metric", default="p50_ms", choices=["p50_ms", "p95_ms", "p99_ms", "min_ms", "mean_ms"])
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="ignore smaller absolute changes")
+    parser.add_argument("--stages", action="store_true", help="also check per-stage p50")
+    parser.add_argument("--all", action="store_true", help="print every case, not just regressions")
+    args = parser.parse_args()
+
+    baseline, current = _load(args.baseline), _load(args.current)
+    if baseline.get("meta", {}).get("models") != current.get("meta", {}).get("models"):
+        print("warning: runs used different models:", baseline.get("meta", {}).get("models"),
+              "vs", current.get("meta", {}).get("models"))
+
+    rows, missing = find_regressions(
+        baseline, current, args.metric, args.threshold, args.min_delta_ms, args.stages
+    )
+    regressions = [r for r in rows if r[4]]
+    for name, base, cur, ratio, regressed in rows:
+        if args.all or regressed:
+            flag = "REGRESSION" if regressed else ""
+            print(f"{name:<60} {base:10.3f} -> {cur:10.3f} ms  x{ratio:5.2f}  {flag}")
+    for key in missing:
+        print(f"{key:<60} missing from current run")
+
+    print(f"{len(rows)} compared, {len(regressions)} regressions (>{args.threshold:.0%}, {args.metric})")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Offline hyperparameter exploration over captured /recommend payloads.
+
+    cd ml-server && python -m benchmarks.hp_explore payloads.jsonl --vectors 1000 --sigma 0.05
+    cd ml-server && python -m benchmarks.hp_explore payloads.jsonl --verify 20 --output explore.jsonl
+
+프론트엔드의 탐색 샘플링처럼 요청마다 하이퍼파라미터에 Gaussian noise를 더한
+벡터 S개를 만들고, predictor.rescore_outfits로 한 번에 채점합니다 (조합 feature
+1회 + [S, 8] @ [8, C] + batched top-k/MMR). payload 형식은 benchmarks.replay와 같습니다.
+
+--verify N이면 payload마다 앞쪽 N개 벡터를 recommend_outfits로 하나씩 다시 돌려
+결과가 같은지 확인하고, 다르면 종료 코드 1. --output에는 payload별 벡터와
+선택된 코디(replay 골든과 같은 outfit key)를 JSONL로 씁니다.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.match_harmony import HP_NAMES
+from app.model_loader import load_artifacts
+from app.predictor import get_feature_resolvers, recommend_outfits, rescore_outfits
+
+from .bench_pipeline import summarize
+from .replay import _outfit_key, load_payloads
+from .stand_ins import resolve_models
+
+
+def sample_hyperparameters(base: np.ndarray, count: int, sigma: float, rng: np.random.Generator) -> np.ndarray:
+    """*base* (HP_NAMES order) 첫 행 + Gaussian noise를 더해 [0, 1]로 자른 ``count - 1``행."""
+    noise = rng.normal(0.0, sigma, size=(max(count - 1, 0), len(HP_NAMES)))
+    return np.vstack([base[None, :], np.clip(base[None, :] + noise, 0.0, 1.0)])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("payloads", type=Path, help="JSONL of captured /recommend bodies")
+    parser.add_argument("--vectors", type=int, default=1000, help="hyperparameter vectors per payload (incl. the request's own)")
+    parser.add_argument("--sigma", type=float, default=0.05, help="Gaussian noise std per hyperparameter")
+    parser.add_argument("--verify", type=int, default=0, help="re-run the first N vectors per payload one by one")
+    parser.add_argument("--limit", type=int, default=0, help="only the first N payloads")
+    parser.add_argument("--artifacts", type=Path, default=None, help="artifacts_config.json path")
+    parser.add_argument("--stand-ins", action="store_true", help="always use random-weight stand-ins")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None, help="write per-payload selections as JSONL")
+    args = parser.parse_args()
+
+    from app.main import RecommendRequest, recommend_params
+
+    payloads, skipped = load_payloads(args.payloads)
+    if args.limit:
+        payloads = payloads[: args.limit]
+    if not payloads:
+        raise SystemExit(f"no /recommend payloads in {args.payloads} (skipped: {skipped})")
+
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory(prefix="ootd-explore-") as work_dir:
+        artifacts_config, _, sources = resolve_models(
+            Path(work_dir), args.artifacts, force_stand_ins=args.stand_ins, with_effnet=False
+        )
+        bundle = load_artifacts(str(artifacts_config))
+    get_feature_resolvers(bundle)
+    print(f"models: {sources['artifacts']}, {len(payloads)} payloads x {args.vectors} vectors")
+
+    latencies: List[float] = []
+    top1_stable: List[float] = []
+    mismatches = 0
+    out = open(args.output, "w", encoding="utf-8") if args.output else None
+    try:
+        for payload_id, body in payloads:
+            params = recommend_params(RecommendRequest.model_validate(body))
+            closet_items = body.get("closet_items") or []
+            base = np.array([params[name] for name in HP_NAMES], dtype=np.float64)
+            hps = sample_hyperparameters(base, args.vectors, args.sigma, rng)
+
+            started = time.perf_counter()
+            result = rescore_outfits(
+                bundle,
+                params["mood"],
+                params["comment"],
+                params["temperature"],
+                closet_items,
+                hps,
+                top_k=params["top_k"],
+            )
+            latencies.append((time.perf_counter() - started) * 1000.0)
+
+            keys = [[_outfit_key(row) for row in rows] for rows in result["results"]]
+            if keys[0]:
+                top1_stable.append(float(np.mean([bool(k) and k[0] == keys[0][0] for k in keys])))
+
+            for s in range(min(args.verify, len(hps))):
+                overrides = dict(zip(HP_NAMES, map(float, hps[s])))
+                ref = recommend_outfits(bundle, closet_items=closet_items, **{**params, **overrides})
+                expected = [{k: v for k, v in row.items() if k != "reason"} for row in ref["recommendations"]]
+                if expected != result["results"][s]:
+                    mismatches += 1
+                    print(f"MISMATCH {payload_id} vector {s}: {overrides}")
+
+            if out is not None:
+                record: Dict[str, Any] = {
+                    "id": payload_id,
+                    "hyperparameters": hps.round(6).tolist(),
+                    "outfits": keys,
+                    "scores": [[row["score"] for row in rows] for rows in result["results"]],
+                }
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if out is not None:
+            out.close()
+
+    stats = summarize(latencies)
+    print(
+        f"per payload ({args.vectors} vectors): p50 {stats['p50_ms']:.3f} ms  p95 {stats['p95_ms']:.3f} ms  "
+        f"-> {args.vectors / max(stats['p50_ms'], 1e-9) * 1000.0:.0f} vectors/s"
+    )
+    if top1_stable:
+        print(f"top-1 unchanged under noise: {np.mean(top1_stable) * 100:.1f}% of vectors (sigma {args.sigma})")
+    if args.verify:
+        checked = len(payloads) * min(args.verify, args.vectors)
+        print(f"verify: {checked - mismatches}/{checked} vectors match recommend_outfits")
+    raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
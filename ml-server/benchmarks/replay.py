@@ -0,0 +1,341 @@
+"""Replay captured /recommend payloads for throughput and golden-output checks.
+
+    cd ml-server && python -m benchmarks.replay payloads.jsonl --synthesize 200
+    cd ml-server && python -m benchmarks.replay payloads.jsonl --write-golden golden.json
+    cd ml-server && python -m benchmarks.replay payloads.jsonl --golden golden.json --concurrency 8
+    cd ml-server && python -m benchmarks.replay payloads.jsonl --mode asgi --concurrency 16
+
+입력은 한 줄에 /recommend 요청 본문 하나인 JSONL입니다. ``{"id": ..., "payload": {...}}``
+형태도 받습니다. 요청 본문이 아닌 줄(예: 저장소 루트의 requests.jsonl 같은 작업 목록)은
+건너뛰고 개수만 알려 줍니다. 서버 저장 옷장(closet_id) 요청은 재현할 수 없으므로 건너뜁니다.
+
+- ``--mode inproc``: predictor.recommend_outfits를 스레드 풀에서 직접 호출
+- ``--mode asgi``: FastAPI 앱을 httpx ASGI transport로 호출 (startup 이벤트 포함,
+  micro-batching/executor/미들웨어까지 같은 경로). ``httpx`` 패키지가 필요합니다.
+
+골든 파일에는 요청별 추천 순서(outfit 유형 + id)와 score가 들어 있어,
+match_harmony/color_harmony 성능 리팩터 전후의 출력 동일성을 확인할 수 있습니다.
+불일치가 있으면 종료 코드 1.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.model_loader import load_artifacts
+from app.predictor import get_feature_resolvers, recommend_outfits
+
+from .bench_pipeline import summarize
+from .stand_ins import MOOD_WORDS, resolve_models
+from .synthetic import PART_MIXES, make_closet
+
+# (payload id, /recommend body)
+Payload = Tuple[str, Dict[str, Any]]
+
+
+# ----------------------------------------------------------------------------
+# payload 읽기 / 생성
+# ----------------------------------------------------------------------------
+
+def _as_payload(record: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(record, dict):
+        return None
+    if isinstance(record.get("user_context"), dict):
+        return record
+    for key in ("payload", "body", "request"):
+        inner = record.get(key)
+        if isinstance(inner, dict) and isinstance(inner.get("user_context"), dict):
+            return inner
+    return None
+
+
+def load_payloads(path: Path) -> Tuple[List[Payload], Dict[str, int]]:
+    """Read /recommend bodies from *path*; returns (payloads, skipped counts by reason)."""
+    payloads: List[Payload] = []
+    skipped = {"not_recommend": 0, "closet_id": 0, "invalid_json": 0}
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                skipped["invalid_json"] += 1
+                continue
+            body = _as_payload(record)
+            if body is None:
+                skipped["not_recommend"] += 1
+                continue
+            if body.get("closet_id") and not body.get("closet_items"):
+                skipped["closet_id"] += 1
+                continue
+            payload_id = str(record.get("id") or record.get("request_id") or f"line-{line_no}")
+            payloads.append((payload_id, body))
+    return payloads, skipped
+
+
+def synthesize_payloads(path: Path, count: int, seed: int = 0) -> None:
+    """Write *count* seeded /recommend bodies (synthetic closets of 10–300 items)."""
+    rng = random.Random(seed)
+    mixes = list(PART_MIXES)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            body = {
+                "user_context": {
+                    "text": " ".join(rng.sample(MOOD_WORDS, rng.randint(1, 3))),
+                    "comment": "",
+                    "weather": {"temperature": rng.randint(-10, 33), "feels_like": 0.0, "precipitation": 0.0},
+                },
+                "closet_items": make_closet(rng.randint(10, 300), seed=seed + i, part_mix=rng.choice(mixes)),
+                "top_k": rng.choice([5, 10, 20]),
+            }
+            f.write(json.dumps({"id": f"synthetic-{i}", "payload": body}, ensure_ascii=False) + "\n")
+
+
+# ----------------------------------------------------------------------------
+# 실행
+# ----------------------------------------------------------------------------
+
+# (payload id, latency ms, recommendations or None, error)
+Outcome = Tuple[str, float, Optional[List[Dict[str, Any]]], Optional[str]]
+
+
+def _replay_inproc(
+    artifacts_config: Path, payloads: List[Payload], concurrency: int, warmup: int
+) -> Tuple[List[Outcome], float]:
+    from app.main import RecommendRequest, recommend_params
+
+    bundle = load_artifacts(str(artifacts_config))
+    get_feature_resolvers(bundle)
+
+    def _one(payload: Payload) -> Outcome:
+        payload_id, body = payload
+        started = time.perf_counter()
+        try:
+            request = RecommendRequest.model_validate(body)
+            params = recommend_params(request)
+            if len(params["mood"]) < 2:
+                raise ValueError("text must be at least 2 characters")
+            result = recommend_outfits(
+                bundle, closet_items=[item.model_dump() for item in request.closet_items], **params
+            )
+            return payload_id, (time.perf_counter() - started) * 1000.0, result["recommendations"], None
+        except Exception as exc:  # noqa: BLE001 - 재생 결과로 기록
+            return payload_id, (time.perf_counter() - started) * 1000.0, None, repr(exc)
+
+    for payload in payloads[:warmup]:
+        _one(payload)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        started = time.perf_counter()
+        outcomes = list(pool.map(_one, payloads))
+        wall = time.perf_counter() - started
+    return outcomes, wall
+
+
+async def _replay_asgi_async(
+    artifacts_config: Path, payloads: List[Payload], concurrency: int, warmup: int
+) -> Tuple[List[Outcome], float]:
+    try:
+        import httpx
+    except ImportError as exc:  # pragma: no cover - depends on environment
+        raise SystemExit("--mode asgi needs the `httpx` package (pip install httpx)") from exc
+    from app import main as server
+
+    # 서버 startup과 같은 경로로 로드 (micro-batching 래핑 포함)
+    os.environ["ARTIFACTS_PATH"] = str(artifacts_config)
+    await server.startup_event()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one(client: Any, payload: Payload) -> Outcome:
+        payload_id, body = payload
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post("/recommend", json=body)
+                elapsed = (time.perf_counter() - started) * 1000.0
+            except Exception as exc:  # noqa: BLE001
+                return payload_id, (time.perf_counter() - started) * 1000.0, None, repr(exc)
+        if response.status_code != 200:
+            return payload_id, elapsed, None, f"HTTP {response.status_code}: {response.text[:200]}"
+        return payload_id, elapsed, response.json()["recommendations"], None
+
+    transport = httpx.ASGITransport(app=server.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=None) as client:
+            for payload in payloads[:warmup]:
+                await _one(client, payload)
+            started = time.perf_counter()
+            outcomes = await asyncio.gather(*(_one(client, p) for p in payloads))
+            wall = time.perf_counter() - started
+    finally:
+        await server.shutdown_event()
+    return list(outcomes), wall
+
+
+def _replay_asgi(
+    artifacts_config: Path, payloads: List[Payload], concurrency: int, warmup: int
+) -> Tuple[List[Outcome], float]:
+    return asyncio.run(_replay_asgi_async(artifacts_config, payloads, concurrency, warmup))
+
+
+_MODES: Dict[str, Callable[..., Tuple[List[Outcome], float]]] = {
+    "inproc": _replay_inproc,
+    "asgi": _replay_asgi,
+}
+
+
+# ----------------------------------------------------------------------------
+# 골든 비교
+# ----------------------------------------------------------------------------
+
+def _outfit_key(row: Dict[str, Any]) -> str:
+    if row.get("outfit_type") == "dress":
+        parts = [row.get("dress_id"), row.get("outer_id")]
+    else:
+        parts = [row.get("top_id"), row.get("bottom_id"), row.get("outer_id")]
+    return f"{row.get('outfit_type', 'two_piece')}:" + "|".join(p or "-" for p in parts)
+
+
+def golden_entries(outcomes: List[Outcome]) -> Dict[str, Any]:
+    entries: Dict[str, Any] = {}
+    for payload_id, _, recs, error in outcomes:
+        if error is not None:
+            entries[payload_id] = {"error": error}
+        else:
+            entries[payload_id] = [[_outfit_key(r), float(r["score"])] for r in recs or []]
+    return entries
+
+
+def diff_golden(
+    golden: Dict[str, Any], current: Dict[str, Any], score_tol: float
+) -> List[str]:
+    """Human-readable mismatches between two golden-entry dicts (같은 id끼리)."""
+    problems: List[str] = []
+    for payload_id, expected in golden.items():
+        if payload_id not in current:
+            problems.append(f"{payload_id}: missing from this run")
+            continue
+        actual = current[payload_id]
+        if isinstance(expected, dict) or isinstance(actual, dict):
+            if expected != actual:
+                problems.append(f"{payload_id}: {expected} != {actual}")
+            continue
+        exp_keys = [k for k, _ in expected]
+        act_keys = [k for k, _ in actual]
+        if exp_keys != act_keys:
+            rank = next(
+                (i for i, (a, b) in enumerate(zip(exp_keys, act_keys)) if a != b),
+                min(len(exp_keys), len(act_keys)),
+            )
+            problems.append(
+                f"{payload_id}: ranking differs at #{rank} "
+                f"({len(exp_keys)} expected, {len(act_keys)} got)"
+            )
+            continue
+        for i, ((key, exp_score), (_, act_score)) in enumerate(zip(expected, actual)):
+            if abs(exp_score - act_score) > score_tol:
+                problems.append(f"{payload_id}: #{i} {key} score {exp_score} -> {act_score}")
+                break
+    return problems
+
+
+# ----------------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------------
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("payloads", type=Path, help="JSONL of captured /recommend bodies")
+    parser.add_argument("--synthesize", type=int, default=0, help="write N synthetic payloads to PAYLOADS and exit")
+    parser.add_argument("--mode", choices=sorted(_MODES), default="inproc")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1, help="replay the file this many times")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests before the run")
+    parser.add_argument("--limit", type=int, default=0, help="only the first N payloads")
+    parser.add_argument("--golden", type=Path, default=None, help="compare outputs against this file")
+    parser.add_argument("--write-golden", type=Path, default=None, help="store outputs as the new golden file")
+    parser.add_argument("--score-tol", type=float, default=1e-4, help="scores are rounded to 4 decimals")
+    parser.add_argument("--artifacts", type=Path, default=None, help="artifacts_config.json path")
+    parser.add_argument("--stand-ins", action="store_true", help="always use random-weight stand-ins")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None, help="write the latency report JSON here")
+    args = parser.parse_args()
+
+    if args.synthesize:
+        synthesize_payloads(args.payloads, args.synthesize, args.seed)
+        print(f"wrote {args.synthesize} payloads to {args.payloads}")
+        return
+
+    payloads, skipped = load_payloads(args.payloads)
+    if args.limit:
+        payloads = payloads[: args.limit]
+    if any(skipped.values()):
+        print(f"skipped lines: {skipped}")
+    if not payloads:
+        raise SystemExit(f"no /recommend payloads in {args.payloads}")
+
+    with tempfile.TemporaryDirectory(prefix="ootd-replay-") as work_dir:
+        artifacts_config, _, sources = resolve_models(
+            Path(work_dir), args.artifacts, force_stand_ins=args.stand_ins, with_effnet=False
+        )
+        run = payloads * max(1, args.repeat)
+        outcomes, wall = _MODES[args.mode](artifacts_config, run, max(1, args.concurrency), args.warmup)
+
+    latencies = [ms for _, ms, _, error in outcomes if error is None]
+    errors = [(pid, error) for pid, _, _, error in outcomes if error is not None]
+    report: Dict[str, Any] = {
+        "mode": args.mode,
+        "concurrency": args.concurrency,
+        "models": {"artifacts": sources["artifacts"]},
+        "requests": len(outcomes),
+        "errors": len(errors),
+        "throughput_rps": round(len(outcomes) / wall, 3) if wall > 0 else None,
+        **(summarize(latencies) if latencies else {}),
+    }
+    print(
+        f"{report['requests']} requests ({args.mode}, concurrency {args.concurrency}): "
+        f"{report['throughput_rps']} req/s, {len(errors)} errors"
+    )
+    if latencies:
+        print(f"latency p50 {report['p50_ms']:.3f} ms  p95 {report['p95_ms']:.3f} ms  p99 {report['p99_ms']:.3f} ms")
+    for pid, error in errors[:5]:
+        print(f"  error {pid}: {error}")
+
+    # 골든은 첫 번째 재생분 기준 (--repeat 반복분은 같은 id)
+    current = golden_entries(outcomes[: len(payloads)])
+    failed = False
+    if args.write_golden:
+        golden_doc = {"payloads": str(args.payloads), "models": report["models"], "results": current}
+        args.write_golden.write_text(json.dumps(golden_doc, ensure_ascii=False, indent=1), encoding="utf-8")
+        print(f"wrote golden {args.write_golden} ({len(current)} payloads)")
+    if args.golden:
+        golden_doc = json.loads(args.golden.read_text(encoding="utf-8"))
+        if golden_doc.get("models") != report["models"]:
+            print(f"warning: golden was recorded with {golden_doc.get('models')}, this run uses {report['models']}")
+        expected = golden_doc["results"]
+        if args.limit:
+            expected = {k: v for k, v in expected.items() if k in current}
+        problems = diff_golden(expected, current, args.score_tol)
+        report["golden_mismatches"] = len(problems)
+        for problem in problems[:20]:
+            print(f"  golden: {problem}")
+        print(f"golden: {len(expected) - len(problems)}/{len(expected)} payloads match")
+        failed = bool(problems)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Tiny random-weight ONNX stand-ins for the real models.
+
+실제 모델(model/artifacts_config.json + encoder, efficientnet_kfashion.onnx)이
+없는 환경에서도 벤치마크가 같은 코드 경로(load_artifacts / EfficientNetClassifier)를
+타도록, 입출력 이름·모양이 같은 작은 ONNX 모델과 설정 파일을 만듭니다.
+수치는 의미 없고 지연 시간의 모양만 봅니다. 모델 생성에는 ``onnx`` 패키지가 필요합니다.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.efficientnet_classifier import MULTI_LABEL_ATTRS, SINGLE_LABEL_ATTRS
+
+from .synthetic import FEATURE_COLS, WEATHER_LABEL_TO_TEMP_RANGE, build_maps
+
+ROOT = Path(__file__).resolve().parents[2]
+REAL_ARTIFACTS_CONFIG = ROOT / "model" / "artifacts_config.json"
+REAL_EFFNET = ROOT / "ml-server" / "app" / "efficientnet_kfashion.onnx"
+
+# 벤치마크 쿼리에 쓰는 무드 단어 (stand-in text vocab)
+MOOD_WORDS = [
+    "데일리", "캐주얼", "출근", "데이트", "미니멀", "스트릿", "포멀", "편안한",
+    "꾸안꾸", "하객", "여행", "운동", "비오는", "따뜻한", "시원한", "모던",
+]
+
+_OPSET = 18
+
+
+def _onnx():
+    try:
+        import onnx
+        from onnx import TensorProto, helper, numpy_helper
+    except ImportError as exc:  # pragma: no cover - depends on environment
+        raise SystemExit("stand-in models need the `onnx` package (pip install onnx)") from exc
+    return onnx, TensorProto, helper, numpy_helper
+
+
+def _save(model: Any, path: Path) -> None:
+    onnx, *_ = _onnx()
+    model.ir_version = 9
+    onnx.checker.check_model(model)
+    onnx.save(model, str(path))
+
+
+def write_text_encoder(path: Path, vocab_size: int, max_len: int, dim: int, seed: int = 0) -> None:
+    """input_ids/attention_mask [batch, seq] -> L2-normalized [batch, dim] (seq ≤ max_len)."""
+    _, TensorProto, helper, numpy_helper = _onnx()
+    rng = np.random.default_rng(seed)
+    emb = numpy_helper.from_array(rng.normal(size=(vocab_size, dim)).astype(np.float32), "emb")
+    proj = numpy_helper.from_array(rng.normal(size=(dim, dim)).astype(np.float32), "proj")
+    nodes = [
+        helper.make_node("Gather", ["emb", "input_ids"], ["tok"]),
+        helper.make_node("Cast", ["attention_mask"], ["maskf"], to=TensorProto.FLOAT),
+        helper.make_node("Unsqueeze", ["maskf", "axis2"], ["mask3"]),
+        helper.make_node("Mul", ["tok", "mask3"], ["masked"]),
+        helper.make_node("ReduceSum", ["masked", "axis1"], ["pooled"], keepdims=0),
+        helper.make_node("MatMul", ["pooled", "proj"], ["hidden"]),
+        helper.make_node("LpNormalization", ["hidden"], ["text_embedding"], axis=-1, p=2),
+    ]
+    inits = [
+        emb,
+        proj,
+        numpy_helper.from_array(np.array([2], dtype=np.int64), "axis2"),
+        numpy_helper.from_array(np.array([1], dtype=np.int64), "axis1"),
+    ]
+    graph = helper.make_graph(
+        nodes,
+        "text_encoder_stand_in",
+        [
+            helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch", "seq"]),
+            helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["batch", "seq"]),
+        ],
+        [helper.make_tensor_value_info("text_embedding", TensorProto.FLOAT, ["batch", dim])],
+        inits,
+    )
+    _save(helper.make_model(graph, opset_imports=[helper.make_opsetid("", _OPSET)]), path)
+
+
+def write_item_encoder(path: Path, vocab_size: int, num_features: int, dim: int, seed: int = 1) -> None:
+    """features [batch, num_features] int64 -> L2-normalized [batch, dim]."""
+    _, TensorProto, helper, numpy_helper = _onnx()
+    rng = np.random.default_rng(seed)
+    emb_dim = 16
+    nodes = [
+        helper.make_node("Gather", ["emb", "features"], ["cat"]),
+        helper.make_node("Reshape", ["cat", "flat_shape"], ["flat"]),
+        helper.make_node("MatMul", ["flat", "proj"], ["hidden"]),
+        helper.make_node("Relu", ["hidden"], ["act"]),
+        helper.make_node("MatMul", ["act", "out"], ["raw"]),
+        helper.make_node("LpNormalization", ["raw"], ["item_embedding"], axis=-1, p=2),
+    ]
+    inits = [
+        numpy_helper.from_array(rng.normal(size=(vocab_size, emb_dim)).astype(np.float32), "emb"),
+        numpy_helper.from_array(np.array([-1, num_features * emb_dim], dtype=np.int64), "flat_shape"),
+        numpy_helper.from_array(rng.normal(size=(num_features * emb_dim, dim)).astype(np.float32), "proj"),
+        numpy_helper.from_array(rng.normal(size=(dim, dim)).astype(np.float32), "out"),
+    ]
+    graph = helper.make_graph(
+        nodes,
+        "item_encoder_stand_in",
+        [helper.make_tensor_value_info("features", TensorProto.INT64, ["batch", num_features])],
+        [helper.make_tensor_value_info("item_embedding", TensorProto.FLOAT, ["batch", dim])],
+        inits,
+    )
+    _save(helper.make_model(graph, opset_imports=[helper.make_opsetid("", _OPSET)]), path)
+
+
+def write_effnet(path: Path, seed: int = 2, width: int = 32) -> None:
+    """image [batch, 3, 224, 224] -> one [batch, C] logits output per attribute head.
+
+    진짜 EfficientNet보다 훨씬 가벼우므로 추론 시간은 과소평가됩니다
+    (디코딩·전처리·후처리 비중을 보는 용도).
+    """
+    _, TensorProto, helper, numpy_helper = _onnx()
+    rng = np.random.default_rng(seed)
+    nodes = [
+        helper.make_node("Conv", ["image", "conv_w"], ["conv"], strides=[8, 8], kernel_shape=[8, 8]),
+        helper.make_node("Relu", ["conv"], ["act"]),
+        helper.make_node("GlobalAveragePool", ["act"], ["gap"]),
+        helper.make_node("Flatten", ["gap"], ["feat"]),
+    ]
+    inits = [numpy_helper.from_array(rng.normal(size=(width, 3, 8, 8)).astype(np.float32) * 0.1, "conv_w")]
+    outputs = []
+    for name, labels in list(SINGLE_LABEL_ATTRS.items()) + list(MULTI_LABEL_ATTRS.items()):
+        inits.append(numpy_helper.from_array(rng.normal(size=(width, len(labels))).astype(np.float32), f"w_{name}"))
+        nodes.append(helper.make_node("MatMul", ["feat", f"w_{name}"], [name]))
+        outputs.append(helper.make_tensor_value_info(name, TensorProto.FLOAT, ["batch", len(labels)]))
+    graph = helper.make_graph(
+        nodes,
+        "efficientnet_stand_in",
+        [helper.make_tensor_value_info("image", TensorProto.FLOAT, ["batch", 3, 224, 224])],
+        outputs,
+        inits,
+    )
+    _save(helper.make_model(graph, opset_imports=[helper.make_opsetid("", _OPSET)]), path)
+
+
+def write_stand_in_artifacts(out_dir: Path, embed_dim: int = 64, max_len: int = 32, seed: int = 0) -> Path:
+    """Write text/item encoders + artifacts_config.json into *out_dir*; returns the config path."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    maps = build_maps()
+    stoi = {"<pad>": 0, "<unk>": 1}
+    for word in MOOD_WORDS:
+        stoi.setdefault(word, len(stoi))
+
+    write_text_encoder(out_dir / "text_encoder.onnx", len(stoi), max_len, embed_dim, seed)
+    item_vocab = 1 + max(v for m in maps.values() for v in m.values())
+    write_item_encoder(out_dir / "item_encoder.onnx", item_vocab, len(FEATURE_COLS), embed_dim, seed + 1)
+
+    config = {
+        "cfg": {"embed_dim": embed_dim, "max_len": max_len},
+        "feature_cols": list(FEATURE_COLS),
+        "maps": maps,
+        "text_vocab": {"stoi": stoi, "pad_idx": 0, "unk_idx": 1, "vocab_size": len(stoi)},
+        "item_metas": [],
+        "item_table_min": {},
+        "weather_label_to_temp_range": {k: list(v) for k, v in WEATHER_LABEL_TO_TEMP_RANGE.items()},
+    }
+    config_path = out_dir / "artifacts_config.json"
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+    return config_path
+
+
+def resolve_models(
+    work_dir: Path,
+    artifacts_config: Optional[Path] = None,
+    effnet_path: Optional[Path] = None,
+    force_stand_ins: bool = False,
+    with_effnet: bool = True,
+) -> Tuple[Path, Optional[Path], Dict[str, str]]:
+    """Real model paths when present, stand-ins written to *work_dir* otherwise.
+
+    Returns (artifacts_config path, efficientnet onnx path, {"artifacts": ..., "effnet": ...} sources).
+    ``with_effnet=False`` skips the classifier (path None).
+    """
+    artifacts_config = artifacts_config or REAL_ARTIFACTS_CONFIG
+    effnet_path = effnet_path or REAL_EFFNET
+    sources: Dict[str, str] = {}
+
+    if not force_stand_ins and artifacts_config.exists():
+        sources["artifacts"] = "real"
+    else:
+        artifacts_config = write_stand_in_artifacts(work_dir / "artifacts")
+        sources["artifacts"] = "stand_in"
+
+    if not with_effnet:
+        return artifacts_config, None, sources
+    if not force_stand_ins and effnet_path.exists():
+        sources["effnet"] = "real"
+    else:
+        effnet_path = work_dir / "efficientnet_stand_in.onnx"
+        write_effnet(effnet_path)
+        sources["effnet"] = "stand_in"
+
+    return artifacts_config, effnet_path, sources
@@ -0,0 +1,133 @@
+"""Seeded synthetic closets and vocabularies for benchmarks.
+
+실제 라벨 어휘(SINGLE_LABEL_ATTRS)와 predictor.py의 alias 테이블을 섞어
+API payload와 같은 모양의 closet item을 만듭니다.
+"""
+
+from __future__ import annotations
+
+import random
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.efficientnet_classifier import SINGLE_LABEL_ATTRS
+from app.predictor import (
+    CATEGORY_ALIASES,
+    COLLAR_ALIASES,
+    COLOR_ALIASES,
+    FIT_ALIASES,
+    LENGTH_ALIASES,
+    SEASON_TEMP_RANGE,
+    SLEEVE_ALIASES,
+    STYLE_ALIASES,
+)
+
+FEATURE_COLS = ["part", "카테고리", "색상", "서브색상", "소매기장", "기장", "핏", "옷깃", "서브스타일", "날씨"]
+
+WEATHER_LABEL_TO_TEMP_RANGE = {
+    "한파": (-20, -5),
+    "한겨울": (-4, 4),
+    "쌀쌀": (5, 11),
+    "선선": (12, 17),
+    "따뜻": (18, 22),
+    "더움": (23, 27),
+    "폭염": (28, 40),
+}
+
+PART_MIXES: Dict[str, Dict[str, float]] = {
+    "balanced": {"top": 0.35, "bottom": 0.3, "outer": 0.2, "dress": 0.15},
+    "tops_heavy": {"top": 0.6, "bottom": 0.25, "outer": 0.1, "dress": 0.05},
+    "dress_heavy": {"top": 0.15, "bottom": 0.1, "outer": 0.25, "dress": 0.5},
+}
+
+# part -> 카테고리 vocabulary entries that belong to it
+_PART_CATEGORIES = {
+    "top": ["티셔츠", "셔츠", "블라우스", "니트웨어", "후드티", "탑", "브라탑"],
+    "bottom": ["팬츠", "청바지", "스커트", "조거팬츠", "래깅스"],
+    "outer": ["재킷", "점퍼", "코트", "패딩", "가디건", "짚업", "베스트"],
+    "dress": ["드레스", "점프수트"],
+}
+
+_ATTR_SOURCES = {
+    "sub_type": ("카테고리", CATEGORY_ALIASES),
+    "color": ("색상", COLOR_ALIASES),
+    "sub_color": ("서브색상", COLOR_ALIASES),
+    "sleeve_length": ("소매기장", SLEEVE_ALIASES),
+    "length": ("기장", LENGTH_ALIASES),
+    "fit": ("핏", FIT_ALIASES),
+    "collar": ("옷깃", COLLAR_ALIASES),
+    "style": ("서브스타일", STYLE_ALIASES),
+}
+
+
+def build_maps(max_index: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+    """Vocabulary maps shaped like artifacts_config.json ``maps``.
+
+    *max_index* clips indices so the maps stay valid for small stand-in
+    encoders with tiny embedding tables.
+    """
+    maps: Dict[str, Dict[str, int]] = {"part": {"<unk>": 0, "상의": 1, "하의": 2, "아우터": 3, "원피스": 4}}
+    for col in FEATURE_COLS[1:-1]:
+        vocab = {"<unk>": 0, "없음": 1}
+        for label in SINGLE_LABEL_ATTRS[col]:
+            vocab.setdefault(label, len(vocab))
+        maps[col] = vocab
+    maps["날씨"] = {"<unk>": 0}
+    for label in WEATHER_LABEL_TO_TEMP_RANGE:
+        maps["날씨"][label] = len(maps["날씨"])
+    if max_index is not None:
+        maps = {col: {k: min(v, max_index) for k, v in m.items()} for col, m in maps.items()}
+    return maps
+
+
+def synthetic_bundle_fields(max_index: Optional[int] = None) -> SimpleNamespace:
+    """The non-model fields of an ArtifactsBundle used by closet preparation."""
+    return SimpleNamespace(
+        feature_cols=list(FEATURE_COLS),
+        maps=build_maps(max_index),
+        item_table_min={},
+        weather_label_to_temp_range=dict(WEATHER_LABEL_TO_TEMP_RANGE),
+        feature_resolvers=None,
+    )
+
+
+def _raw_value(rng: random.Random, col: str, aliases: Dict[str, str]) -> Optional[str]:
+    roll = rng.random()
+    if roll < 0.1:
+        return None
+    if roll < 0.35:
+        alias = rng.choice(list(aliases))
+        return alias.upper() if rng.random() < 0.2 else alias
+    return rng.choice(SINGLE_LABEL_ATTRS[col])
+
+
+def make_closet(
+    n: int,
+    seed: int = 0,
+    part_mix: str = "balanced",
+) -> List[Dict[str, Any]]:
+    """Seeded closet of *n* items in the /recommend ``closet_items`` shape."""
+    rng = random.Random(seed)
+    mix = PART_MIXES[part_mix]
+    parts: Sequence[str] = list(mix)
+    weights = [mix[p] for p in parts]
+    seasons = list(SEASON_TEMP_RANGE)
+
+    items: List[Dict[str, Any]] = []
+    for i in range(n):
+        part = rng.choices(parts, weights)[0]
+        attrs: Dict[str, Any] = {"part": part}
+        for field_name, (col, aliases) in _ATTR_SOURCES.items():
+            attrs[field_name] = _raw_value(rng, col, aliases)
+        if rng.random() < 0.7:
+            attrs["sub_type"] = rng.choice(_PART_CATEGORIES[part])
+        items.append(
+            {
+                "id": f"item-{seed}-{i}",
+                "vector": None,
+                "attributes": attrs,
+                "season": rng.sample(seasons, rng.randint(1, 2)) if rng.random() < 0.8 else None,
+                "dominant_color_lab": None,
+            }
+        )
+    return items
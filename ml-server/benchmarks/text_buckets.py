@@ -0,0 +1,104 @@
+"""Length-bucketed vs max_len-padded text encoding: parity and latency.
+
+    cd ml-server && python -m benchmarks.text_buckets
+    cd ml-server && python -m benchmarks.text_buckets --artifacts ../model/artifacts_config.json
+
+같은 쿼리를 bucket padding(기본 경로)과 max_len 고정 padding으로 인코딩해
+출력 차이(max |diff|)를 확인하고, 토큰 수별 단건 지연과 섞인 길이의 배치
+인코딩 지연을 비교합니다. 차이가 --tol을 넘으면 종료 코드 1.
+모델의 seq 축이 고정이면 bucket이 (max_len,) 하나뿐이라 두 경로가 같습니다.
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from app.model_loader import ArtifactsBundle, load_artifacts
+
+from .bench_pipeline import summarize
+from .stand_ins import resolve_models
+
+
+def make_queries(bundle: ArtifactsBundle, n_tokens: int, count: int, rng: np.random.Generator) -> List[str]:
+    words = [w for w, idx in bundle.text_stoi.items() if idx not in (bundle.text_pad_idx, bundle.text_unk_idx)]
+    return [" ".join(rng.choice(words, size=n_tokens)) for _ in range(count)]
+
+
+def _p50_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return summarize(samples)["p50_ms"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--artifacts", type=Path, default=None, help="artifacts_config.json path")
+    parser.add_argument("--stand-ins", action="store_true", help="always use random-weight stand-ins")
+    parser.add_argument("--queries", type=int, default=64, help="queries per token count")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--tol", type=float, default=1e-4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory(prefix="ootd-text-") as work_dir:
+        artifacts_config, _, sources = resolve_models(
+            Path(work_dir), args.artifacts, force_stand_ins=args.stand_ins, with_effnet=False
+        )
+        bundle = load_artifacts(str(artifacts_config), text_cache_bytes=0)
+    fixed = dataclasses.replace(bundle, text_buckets=(bundle.max_len,))
+    print(f"models: {sources['artifacts']}, buckets {bundle.text_buckets}, max_len {bundle.max_len}")
+
+    counts = sorted({1, 2, 3, 4, 5, 8, 12, 16, bundle.max_len})
+    result: Dict[str, object] = {"models": sources, "buckets": list(bundle.text_buckets), "by_tokens": {}}
+    worst = 0.0
+    for n_tokens in [c for c in counts if c <= bundle.max_len]:
+        queries = make_queries(bundle, n_tokens, args.queries, rng)
+        diff = float(np.abs(bundle.encode_texts(queries) - fixed.encode_texts(queries)).max())
+        worst = max(worst, diff)
+        single = queries[0]
+        row = {
+            "pad_length": bundle.text_pad_length(n_tokens),
+            "max_abs_diff": diff,
+            "single_bucketed_ms": _p50_ms(lambda: bundle.encode_text(single), args.repeat),
+            "single_fixed_ms": _p50_ms(lambda: fixed.encode_text(single), args.repeat),
+        }
+        result["by_tokens"][n_tokens] = row
+        print(
+            f"{n_tokens:>3} tokens -> pad {row['pad_length']:>3}: |diff| {diff:.2e}  "
+            f"single {row['single_fixed_ms']:.3f} -> {row['single_bucketed_ms']:.3f} ms"
+        )
+
+    # 운영 분포(대부분 5토큰 미만)를 흉내 낸 섞인 배치
+    mixed = [q for n in (1, 2, 2, 3, 3, 4, 4, 6, 9) for q in make_queries(bundle, min(n, bundle.max_len), 8, rng)]
+    result["mixed_batch"] = {
+        "size": len(mixed),
+        "bucketed_ms": _p50_ms(lambda: bundle.encode_texts(mixed), max(5, args.repeat // 5)),
+        "fixed_ms": _p50_ms(lambda: fixed.encode_texts(mixed), max(5, args.repeat // 5)),
+    }
+    print(
+        f"mixed batch of {len(mixed)}: {result['mixed_batch']['fixed_ms']:.3f} -> "
+        f"{result['mixed_batch']['bucketed_ms']:.3f} ms"
+    )
+    result["max_abs_diff"] = worst
+    ok = worst <= args.tol
+    print(f"parity: max |diff| {worst:.2e} ({'ok' if ok else 'MISMATCH'})")
+    if args.output:
+        args.output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import hashlib
+
+import numpy as np
+from PIL import Image
+
+from app.analysis_cache import AnalysisCache, color_signature, dhash
+
+
+def _shirt(rgb):
+    """같은 실루엣의 셔츠를 *rgb* 색으로 그린 이미지 (배경은 흰색)."""
+    image = np.full((96, 96, 3), 255, dtype=np.uint8)
+    image[16:80, 28:68] = rgb
+    image[16:40, 12:84] = rgb
+    return Image.fromarray(image)
+
+
+def _key(image):
+    return hashlib.sha256(image.tobytes()).digest()
+
+
+def test_recolored_copies_do_not_share_result():
+    cache = AnalysisCache(max_entries=8, hamming_threshold=4)
+    red, blue = _shirt((200, 30, 30)), _shirt((30, 30, 200))
+    assert bin(dhash(red) ^ dhash(blue)).count("1") <= 4  # 흑백 dHash로는 같은 옷
+
+    cache.put(_key(red), dhash(red), color_signature(red), {"색상": "레드"})
+    assert cache.get_similar(dhash(blue), color_signature(blue)) is None
+
+
+def test_resized_copy_hits_perceptual_path():
+    cache = AnalysisCache(max_entries=8, hamming_threshold=4)
+    red = _shirt((200, 30, 30))
+    resized = red.resize((64, 64), Image.BILINEAR)
+
+    cache.put(_key(red), dhash(red), color_signature(red), {"색상": "레드"})
+    assert cache.get_similar(dhash(resized), color_signature(resized)) == {"색상": "레드"}
+
+
+def test_perceptual_path_off_by_default():
+    cache = AnalysisCache(max_entries=8)
+    red = _shirt((200, 30, 30))
+
+    cache.put(_key(red), dhash(red), color_signature(red), {"색상": "레드"})
+    assert cache.get_exact(_key(red)) == {"색상": "레드"}
+    assert cache.get_similar(dhash(red), color_signature(red)) is None
@@ -8,6 +8,9 @@ Outputs:
   model/item_embs.npy
   ml-server/app/efficientnet_kfashion.onnx
   ml-server/app/effnet_labels.json
+
+With --quantize, scripts/quantize_onnx.py then writes the *.int8.onnx variants
+and model/quantization_report.json (see that script for its options).
 """
 
 import json
@@ -120,6 +123,39 @@ class _ItemEncoderONNXWrapper(nn.Module):
         return self.encoder(feats)
 
 
+# ── TextEncoder dynamic-length parity ───────────────────────────────
+
+def check_text_seq_parity(te_path, vocab_size, max_len, pad_idx, buckets=(4, 8, 16), tol=1e-4):
+    """Compare bucket-padded outputs with the max_len-padded ones.
+
+    seq 축이 실제로 동적이지 않거나 padding에 따라 출력이 달라지면 경고만 하고,
+    이 경우 서버는 입력 shape을 보고 max_len 고정 padding으로 동작합니다.
+    """
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(str(te_path), providers=["CPUExecutionProvider"])
+    rng = np.random.default_rng(0)
+    worst = 0.0
+    for length in [b for b in buckets if b < max_len]:
+        for n_tokens in range(1, length + 1):
+            ids = np.full((4, max_len), pad_idx, dtype=np.int64)
+            mask = np.zeros((4, max_len), dtype=np.int64)
+            ids[:, :n_tokens] = rng.integers(2, vocab_size, size=(4, n_tokens))
+            mask[:, :n_tokens] = 1
+            full = session.run(None, {"input_ids": ids, "attention_mask": mask})[0]
+            try:
+                short = session.run(
+                    None, {"input_ids": ids[:, :length], "attention_mask": mask[:, :length]}
+                )[0]
+            except Exception as exc:  # noqa: BLE001
+                print(f"  WARNING: seq axis is not dynamic ({exc}); server will pad to max_len")
+                return False
+            worst = max(worst, float(np.abs(full - short).max()))
+    ok = worst <= tol
+    print(f"  TextEncoder seq parity: max |diff| {worst:.2e} ({'ok' if ok else 'MISMATCH'})")
+    return ok
+
+
 # ── Artifacts (TextEncoder + ItemEncoder + config) ───────────────────
 
 def convert_artifacts():
@@ -162,14 +198,16 @@ def convert_artifacts():
         opset_version=18,
         input_names=["input_ids", "attention_mask"],
         output_names=["text_embedding"],
+        # seq 축도 동적으로: 서버가 짧은 쿼리를 길이 bucket까지만 padding
         dynamic_axes={
-            "input_ids": {0: "batch"},
-            "attention_mask": {0: "batch"},
+            "input_ids": {0: "batch", 1: "seq"},
+            "attention_mask": {0: "batch", 1: "seq"},
         },
         do_constant_folding=True,
         dynamo=False,
     )
     print(f"  TextEncoder saved: {te_path} ({te_path.stat().st_size / 1024:.1f} KB)")
+    check_text_seq_parity(te_path, vocab_size, max_len, text_pad_idx)
 
     # ── ItemEncoder ──
     item_encoder = ItemEncoder(
@@ -257,6 +295,19 @@ def convert_artifacts():
 
 
 if __name__ == "__main__":
+    import argparse
+
+    import quantize_onnx
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--quantize", action="store_true", help="FP32 변환 후 INT8 변형 + 비교 리포트 생성 (quantize_onnx.py)"
+    )
+    quantize_onnx.add_arguments(parser)
+    args = parser.parse_args()
+
     convert_efficientnet()
     convert_artifacts()
     print("\n=== All conversions complete! ===")
+    if args.quantize:
+        quantize_onnx.run(args)
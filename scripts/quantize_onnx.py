@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""INT8 quantization of the exported ONNX models + FP32 comparison report.
+
+Inputs are the FP32 files written by convert_to_onnx.py (torch is not needed):
+  model/text_encoder.onnx, model/item_encoder.onnx  → dynamic INT8 (MatMul/Gemm weights)
+  ml-server/app/efficientnet_kfashion.onnx           → static INT8 (QDQ), calibrated on images
+
+Outputs (next to the FP32 files, picked up by the server with ORT_MODEL_VARIANT=int8):
+  model/text_encoder.int8.onnx
+  model/item_encoder.int8.onnx
+  ml-server/app/efficientnet_kfashion.int8.onnx
+  model/quantization_report.json
+
+Report: file size, p50 latency (FP32 vs INT8, same session options as the server),
+embedding cosine drift for the encoders, per-head top-1 agreement for EfficientNet.
+
+Usage:
+  python scripts/quantize_onnx.py                      # data/images로 보정
+  python scripts/quantize_onnx.py --calibration-dir path/to/images
+  python scripts/quantize_onnx.py --skip-effnet
+"""
+
+import argparse
+import dataclasses
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ml-server"))
+
+from app.efficientnet_classifier import (  # noqa: E402
+    MULTI_LABEL_ATTRS,
+    SINGLE_LABEL_ATTRS,
+    _preprocess_image,
+    decode_image,
+)
+from app.onnx_session import SessionConfig, create_session, variant_path  # noqa: E402
+
+# 의류 데이터셋 이미지 (있으면 보정 기본값)
+DEFAULT_CALIBRATION_DIR = ROOT / "data" / "images"
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+
+def _quantization():
+    try:
+        from onnxruntime import quantization
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+    except ImportError as exc:
+        raise SystemExit("quantization needs onnxruntime>=1.16 and the `onnx` package") from exc
+    return quantization, quant_pre_process
+
+
+# ── helpers ──────────────────────────────────────────────────────────
+
+def _size_kb(path: Path) -> float:
+    return round(path.stat().st_size / 1024, 1)
+
+
+def _p50_ms(session, feeds: Dict[str, np.ndarray], repeat: int) -> float:
+    session.run(None, feeds)
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        session.run(None, feeds)
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return round(float(np.median(samples)), 3)
+
+
+def _cosine_drift(a: np.ndarray, b: np.ndarray) -> Dict[str, float]:
+    a = a / (np.linalg.norm(a, axis=1, keepdims=True) + 1e-12)
+    b = b / (np.linalg.norm(b, axis=1, keepdims=True) + 1e-12)
+    drift = 1.0 - np.sum(a * b, axis=1)
+    return {
+        "cosine_drift_mean": round(float(drift.mean()), 6),
+        "cosine_drift_p99": round(float(np.quantile(drift, 0.99)), 6),
+        "cosine_drift_max": round(float(drift.max()), 6),
+    }
+
+
+def _neighbor_agreement(a: np.ndarray, b: np.ndarray) -> float:
+    """Share of rows whose nearest other row (cosine) is the same in FP32 and INT8."""
+    sims_a, sims_b = a @ a.T, b @ b.T
+    np.fill_diagonal(sims_a, -np.inf)
+    np.fill_diagonal(sims_b, -np.inf)
+    return round(float(np.mean(sims_a.argmax(axis=1) == sims_b.argmax(axis=1))), 4)
+
+
+# ── encoders (dynamic INT8) ──────────────────────────────────────────
+
+def quantize_encoder(src: Path, dst: Path) -> None:
+    quantization, _ = _quantization()
+    quantization.quantize_dynamic(
+        str(src),
+        str(dst),
+        weight_type=quantization.QuantType.QInt8,
+        op_types_to_quantize=["MatMul", "Gemm"],
+        per_channel=True,
+    )
+    print(f"  Saved: {dst} ({_size_kb(src)} KB -> {_size_kb(dst)} KB)")
+
+
+def _text_feeds(config: dict, n: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    max_len = int(config["cfg"]["max_len"])
+    tv = config["text_vocab"]
+    vocab_size = int(tv.get("vocab_size") or len(tv["stoi"]))
+    special = {int(tv["pad_idx"]), int(tv["unk_idx"])}
+    candidates = np.array([i for i in range(vocab_size) if i not in special], dtype=np.int64)
+    input_ids = np.full((n, max_len), int(tv["pad_idx"]), dtype=np.int64)
+    mask = np.zeros((n, max_len), dtype=np.int64)
+    for row in range(n):
+        length = int(rng.integers(1, min(8, max_len) + 1))
+        input_ids[row, :length] = rng.choice(candidates, size=length)
+        mask[row, :length] = 1
+    return {"input_ids": input_ids, "attention_mask": mask}
+
+
+def _item_feeds(config: dict, n: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    maps = config["maps"]
+    cols = config["feature_cols"]
+    features = np.zeros((n, len(cols)), dtype=np.int64)
+    for i, col in enumerate(cols):
+        values = np.array(sorted(set(int(v) for v in maps[col].values())), dtype=np.int64)
+        features[:, i] = rng.choice(values, size=n)
+    return {"features": features}
+
+
+def evaluate_encoder(
+    fp32: Path, int8: Path, feeds: Dict[str, np.ndarray], latency_feeds: Dict[str, np.ndarray],
+    session_config: SessionConfig, repeat: int,
+) -> dict:
+    ref = create_session(fp32, session_config)
+    quant = create_session(int8, session_config)
+    a = ref.run(None, feeds)[0]
+    b = quant.run(None, feeds)[0]
+    return {
+        "size_fp32_kb": _size_kb(fp32),
+        "size_int8_kb": _size_kb(int8),
+        "latency_batch": int(next(iter(latency_feeds.values())).shape[0]),
+        "latency_fp32_ms": _p50_ms(ref, latency_feeds, repeat),
+        "latency_int8_ms": _p50_ms(quant, latency_feeds, repeat),
+        "samples": int(a.shape[0]),
+        **_cosine_drift(a, b),
+        "nearest_neighbor_agreement": _neighbor_agreement(a, b),
+    }
+
+
+# ── EfficientNet (static INT8, QDQ) ──────────────────────────────────
+
+def list_images(directory: Path, limit: Optional[int] = None) -> List[Path]:
+    paths = sorted(p for p in directory.rglob("*") if p.suffix.lower() in IMAGE_EXTS)
+    return paths[:limit] if limit else paths
+
+
+def _load_tensor(path: Path) -> np.ndarray:
+    """Same decode + preprocess as /analyze, [1, 3, 224, 224]."""
+    return _preprocess_image(decode_image(path.read_bytes()))
+
+
+def _make_calibration_reader(paths: List[Path], input_name: str):
+    quantization, _ = _quantization()
+
+    class ImageCalibrationReader(quantization.CalibrationDataReader):
+        def __init__(self) -> None:
+            self._iter: Iterator[Path] = iter(paths)
+
+        def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+            path = next(self._iter, None)
+            return None if path is None else {input_name: _load_tensor(path)}
+
+        def rewind(self) -> None:
+            self._iter = iter(paths)
+
+    return ImageCalibrationReader()
+
+
+def quantize_effnet(src: Path, dst: Path, calibration: List[Path], method: str = "minmax") -> None:
+    quantization, quant_pre_process = _quantization()
+    methods = {
+        "minmax": quantization.CalibrationMethod.MinMax,
+        "entropy": quantization.CalibrationMethod.Entropy,
+        "percentile": quantization.CalibrationMethod.Percentile,
+    }
+    input_name = create_session(src).get_inputs()[0].name
+    with tempfile.TemporaryDirectory(prefix="effnet-quant-") as tmp:
+        prepped = Path(tmp) / "prepped.onnx"
+        try:
+            # shape inference + 상수 접기 (ORT 권장 전처리)
+            quant_pre_process(str(src), str(prepped), skip_symbolic_shape=True)
+        except Exception as exc:  # noqa: BLE001 - 전처리 실패 시 원본으로 진행
+            print(f"  quant_pre_process skipped: {exc}")
+            prepped = src
+        quantization.quantize_static(
+            str(prepped),
+            str(dst),
+            _make_calibration_reader(calibration, input_name),
+            quant_format=quantization.QuantFormat.QDQ,
+            activation_type=quantization.QuantType.QUInt8,
+            weight_type=quantization.QuantType.QInt8,
+            per_channel=True,
+            calibrate_method=methods[method],
+        )
+    print(f"  Saved: {dst} ({_size_kb(src)} KB -> {_size_kb(dst)} KB, {len(calibration)} calibration images)")
+
+
+def evaluate_effnet(
+    fp32: Path, int8: Path, images: List[Path], labels: dict,
+    session_config: SessionConfig, repeat: int,
+) -> dict:
+    ref = create_session(fp32, session_config)
+    quant = create_session(int8, session_config)
+    input_name = ref.get_inputs()[0].name
+    names = [o.name for o in ref.get_outputs()]
+    single = [n for n in names if n in labels["single_label_attrs"]]
+    multi = [n for n in names if n in labels["multi_label_attrs"]]
+
+    agree: Dict[str, List[float]] = {n: [] for n in single + multi}
+    for path in images:
+        feeds = {input_name: _load_tensor(path)}
+        a = dict(zip(names, ref.run(None, feeds)))
+        b = dict(zip(names, quant.run(None, feeds)))
+        for n in single:
+            agree[n].append(float(a[n].argmax(axis=1)[0] == b[n].argmax(axis=1)[0]))
+        for n in multi:
+            # 로짓 > 0 == sigmoid > 0.5, 라벨 단위 일치율
+            agree[n].append(float(np.mean((a[n] > 0) == (b[n] > 0))))
+
+    latency = {}
+    for batch in (1, 8):
+        feeds = {input_name: np.random.default_rng(0).random((batch, 3, 224, 224), dtype=np.float32)}
+        latency[f"latency_fp32_ms_b{batch}"] = _p50_ms(ref, feeds, repeat)
+        latency[f"latency_int8_ms_b{batch}"] = _p50_ms(quant, feeds, repeat)
+
+    per_head = {n: round(float(np.mean(v)), 4) for n, v in agree.items() if v}
+    return {
+        "size_fp32_kb": _size_kb(fp32),
+        "size_int8_kb": _size_kb(int8),
+        **latency,
+        "eval_images": len(images),
+        "top1_agreement": {n: per_head[n] for n in single if n in per_head},
+        "multi_label_agreement": {n: per_head[n] for n in multi if n in per_head},
+        "min_top1_agreement": min((per_head[n] for n in single if n in per_head), default=None),
+    }
+
+
+# ── main ─────────────────────────────────────────────────────────────
+
+def run(args: argparse.Namespace) -> dict:
+    # 서버와 같은 ORT_* 스레드 설정으로 측정 (variant/캐시는 고정)
+    session_config = dataclasses.replace(
+        SessionConfig.from_env("QUANTIZE"), model_variant="fp32", optimized_model_dir=None
+    )
+    rng = np.random.default_rng(args.seed)
+    report: dict = {"seed": args.seed}
+
+    if not args.skip_encoders:
+        print("=== Quantizing encoders (dynamic INT8) ===")
+        with open(args.model_dir / "artifacts_config.json", "r", encoding="utf-8") as f:
+            config = json.load(f)
+        for name, make_feeds, latency_batch in (
+            ("text_encoder", _text_feeds, 1),
+            ("item_encoder", _item_feeds, 256),
+        ):
+            src = args.model_dir / f"{name}.onnx"
+            dst = variant_path(src, "int8")
+            quantize_encoder(src, dst)
+            feeds = make_feeds(config, args.samples, rng)
+            latency_feeds = {k: v[:latency_batch] for k, v in feeds.items()}
+            report[name] = evaluate_encoder(src, dst, feeds, latency_feeds, session_config, args.repeat)
+
+    if not args.skip_effnet:
+        print("=== Quantizing EfficientNet (static INT8) ===")
+        calibration_dir = args.calibration_dir
+        if calibration_dir is None and DEFAULT_CALIBRATION_DIR.exists():
+            calibration_dir = DEFAULT_CALIBRATION_DIR
+        if calibration_dir is None:
+            raise SystemExit("--calibration-dir is required for EfficientNet (or pass --skip-effnet)")
+        images = list_images(calibration_dir)
+        if not images:
+            raise SystemExit(f"no images under {calibration_dir}")
+        random.Random(args.seed).shuffle(images)
+        if args.eval_dir is not None:
+            calibration, evaluation = images[: args.calibration_size], list_images(args.eval_dir, args.eval_size)
+        else:
+            # 같은 폴더면 1/5을 평가용으로 떼어 둠 (이미지가 적으면 겹침 허용)
+            held = max(1, len(images) // 5) if len(images) >= 10 else 0
+            evaluation = images[:held] or images
+            calibration = images[held:][: args.calibration_size]
+            evaluation = evaluation[: args.eval_size]
+        src = args.effnet
+        dst = variant_path(src, "int8")
+        quantize_effnet(src, dst, calibration, args.calibration_method)
+
+        labels_path = src.parent / "effnet_labels.json"
+        if labels_path.exists():
+            with open(labels_path, "r", encoding="utf-8") as f:
+                labels = json.load(f)
+        else:
+            labels = {"single_label_attrs": SINGLE_LABEL_ATTRS, "multi_label_attrs": MULTI_LABEL_ATTRS}
+        report["efficientnet"] = {
+            "calibration_images": len(calibration),
+            "calibration_method": args.calibration_method,
+            "eval_overlaps_calibration": bool(set(evaluation) & set(calibration)),
+            **evaluate_effnet(src, dst, evaluation, labels, session_config, args.repeat),
+        }
+
+    report_path = args.report or args.model_dir / "quantization_report.json"
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"  Report saved: {report_path}")
+    _print_summary(report)
+    return report
+
+
+def _print_summary(report: dict) -> None:
+    print("\n=== FP32 vs INT8 ===")
+    for name in ("text_encoder", "item_encoder", "efficientnet"):
+        r = report.get(name)
+        if not r:
+            continue
+        print(f"{name}: {r['size_fp32_kb']} KB -> {r['size_int8_kb']} KB")
+        if "cosine_drift_mean" in r:
+            print(
+                f"  latency (batch {r['latency_batch']}) {r['latency_fp32_ms']} -> {r['latency_int8_ms']} ms, "
+                f"cosine drift mean {r['cosine_drift_mean']} / max {r['cosine_drift_max']}, "
+                f"NN agreement {r['nearest_neighbor_agreement']}"
+            )
+        else:
+            print(
+                f"  latency b1 {r['latency_fp32_ms_b1']} -> {r['latency_int8_ms_b1']} ms, "
+                f"b8 {r['latency_fp32_ms_b8']} -> {r['latency_int8_ms_b8']} ms"
+            )
+            for head, value in {**r["top1_agreement"], **r["multi_label_agreement"]}.items():
+                print(f"  {head:<10} {value:.4f}")
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--model-dir", type=Path, default=ROOT / "model")
+    parser.add_argument("--effnet", type=Path, default=ROOT / "ml-server/app/efficientnet_kfashion.onnx")
+    parser.add_argument("--calibration-dir", type=Path, default=None, help="보정 이미지 폴더 (기본: data/images)")
+    parser.add_argument("--calibration-size", type=int, default=200)
+    parser.add_argument(
+        "--calibration-method", choices=["minmax", "entropy", "percentile"], default="minmax"
+    )
+    parser.add_argument("--eval-dir", type=Path, default=None, help="평가용 이미지 (기본: 보정 폴더의 1/5)")
+    parser.add_argument("--eval-size", type=int, default=500)
+    parser.add_argument("--samples", type=int, default=1024, help="encoder drift 샘플 수")
+    parser.add_argument("--repeat", type=int, default=30, help="latency 반복 수")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-encoders", action="store_true")
+    parser.add_argument("--skip-effnet", action="store_true")
+    parser.add_argument("--report", type=Path, default=None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    run(parser.parse_args())